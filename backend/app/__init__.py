@@ -12,12 +12,15 @@ from app.routes.documents import documents_bp
 from app.routes.chat import chat_bp
 from app.routes.admin import admin_bp
 from app.routes.user import user_bp
+from app.services.registry import init_services
+from app.utils.json_provider import OrjsonProvider
 from app.utils.logging import setup_logging
 
 
 def create_app(config_name=None):
     """Create and configure Flask application."""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Load configuration
     if config_name:
@@ -39,6 +42,9 @@ def create_app(config_name=None):
     # Initialize extensions (SQLAlchemy, Migrate, etc.)
     init_extensions(app)
     
+    # Build shared service instances once per worker
+    init_services(app)
+    
     # Initialize extensions
     CORS(app, origins=app.config.get('CORS_ORIGINS', '').split(','))
     jwt = JWTManager(app)
@@ -74,6 +80,10 @@ def create_app(config_name=None):
     def not_found(error):
         return {'error': 'Endpoint not found'}, 404
     
+    @app.errorhandler(429)
+    def rate_limited(error):
+        return {'error': f'Too many requests: {error.description}'}, 429
+    
     @app.errorhandler(500)
     def internal_error(error):
         app.logger.error(f'Server Error: {error}')
@@ -19,6 +19,8 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
     ALLOWED_EXTENSIONS = {'pdf'}
+    # Let nginx/Apache serve downloads via X-Sendfile (requires proxy support)
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
     
     # Database settings
     ROOT_PATH = os.path.dirname(current_dir)
@@ -29,6 +31,34 @@ class Config:
         'pool_pre_ping': True,
         'pool_recycle': 300,
     }
+    if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # Server databases: enough pooled connections for every request thread;
+        # LIFO reuse keeps the idle surplus cold so pool_recycle can retire it
+        SQLALCHEMY_ENGINE_OPTIONS.update(
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 25)),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 25)),
+            pool_use_lifo=True,
+        )
+        if SQLALCHEMY_DATABASE_URI.startswith(('postgresql://', 'postgresql+psycopg2://')):
+            # psycopg2: INSERTs already fold into multi-row VALUES (values_only, 1000 rows
+            # a page); values_plus_batch also pages executemany UPDATE/DELETE through
+            # execute_batch instead of sending one statement per row
+            SQLALCHEMY_ENGINE_OPTIONS.update(
+                executemany_mode='values_plus_batch',
+                executemany_batch_page_size=500,
+                insertmanyvalues_page_size=1000,
+            )
+    else:
+        # SQLite: a connection's page cache and mmap are thrown away when it closes, so
+        # keep a LIFO pool of long-lived connections (PRAGMAs are applied once, on
+        # connect) instead of recycling them or pinging a server that isn't there
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 8)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 8)),
+            'pool_use_lifo': True,
+            # Each long-lived connection keeps more prepared statements (sqlite3 defaults to 128)
+            'connect_args': {'cached_statements': 256},
+        }
     
     # Vector store settings
     CHROMA_PERSIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'chroma_db')
@@ -52,6 +82,38 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', 86400))  # 24 hours
     JWT_REFRESH_TOKEN_EXPIRES = int(os.environ.get('JWT_REFRESH_TOKEN_EXPIRES', 2592000))  # 30 days
     
+    # Response compression settings (Flask-Compress)
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 4096))
+    COMPRESS_MIMETYPES = ['application/json', 'text/html', 'text/plain']
+    COMPRESS_STREAMS = False  # Never buffer streamed responses (SSE, file downloads)
+    
+    # Semantic search cache (Redis with RediSearch); disabled when REDIS_URL is unset
+    REDIS_URL = os.environ.get('REDIS_URL')
+    SEMANTIC_CACHE_TTL = int(os.environ.get('SEMANTIC_CACHE_TTL', 900))
+    SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.95))
+    
+    # Background task queue (Celery); documents are processed inline when no broker is set
+    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+    CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND') or CELERY_BROKER_URL
+    
+    # Seconds between sweeps that retry failed cleanups of deleted documents
+    DELETED_DOCUMENT_SWEEP_INTERVAL = int(os.environ.get('DELETED_DOCUMENT_SWEEP_INTERVAL', 3600))
+    
+    # Processes that parse PDF/Office attachments off the request thread (0 = parse inline)
+    ATTACHMENT_PROCESS_WORKERS = int(os.environ.get('ATTACHMENT_PROCESS_WORKERS', 0))
+    
+    # On-disk cache of attachment extraction results, keyed by file content
+    ATTACHMENT_CACHE_DIR = os.environ.get('ATTACHMENT_CACHE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'attachments'
+    )
+    # Days an unused entry stays in that cache before it is swept
+    ATTACHMENT_CACHE_MAX_AGE_DAYS = int(os.environ.get('ATTACHMENT_CACHE_MAX_AGE_DAYS', 7))
+    
+    # Rate limiting (Flask-Limiter); use a shared store such as redis:// with several workers
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_HEADERS_ENABLED = True
+    
     # CORS settings
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5173')
     
@@ -80,6 +142,11 @@ class TestingConfig(Config):
     FLASK_ENV = 'testing'
     DATABASE_PATH = ':memory:'  # Use in-memory database for tests
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
     SECRET_KEY = 'test-secret-key'
     JWT_SECRET_KEY = 'test-jwt-secret-key'
     LOG_LEVEL = 'ERROR'
+    CELERY_BROKER_URL = None
+    REDIS_URL = None
+    RATELIMIT_ENABLED = False
+    ATTACHMENT_CACHE_DIR = None
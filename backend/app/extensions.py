@@ -1,18 +1,89 @@
 """
 Flask extensions initialization.
 """
+import os
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from flask_compress import Compress
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from passlib.context import CryptContext
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from celery import Celery
+except ImportError:  # Celery is optional; documents are processed inline without it
+    Celery = None
 
 # Initialize extensions
 db = SQLAlchemy()
 migrate = Migrate()
+compress = Compress()
+limiter = Limiter(key_func=get_remote_address)
+celery_app = Celery('course_pilot') if Celery else None
+
+# Password hashing: Argon2id for new hashes; pbkdf2_sha256 hashes are verified and upgraded
+pwd_ctx = CryptContext(
+    schemes=['argon2', 'pbkdf2_sha256'],
+    deprecated='auto',
+    argon2__memory_cost=65536,
+    argon2__time_cost=3,
+    argon2__parallelism=4
+)
+
+
+# Applied to every new SQLite connection. WAL lets readers run alongside a writer and,
+# with synchronous=NORMAL, syncs at checkpoints instead of on every commit; the rest
+# keep temp tables in memory and give each connection a 64 MB page cache and 256 MB mmap.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=268435456',
+    # SQLite leaves foreign keys (and so ON DELETE CASCADE) off unless asked per connection
+    'PRAGMA foreign_keys=ON',
+)
+
+# Opt-in for throwaway databases (tests, CI, seeding): no fsyncs and the rollback journal
+# kept in memory, so a crash can corrupt the file. Never set this where the data matters.
+SQLITE_FAST_MODE = bool(os.environ.get('COURSE_PILOT_FAST_DB'))
+SQLITE_FAST_PRAGMAS = (
+    'PRAGMA journal_mode=MEMORY',
+    'PRAGMA synchronous=OFF',
+)
+
+
+def _apply_pragmas(cursor, fast: bool = False) -> None:
+    """Run SQLITE_PRAGMAS (then SQLITE_FAST_PRAGMAS when ``fast``) on a SQLite cursor."""
+    # The main database has no file when it lives in memory
+    in_memory = not cursor.execute('PRAGMA database_list').fetchone()[2]
+    for pragma in SQLITE_PRAGMAS + (SQLITE_FAST_PRAGMAS if fast else ()):
+        if in_memory and 'journal_mode' in pragma:
+            continue
+        cursor.execute(pragma)
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Apply the SQLite pragmas to new connections (journal mode is skipped for in-memory databases)."""
+    if not type(dbapi_connection).__module__.startswith('sqlite3'):
+        return
+
+    cursor = dbapi_connection.cursor()
+    _apply_pragmas(cursor, fast=SQLITE_FAST_MODE)
+    cursor.close()
 
 
 def init_extensions(app):
     """Initialize Flask extensions with app instance."""
     db.init_app(app)
     migrate.init_app(app, db)
+    compress.init_app(app)
+    limiter.init_app(app)
+    init_celery(app)
     
     with app.app_context():
         # Import models to ensure they are registered with SQLAlchemy
@@ -20,3 +91,38 @@ def init_extensions(app):
         
         # Create tables if they don't exist
         db.create_all()
+
+
+def init_celery(app):
+    """Bind the Celery app to Flask when a broker is configured."""
+    if celery_app is None or not app.config.get('CELERY_BROKER_URL'):
+        return
+
+    celery_app.conf.update(
+        broker_url=app.config['CELERY_BROKER_URL'],
+        result_backend=app.config.get('CELERY_RESULT_BACKEND'),
+        task_acks_late=True,
+        worker_prefetch_multiplier=1,
+        # Run by `celery beat` (or a worker started with -B)
+        beat_schedule={
+            'cleanup-deleted-documents': {
+                'task': 'documents.cleanup_deleted_documents',
+                'schedule': app.config.get('DELETED_DOCUMENT_SWEEP_INTERVAL', 3600),
+            },
+        },
+    )
+
+    class AppContextTask(celery_app.Task):
+        """Run every task inside the Flask application context."""
+
+        def __call__(self, *args, **kwargs):
+            with app.app_context():
+                return self.run(*args, **kwargs)
+
+    celery_app.Task = AppContextTask
+    app.extensions['celery'] = celery_app
+
+
+def task_queue_enabled(app) -> bool:
+    """Check whether heavy work should be sent to the background queue."""
+    return 'celery' in app.extensions
@@ -4,7 +4,8 @@ Authentication middleware for the application.
 from functools import wraps
 from flask import request, jsonify, current_app
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from app.services.database import DatabaseService
+from flask_limiter.util import get_remote_address
+from app.services.registry import get_service
 from app.utils.exceptions import AuthenticationError, AuthorizationError
 
 
@@ -20,23 +21,37 @@ def require_auth(f):
     return decorated_function
 
 
+def current_user_is_admin(db_service=None) -> bool:
+    """
+    Check whether the current JWT belongs to an admin.
+    
+    The role comes from the user's cached profile (see DatabaseService.get_user_profile)
+    rather than the token's role claim, so a demoted or deleted admin loses access
+    without waiting for the token to expire; a cache hit needs no query.
+    """
+    db_service = db_service or get_service('db')
+    profile = db_service.get_user_profile(get_jwt_identity())
+    return profile is not None and profile['role'] == 'admin'
+
+
+def user_rate_limit_key() -> str:
+    """Rate-limit key for authenticated routes: the JWT identity, else the client address."""
+    verify_jwt_in_request(optional=True)
+    user_id = get_jwt_identity()
+    return f'user:{user_id}' if user_id else get_remote_address()
+
+
 def require_admin(f):
-    """Decorator to require admin role."""
+    """Decorator to require a valid JWT with the admin role."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        try:
-            verify_jwt_in_request()
-            
-            user_id = get_jwt_identity()
-            db_service = DatabaseService()
-            user = db_service.get_user_by_id(user_id)
-            
-            if not user or user.role != 'admin':
-                return jsonify({'error': 'Admin access required'}), 403
-            
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({'error': 'Authentication required'}), 401
+        # Missing/invalid tokens are handled by the JWTManager error loaders
+        verify_jwt_in_request()
+        
+        if not current_user_is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return f(*args, **kwargs)
     return decorated_function
 
 
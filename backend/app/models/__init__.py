@@ -1,10 +1,12 @@
 """
 Data models for the application.
 """
+import sqlite3
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
-import json
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Boolean
+import orjson
+from sqlalchemy import DDL, Column, String, Integer, DateTime, Text, ForeignKey, Boolean, Index, event, func
 from sqlalchemy.orm import relationship
 from app.extensions import db
 
@@ -20,10 +22,17 @@ class User(db.Model):
     role = Column(String(20), nullable=False)  # 'student' or 'admin'
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
-    # Relationships
-    topics = relationship("Topic", back_populates="creator", lazy="dynamic")
-    chat_sessions = relationship("ChatSession", back_populates="user", lazy="dynamic")
-    uploaded_documents = relationship("Document", back_populates="uploader", lazy="dynamic")
+    # Relationships (dependent rows are removed by ON DELETE CASCADE in the database)
+    topics = relationship("Topic", back_populates="creator", lazy="dynamic", passive_deletes=True)
+    chat_sessions = relationship("ChatSession", back_populates="user", lazy="dynamic", passive_deletes=True)
+    uploaded_documents = relationship("Document", back_populates="uploader", lazy="dynamic", passive_deletes=True)
+    
+    __table_args__ = (
+        # Case-insensitive login lookups
+        Index('ix_users_email_lower', func.lower(email)),
+        # Admin user listing, newest first (keyset pagination on created_at, id)
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
     
     def __init__(self, id: str, name: str, email: str, password_hash: str, role: str, created_at: datetime = None):
         self.id = id
@@ -47,6 +56,47 @@ class User(db.Model):
         return f'<User {self.email}>'
 
 
+# SQLite: trigram FTS5 index over user names and emails for substring search, kept in
+# sync by triggers (PostgreSQL uses the pg_trgm indexes from migration 010 instead).
+# Entries are keyed by users.id, not the implicit rowid that VACUUM and table rebuilds
+# renumber. A batch migration that rebuilds users drops the triggers; rerun this DDL after one.
+USERS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "user_id UNINDEXED, name, email, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(user_id, name, email) VALUES (new.id, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_fts WHERE user_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN "
+    "UPDATE users_fts SET name = new.name, email = new.email WHERE user_id = old.id; END",
+)
+
+
+@lru_cache(maxsize=None)
+def sqlite_supports_trigram_fts() -> bool:
+    """Whether the linked SQLite has FTS5 with the trigram tokenizer (SQLite 3.34+)."""
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def _trigram_fts_available(ddl, target, bind, **kw) -> bool:
+    return sqlite_supports_trigram_fts()
+
+
+# Without trigram FTS5 the index is skipped and search_users scans with ILIKE
+for _statement in USERS_FTS_DDL:
+    event.listen(User.__table__, 'after_create',
+                 DDL(_statement).execute_if(dialect='sqlite', callable_=_trigram_fts_available))
+# drop_all() removes users (and its triggers) but knows nothing of the virtual table
+event.listen(User.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS users_fts').execute_if(dialect='sqlite'))
+
+
 class Topic(db.Model):
     """Topic model."""
     __tablename__ = 'topics'
@@ -54,15 +104,24 @@ class Topic(db.Model):
     id = Column(String(36), primary_key=True)
     name = Column(String(200), nullable=False)
     description = Column(Text)
-    created_by = Column(String(36), ForeignKey('users.id'), nullable=False)
+    created_by = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     document_count = Column(Integer, default=0, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
     creator = relationship("User", back_populates="topics")
-    chat_sessions = relationship("ChatSession", back_populates="topic", lazy="dynamic")
-    documents = relationship("Document", back_populates="topic", lazy="dynamic")
+    chat_sessions = relationship("ChatSession", back_populates="topic", lazy="dynamic", passive_deletes=True)
+    documents = relationship("Document", back_populates="topic", lazy="dynamic", passive_deletes=True)
+    
+    __table_args__ = (
+        # Case-insensitive unique names, checked by the database instead of scanning all topics
+        Index('uq_topics_name_lower', func.lower(name), unique=True),
+        # Topic listings, newest first
+        Index('ix_topics_created_at', 'created_at'),
+        # Cascading deletes of a user's topics
+        Index('ix_topics_created_by', 'created_by'),
+    )
     
     def __init__(self, id: str, name: str, description: str, created_by: str, 
                  document_count: int = 0, created_at: datetime = None, updated_at: datetime = None):
@@ -95,7 +154,7 @@ class Document(db.Model):
     __tablename__ = 'documents'
     
     id = Column(String(36), primary_key=True)
-    topic_id = Column(String(36), ForeignKey('topics.id'), nullable=False)
+    topic_id = Column(String(36), ForeignKey('topics.id', ondelete='CASCADE'), nullable=False)
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
@@ -104,7 +163,10 @@ class Document(db.Model):
     content_hash = Column(String(64), nullable=False, index=True)  # Hash of extracted content
     chunk_count = Column(Integer, default=0, nullable=False)
     is_processed = Column(Boolean, default=False, nullable=False)
-    uploaded_by = Column(String(36), ForeignKey('users.id'), nullable=False)
+    job_id = Column(String(36), nullable=True)  # Background processing task ID
+    deleted_at = Column(DateTime, nullable=True)  # Set on delete; the row is purged once cleanup finishes
+    # Set to NULL when the uploader's account is deleted; the document stays in its topic
+    uploaded_by = Column(String(36), ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
@@ -112,10 +174,23 @@ class Document(db.Model):
     topic = relationship("Topic", back_populates="documents")
     uploader = relationship("User", back_populates="uploaded_documents")
     
+    __table_args__ = (
+        # One live copy of a file per topic; also closes the race between concurrent duplicate
+        # uploads. Soft-deleted rows are left out, so a pending cleanup can't block a re-upload
+        Index(
+            'uq_documents_topic_file_hash', 'topic_id', 'file_hash', unique=True,
+            sqlite_where=deleted_at.is_(None), postgresql_where=deleted_at.is_(None)
+        ),
+        # Topic document listings and "processed documents in topic" counts
+        Index('ix_documents_topic_processed', 'topic_id', 'is_processed'),
+        # Cascading deletes of a user's uploads
+        Index('ix_documents_uploaded_by', 'uploaded_by'),
+    )
+    
     def __init__(self, id: str, topic_id: str, filename: str, original_filename: str,
                  file_path: str, file_hash: str, file_size: int, content_hash: str,
                  uploaded_by: str, chunk_count: int = 0, is_processed: bool = False,
-                 created_at: datetime = None, updated_at: datetime = None):
+                 job_id: str = None, created_at: datetime = None, updated_at: datetime = None):
         self.id = id
         self.topic_id = topic_id
         self.filename = filename
@@ -126,6 +201,7 @@ class Document(db.Model):
         self.content_hash = content_hash
         self.chunk_count = chunk_count
         self.is_processed = is_processed
+        self.job_id = job_id
         self.uploaded_by = uploaded_by
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
@@ -143,6 +219,7 @@ class Document(db.Model):
             'contentHash': self.content_hash,
             'chunkCount': self.chunk_count,
             'isProcessed': self.is_processed,
+            'jobId': self.job_id,
             'uploadedBy': self.uploaded_by,
             'createdAt': self.created_at.isoformat(),
             'updatedAt': self.updated_at.isoformat()
@@ -157,15 +234,23 @@ class ChatSession(db.Model):
     __tablename__ = 'chat_sessions'
     
     id = Column(String(36), primary_key=True)
-    user_id = Column(String(36), ForeignKey('users.id'), nullable=False)
-    topic_id = Column(String(36), ForeignKey('topics.id'), nullable=False)
+    user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    topic_id = Column(String(36), ForeignKey('topics.id', ondelete='CASCADE'), nullable=False)
     title = Column(String(200), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="chat_sessions")
     topic = relationship("Topic", back_populates="chat_sessions")
-    messages = relationship("Message", back_populates="session", lazy="dynamic")
+    messages = relationship("Message", back_populates="session", lazy="dynamic", passive_deletes=True)
+    
+    __table_args__ = (
+        # A user's sessions, newest first, optionally narrowed to one topic
+        Index('ix_chat_sessions_user_created', 'user_id', 'created_at'),
+        Index('ix_chat_sessions_user_topic_created', 'user_id', 'topic_id', 'created_at'),
+        # Session counts per topic
+        Index('ix_chat_sessions_topic_id', 'topic_id'),
+    )
     
     def __init__(self, id: str, user_id: str, topic_id: str, title: str, created_at: datetime = None):
         self.id = id
@@ -193,10 +278,10 @@ class Message(db.Model):
     __tablename__ = 'messages'
     
     id = Column(String(36), primary_key=True)
-    session_id = Column(String(36), ForeignKey('chat_sessions.id'), nullable=False)
+    session_id = Column(String(36), ForeignKey('chat_sessions.id', ondelete='CASCADE'), nullable=False)
     sender = Column(String(20), nullable=False)  # 'user' or 'assistant'
     message = Column(Text, nullable=False)
-    sources = Column(Text)  # JSON string of source list
+    sources = Column(Text)  # JSON string of source list; decoded only when serialized (sources_list)
     rating = Column(String(20))  # 'positive', 'negative', or None
     attachment_filename = Column(String(255))  # Original filename of attachment
     attachment_path = Column(String(500))  # File path on server
@@ -206,6 +291,13 @@ class Message(db.Model):
     # Relationships
     session = relationship("ChatSession", back_populates="messages")
     
+    __table_args__ = (
+        # A session's history in order
+        Index('ix_messages_session_created', 'session_id', 'created_at'),
+        # Assistant messages in a date range (NPS analytics)
+        Index('ix_messages_sender_created', 'sender', 'created_at'),
+    )
+    
     def __init__(self, id: str, session_id: str, sender: str, message: str, 
                  sources: Optional[List[str]] = None, rating: Optional[str] = None, 
                  attachment_filename: Optional[str] = None, attachment_path: Optional[str] = None,
@@ -214,7 +306,7 @@ class Message(db.Model):
         self.session_id = session_id
         self.sender = sender
         self.message = message
-        self.sources = json.dumps(sources) if sources else None
+        self.sources = orjson.dumps(sources).decode() if sources else None
         self.rating = rating
         self.attachment_filename = attachment_filename
         self.attachment_path = attachment_path
@@ -226,15 +318,15 @@ class Message(db.Model):
         """Get sources as a list."""
         if self.sources:
             try:
-                return json.loads(self.sources)
-            except json.JSONDecodeError:
+                return orjson.loads(self.sources)
+            except orjson.JSONDecodeError:
                 return []
         return []
     
     @sources_list.setter
     def sources_list(self, value: Optional[List[str]]):
         """Set sources from a list."""
-        self.sources = json.dumps(value) if value else None
+        self.sources = orjson.dumps(value).decode() if value else None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert message to dictionary."""
@@ -3,29 +3,26 @@ Admin-specific routes for managing the system.
 """
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
+from datetime import datetime
+from sqlalchemy import select
+from app.extensions import db
 from app.services.database import DatabaseService
-from app.services.vector_store import VectorStoreService
-from app.utils.file_upload import FileUploadService
+from app.middleware.auth import current_user_is_admin
+from app.services.registry import get_service
 from app.utils.exceptions import AuthorizationError
 
 admin_bp = Blueprint('admin', __name__)
 
 
 def get_services():
-    """Get service instances."""
-    db_service = DatabaseService()
-    vector_service = VectorStoreService(current_app.config['CHROMA_PERSIST_DIR'])
-    file_service = FileUploadService(current_app.config.get('UPLOAD_DIR', 'uploads/attachments'))
-    return db_service, vector_service, file_service
+    """Get the shared service instances for this app."""
+    return get_service('db'), get_service('vector'), get_service('files')
 
 
 def verify_admin(user_id: str, db_service: DatabaseService):
-    """Verify if user is admin."""
-    user = db_service.get_user_by_id(user_id)
-    if not user or user.role != 'admin':
+    """Verify if user is admin (role read from the cached user profile)."""
+    if not current_user_is_admin(db_service):
         raise AuthorizationError('Admin access required')
-    return user
 
 
 @admin_bp.route('/dashboard', methods=['GET'])
@@ -47,30 +44,24 @@ def get_admin_dashboard():
         total_indexed_topics = len(indexed_topics)
         
         # Get additional metrics for dashboard
-        from app.models import Topic, User, ChatSession, Message, Document
+        from app.models import Topic, Document
         from app.extensions import db
         
         # Calculate additional metrics
         try:
-            # Total documents
-            total_documents = Document.query.count()
-            
-            # Active topics (topics with at least one processed document)
-            active_topics = db.session.query(Topic).join(Document)\
-                .filter(Document.is_processed == True)\
-                .distinct().count()
+            # Document and 24-hour activity counts in one query
+            metrics = db_service.get_dashboard_metrics()
+            total_documents = metrics['total_documents']
+            active_topics = metrics['active_topics']
             
             # Processing success rate
-            total_docs = Document.query.count()
-            processed_docs = Document.query.filter_by(is_processed=True).count()
+            total_docs = metrics['total_documents']
+            processed_docs = metrics['processed_documents']
             processing_success = int((processed_docs / total_docs * 100) if total_docs > 0 else 100)
             
             # 24-hour activity
-            yesterday = datetime.utcnow() - timedelta(days=1)
-            active_users_24h = db.session.query(User.id).join(ChatSession)\
-                .filter(ChatSession.created_at >= yesterday).distinct().count()
-            
-            messages_today = Message.query.filter(Message.created_at >= yesterday).count()
+            active_users_24h = metrics['active_users_24h']
+            messages_today = metrics['messages_24h']
             
             # Average session time (simplified calculation)
             avg_session_time = 15  # Default value, could be calculated from actual data
@@ -142,13 +133,24 @@ def get_all_users():
         # Verify admin access
         verify_admin(user_id, db_service)
         
-        # Get pagination parameters
+        # Get pagination parameters; a cursor (the previous page's nextCursor)
+        # continues from the last user seen instead of counting rows to skip
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 10))
-        
-        # Get users with pagination
-        users, total_count = db_service.get_all_users(page, limit)
-        total_pages = (total_count + limit - 1) // limit
+        cursor = request.args.get('cursor')
+        search = request.args.get('search', '').strip()
+        
+        # Get users with pagination; a search returns a single page of matches
+        if search:
+            users, total_count = db_service.search_users(search, limit), None
+        elif cursor:
+            created_at, _, last_id = cursor.partition('|')
+            users, total_count = db_service.get_all_users(
+                limit, after=(datetime.fromisoformat(created_at), last_id)
+            )
+        else:
+            users, total_count = db_service.get_all_users(limit, (page - 1) * limit)
+        total_pages = (total_count + limit - 1) // limit if total_count is not None else None
         
         # Convert users to dict format (exclude password hash)
         users_data = []
@@ -167,12 +169,15 @@ def get_all_users():
                 'page': page,
                 'limit': limit,
                 'total': total_count,
-                'pages': total_pages
+                'pages': total_pages,
+                'nextCursor': f"{users[-1].created_at.isoformat()}|{users[-1].id}" if len(users) == limit and not search else None
             }
         }
         
         return jsonify(response), 200
         
+    except ValueError:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
     except AuthorizationError as e:
         return jsonify({'error': str(e)}), 403
     except Exception as e:
@@ -234,7 +239,7 @@ def delete_user(user_id):
     """Delete user (admin only)."""
     try:
         current_user_id = get_jwt_identity()
-        db_service, _, file_service = get_services()
+        db_service, vector_service, file_service = get_services()
         
         # Verify admin access
         verify_admin(current_user_id, db_service)
@@ -251,16 +256,30 @@ def delete_user(user_id):
         # Delete user sessions with file cleanup first
         cleanup_success = db_service.delete_user_sessions_with_cleanup(user_id, file_service)
         
+        # Topics the user created go with them, documents included; documents they
+        # uploaded to other topics stay (uploaded_by is set to NULL)
+        owned_topic_ids, owned_files = db_service.get_user_topic_files(user_id)
+        
         # Delete user (this will handle remaining database cleanup)
         success = db_service.delete_user(user_id)
         if not success:
             return jsonify({'error': 'Failed to delete user'}), 500
         
+        # Vector indexes and document files live outside the database
+        for topic_id in owned_topic_ids:
+            try:
+                vector_service.delete_topic_index(topic_id)
+            except Exception as e:
+                current_app.logger.warning(f"Failed to delete index for topic {topic_id}: {e}")
+                cleanup_success = False
+        for file_path in owned_files:
+            cleanup_success = file_service.delete_file(file_path) and cleanup_success
+        
         response_data = {'message': 'User deleted successfully'}
         
         # Include warning if file cleanup had issues
         if not cleanup_success:
-            response_data['warning'] = 'User deleted but some attachment files could not be removed'
+            response_data['warning'] = 'User deleted but some files or indexes could not be removed'
         
         return jsonify(response_data), 200
         
@@ -313,7 +332,7 @@ def get_system_status():
         
         # Check database connectivity
         try:
-            db_service.get_all_topics()
+            db.session.execute(select(1))
             db_status = 'healthy'
         except Exception:
             db_status = 'error'
@@ -332,6 +351,8 @@ def get_system_status():
             'database': db_status,
             'vectorStore': vector_status,
             'openaiApi': openai_status,
+            # Checked-out vs idle connections, to spot pool saturation
+            'databasePool': db.engine.pool.status(),
             'overallStatus': 'healthy' if all(s in ['healthy', 'configured'] for s in [db_status, vector_status, openai_status]) else 'degraded'
         }
         
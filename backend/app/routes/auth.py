@@ -3,7 +3,8 @@ Authentication routes for user management.
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app.services.database import DatabaseService
+from app.extensions import limiter
+from app.services.registry import get_service
 from app.utils.validators import validate_email, validate_password
 from app.utils.exceptions import ValidationError, AuthenticationError
 
@@ -11,8 +12,8 @@ auth_bp = Blueprint('auth', __name__)
 
 
 def get_db_service():
-    """Get database service instance."""
-    return DatabaseService()
+    """Get the shared database service instance."""
+    return get_service('db')
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -67,6 +68,7 @@ def register():
 
 
 @auth_bp.route('/login', methods=['POST'])
+@limiter.limit('10/minute')
 def login():
     """Authenticate user and return token."""
     try:
@@ -109,13 +111,13 @@ def get_current_user():
         user_id = get_jwt_identity()
         db_service = get_db_service()
         
-        user = db_service.get_user_by_id(user_id)
+        user = db_service.get_user_profile(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         return jsonify({
-            'user': user.to_dict()
+            'user': user
         }), 200
         
     except Exception as e:
@@ -136,7 +138,7 @@ def refresh_token():
             return jsonify({'error': 'User not found'}), 404
         
         # Generate new access token
-        new_token = create_access_token(identity=user_id)
+        new_token = create_access_token(identity=user.id)
         
         return jsonify({
             'token': new_token,
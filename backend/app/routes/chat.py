@@ -3,27 +3,21 @@ Chat and messaging routes.
 """
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.database import DatabaseService
-from app.services.vector_store import VectorStoreService
-from app.services.qa_chain import QAChainService
-from app.services.attachment_processor import AttachmentProcessor
+from app.services.registry import get_service
 from app.utils.exceptions import ValidationError
-from app.utils.file_upload import FileUploadService
 
 chat_bp = Blueprint('chat', __name__)
 
 
 def get_services():
-    """Get service instances."""
-    db_service = DatabaseService()
-    vector_service = VectorStoreService(current_app.config['CHROMA_PERSIST_DIR'])
-    qa_service = QAChainService(
-        model_name=current_app.config.get('MODEL_NAME', 'gpt-3.5-turbo'),
-        temperature=current_app.config.get('MODEL_TEMPERATURE', 0.0)
+    """Get the shared service instances for this app."""
+    return (
+        get_service('db'),
+        get_service('vector'),
+        get_service('qa'),
+        get_service('files'),
+        get_service('attachments')
     )
-    file_service = FileUploadService(current_app.config.get('UPLOAD_DIR', 'uploads/attachments'))
-    attachment_processor = AttachmentProcessor()
-    return db_service, vector_service, qa_service, file_service, attachment_processor
 
 
 @chat_bp.route('/sessions', methods=['GET'])
@@ -106,25 +100,22 @@ def get_chat_session(session_id):
         db_service, _, _, _, _ = get_services()
         
         # Get session
-        session = db_service.get_chat_session_by_id(session_id)
+        session = db_service.get_chat_session_by_id_for_user(session_id, user_id)
         
         if not session:
             return jsonify({'error': 'Chat session not found'}), 404
         
-        # Verify user owns the session
-        if session.user_id != user_id:
-            return jsonify({'error': 'Access denied'}), 403
-        
-        # Get messages for the session
-        messages = db_service.get_session_messages(session_id)
+        # Serialize the session's messages as they are fetched
+        messages = db_service.iter_session_messages(session_id)
         
         return jsonify({
             'session': session.to_dict(),
             'messages': [message.to_dict() for message in messages]
         }), 200
         
-    except Exception as e:
-        print(e)
+    except Exception:
+        current_app.logger.exception("Failed to fetch chat session %s", session_id,
+                                     extra={'endpoint': request.endpoint})
         return jsonify({'error': 'Failed to fetch chat session'}), 500
 
 
@@ -157,15 +148,12 @@ def send_message():
         
         db_service, vector_service, qa_service, file_service, attachment_processor = get_services()
         
-        # Get and validate session
-        session = db_service.get_chat_session_by_id(session_id)
+        # Get session, scoped to the current user
+        session = db_service.get_chat_session_by_id_for_user(session_id, user_id)
         
         if not session:
             return jsonify({'error': 'Chat session not found'}), 404
         
-        if session.user_id != user_id:
-            return jsonify({'error': 'Access denied'}), 403
-        
         # Validate message
         message_text = message_text.strip()
         if not qa_service.validate_question(message_text):
@@ -184,8 +172,8 @@ def send_message():
             except ValueError as e:
                 return jsonify({'error': f'File upload error: {str(e)}'}), 400
         
-        # Save user message with attachment info
-        user_message = db_service.save_message(
+        # The user message is stored together with the reply, in one insert
+        user_message = db_service.build_message(
             session_id=session.id,
             sender='user',
             message=message_text,
@@ -212,9 +200,10 @@ def send_message():
                         attachment_content = attachment_processor.create_attachment_context(
                             content_data, message_text
                         )
-                except Exception as attachment_error:
+                except Exception:
                     # Log attachment processing error but continue with regular processing
-                    print(f"Attachment processing error: {attachment_error}")
+                    current_app.logger.exception("Attachment processing error for session %s", session_id,
+                                                 extra={'endpoint': request.endpoint})
                     has_attachment = False
             
             # Create QA chain (with or without attachment support)
@@ -223,10 +212,6 @@ def send_message():
                 attachment_context=has_attachment
             )
             
-            # Get conversation context (optional enhancement)
-            previous_messages = db_service.get_session_messages(session.id)
-            previous_message_dicts = [msg.to_dict() for msg in previous_messages[-6:]]  # Last 3 exchanges
-            
             # Generate AI response with attachment context if available
             if has_attachment and attachment_content:
                 result = qa_service.ask_question_with_attachment(
@@ -235,40 +220,48 @@ def send_message():
             else:
                 result = qa_service.ask_question(qa_chain, message_text)
             
-            # Save AI response
-            ai_message = db_service.save_message(
+        except Exception:
+            # If AI processing fails, still save the user message but return error
+            current_app.logger.exception("Failed to generate AI response for session %s", session_id,
+                                         extra={'endpoint': request.endpoint})
+            result = None
+        
+        # Save both turns; database errors fall through to the 500 handler
+        if result is not None:
+            ai_message = db_service.build_message(
                 session_id=session.id,
                 sender='assistant',
                 message=result['answer'],
                 sources=result.get('sources', [])
             )
-            
-            return jsonify({
-                'userMessage': user_message.to_dict(),
-                'aiMessage': ai_message.to_dict(),
-                'success': True
-            }), 200
-            
-        except Exception as ai_error:
-            # If AI processing fails, still save the user message but return error
-            error_message = db_service.save_message(
+        else:
+            ai_message = db_service.build_message(
                 session_id=session.id,
                 sender='assistant',
                 message="I'm sorry, I encountered an error while processing your question. Please try again.",
                 sources=[]
             )
-            
+        db_service.create_messages([user_message, ai_message])
+        
+        if result is None:
             return jsonify({
                 'userMessage': user_message.to_dict(),
-                'aiMessage': error_message.to_dict(),
+                'aiMessage': ai_message.to_dict(),
                 'error': 'Failed to generate AI response',
                 'success': False
             }), 200
         
+        return jsonify({
+            'userMessage': user_message.to_dict(),
+            'aiMessage': ai_message.to_dict(),
+            'success': True
+        }), 200
+        
     except ValidationError as e:
         return jsonify({'error': str(e)}), 400
-    except Exception as e:
-        print(e)
+    except Exception:
+        current_app.logger.exception("Failed to process message",
+                                     extra={'endpoint': request.endpoint})
         return jsonify({'error': 'Failed to process message'}), 500
 
 
@@ -281,21 +274,19 @@ def get_session_messages(session_id):
         db_service, _, _, _, _ = get_services()
         
         # Verify session exists and user has access
-        session = db_service.get_chat_session_by_id(session_id)
+        session = db_service.get_chat_session_by_id_for_user(session_id, user_id)
         
         if not session:
             return jsonify({'error': 'Chat session not found'}), 404
         
-        if session.user_id != user_id:
-            return jsonify({'error': 'Access denied'}), 403
-        
-        # Get messages
-        messages = db_service.get_session_messages(session_id)
+        # Serialize the session's messages as they are fetched
+        messages = db_service.iter_session_messages(session_id)
         
         return jsonify([message.to_dict() for message in messages]), 200
         
-    except Exception as e:
-        print(e)
+    except Exception:
+        current_app.logger.exception("Failed to fetch messages for session %s", session_id,
+                                     extra={'endpoint': request.endpoint})
         return jsonify({'error': 'Failed to fetch messages'}), 500
 
 
@@ -308,14 +299,11 @@ def delete_chat_session(session_id):
         db_service, _, _, file_service, _ = get_services()
         
         # Verify session exists and user has access
-        session = db_service.get_chat_session_by_id(session_id)
+        session = db_service.get_chat_session_by_id_for_user(session_id, user_id)
         
         if not session:
             return jsonify({'error': 'Chat session not found'}), 404
         
-        if session.user_id != user_id:
-            return jsonify({'error': 'Access denied'}), 403
-        
         # Get all attachment file paths before deleting database records
         attachment_paths = db_service.get_session_attachment_paths(session_id)
         
@@ -377,9 +365,9 @@ def update_message_rating(message_id):
             return jsonify({'error': 'Message not found'}), 404
         
         # Get the session to verify user ownership
-        session = db_service.get_chat_session_by_id(message.session_id)
-        if not session or session.user_id != user_id:
-            return jsonify({'error': 'Access denied'}), 403
+        session = db_service.get_chat_session_by_id_for_user(message.session_id, user_id)
+        if not session:
+            return jsonify({'error': 'Message not found'}), 404
         
         # Only allow rating assistant messages
         if message.sender != 'assistant':
@@ -414,15 +402,11 @@ def update_chat_session(session_id):
         db_service, _, _, _, _ = get_services()
         
         # Get session
-        session = db_service.get_chat_session_by_id(session_id)
+        session = db_service.get_chat_session_by_id_for_user(session_id, user_id)
         
         if not session:
             return jsonify({'error': 'Chat session not found'}), 404
         
-        # Verify user owns the session
-        if session.user_id != user_id:
-            return jsonify({'error': 'Access denied'}), 403
-        
         # Update title if provided
         if 'title' in data:
             title = data['title'].strip()
@@ -439,8 +423,9 @@ def update_chat_session(session_id):
         
         return jsonify({'error': 'No valid fields to update'}), 400
         
-    except Exception as e:
-        print(f"Error updating session: {e}")
+    except Exception:
+        current_app.logger.exception("Error updating session %s", session_id,
+                                     extra={'endpoint': request.endpoint})
         return jsonify({'error': 'Failed to update chat session'}), 500
 
 
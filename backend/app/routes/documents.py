@@ -2,45 +2,41 @@
 Document management routes.
 """
 import os
+import uuid
+from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from app.services.database import DatabaseService
-from app.services.document_loader import DocumentLoader
-from app.services.vector_store import VectorStoreService
-from app.services.document_service import DocumentService
+from app.middleware.auth import current_user_is_admin, require_admin, user_rate_limit_key
+from app.services.document_loader import PDF_MAGIC
+from app.services.document_service import INLINE_CLEANUP_RETRIES
+from app.services.registry import get_service
 from app.utils.exceptions import ValidationError, AuthorizationError
-from app.models import Document
-from app.extensions import db
+from app.extensions import db, celery_app, limiter, task_queue_enabled
+from app.tasks import cleanup_document_task, process_document_task
 
 documents_bp = Blueprint('documents', __name__)
 
 
 def get_services():
-    """Get service instances."""
-    db_service = DatabaseService()
-    doc_loader = DocumentLoader(
-        chunk_size=current_app.config.get('CHUNK_SIZE', 1000),
-        chunk_overlap=current_app.config.get('CHUNK_OVERLAP', 200)
+    """Get the shared service instances for this app."""
+    return (
+        get_service('db'),
+        get_service('doc_loader'),
+        get_service('vector'),
+        get_service('documents')
     )
-    vector_service = VectorStoreService(current_app.config['CHROMA_PERSIST_DIR'])
-    doc_service = DocumentService(db_service)
-    return db_service, doc_loader, vector_service, doc_service
 
 
 @documents_bp.route('/topics/<topic_id>', methods=['POST'])
-@jwt_required()
+@require_admin
 def upload_document(topic_id):
     """Upload a document to a topic (admin only)."""
     try:
         user_id = get_jwt_identity()
         db_service, doc_loader, vector_service, doc_service = get_services()
         
-        # Check if user is admin
-        user = db_service.get_user_by_id(user_id)
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         # Check if topic exists
         topic = db_service.get_topic_by_id(topic_id)
         if not topic:
@@ -56,29 +52,7 @@ def upload_document(topic_id):
             return jsonify({'error': 'Invalid PDF file'}), 400
         
         # Use document service for deduplication and processing
-        result = doc_service.process_document_upload(
-            file=file,
-            topic_id=topic_id,
-            user_id=user_id,
-            upload_folder=current_app.config['UPLOAD_FOLDER']
-        )
-        
-        if result['is_duplicate']:
-            return jsonify({
-                'message': 'Document already exists',
-                'duplicate': True,
-                'existing_document': result['existing_document']
-            }), 200
-        
-        # Update topic document count
-        db_service.increment_topic_document_count(topic_id)
-        
-        return jsonify({
-            'message': 'Document uploaded and processed successfully',
-            'duplicate': False,
-            'document': result['document_record'],
-            'chunksCreated': result['chunks_created']
-        }), 200
+        return handle_upload(file.stream, file.filename, topic_id, user_id, db_service, doc_service)
         
     except ValidationError as e:
         return jsonify({'error': str(e)}), 400
@@ -88,13 +62,104 @@ def upload_document(topic_id):
         return jsonify({'error': f'Failed to upload document: {str(e)}'}), 500
 
 
+@documents_bp.route('/topics/<topic_id>/upload-stream', methods=['POST'])
+@require_admin
+def upload_document_stream(topic_id):
+    """
+    Upload a raw PDF request body to a topic (admin only).
+    
+    The body is copied straight to disk without multipart parsing; the original
+    filename is sent in the X-Filename header.
+    """
+    try:
+        user_id = get_jwt_identity()
+        db_service, _, _, doc_service = get_services()
+        
+        # Check if topic exists
+        topic = db_service.get_topic_by_id(topic_id)
+        if not topic:
+            return jsonify({'error': 'Topic not found'}), 404
+        
+        filename = request.headers.get('X-Filename', '').strip()
+        if not filename.lower().endswith('.pdf'):
+            return jsonify({'error': 'X-Filename header with a .pdf filename is required'}), 400
+        
+        if request.content_length == 0:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        # Reject non-PDF bodies after reading 5 bytes instead of the whole upload
+        header = request.stream.read(len(PDF_MAGIC))
+        if header != PDF_MAGIC:
+            return jsonify({'error': 'Invalid PDF file'}), 400
+        
+        return handle_upload(request.stream, filename, topic_id, user_id, db_service, doc_service,
+                             prefix=header)
+        
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'File too large'}), 413
+    except Exception as e:
+        return jsonify({'error': f'Failed to upload document: {str(e)}'}), 500
+
+
+def handle_upload(stream, filename: str, topic_id: str, user_id: str, db_service, doc_service,
+                  prefix: bytes = b''):
+    """
+    Save an upload and either queue it for background processing or process it inline.
+    
+    With a task queue configured the response is 202 with the job ID; the worker
+    updates the document and topic count when it finishes.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    
+    if not task_queue_enabled(current_app):
+        result = doc_service.process_document_stream(stream, filename, topic_id, user_id, upload_folder, prefix)
+        return upload_response(result, db_service, topic_id)
+    
+    job_id = str(uuid.uuid4())
+    result = doc_service.stage_document_stream(stream, filename, topic_id, user_id, upload_folder, job_id, prefix)
+    if result['is_duplicate']:
+        return duplicate_response(result)
+    
+    process_document_task.apply_async(args=[result['document_record']['id']], task_id=job_id)
+    
+    return jsonify({
+        'message': 'Document uploaded and queued for processing',
+        'duplicate': False,
+        'document': result['document_record'],
+        'jobId': job_id,
+        'status': 'queued'
+    }), 202
+
+
+def duplicate_response(result: dict):
+    """Build the response for an upload that matched an existing document."""
+    return jsonify({
+        'message': 'Document already exists',
+        'duplicate': True,
+        'existing_document': result['existing_document']
+    }), 200
+
+
+def upload_response(result: dict, db_service, topic_id: str):
+    """Build the upload response (the topic count was updated with the document record)."""
+    if result['is_duplicate']:
+        return duplicate_response(result)
+    
+    return jsonify({
+        'message': 'Document uploaded and processed successfully',
+        'duplicate': False,
+        'document': result['document_record'],
+        'chunksCreated': result['chunks_created']
+    }), 200
+
+
 @documents_bp.route('/topics/<topic_id>', methods=['GET'])
 @jwt_required()
 def get_topic_documents(topic_id):
     """Get all documents for a topic."""
     try:
         user_id = get_jwt_identity()
-        db_service, _, _, _ = get_services()
+        db_service, _, _, doc_service = get_services()
         
         # Check if topic exists
         topic = db_service.get_topic_by_id(topic_id)
@@ -102,9 +167,7 @@ def get_topic_documents(topic_id):
             return jsonify({'error': 'Topic not found'}), 404
         
         # Get documents from database
-        documents = Document.query.filter_by(topic_id=topic_id).all()
-        
-        return jsonify([doc.to_dict() for doc in documents]), 200
+        return jsonify(doc_service.get_topic_documents_projection(topic_id)), 200
         
     except Exception as e:
         return jsonify({'error': f'Failed to fetch documents: {str(e)}'}), 500
@@ -112,6 +175,7 @@ def get_topic_documents(topic_id):
 
 @documents_bp.route('/topics/<topic_id>/search', methods=['POST'])
 @jwt_required()
+@limiter.limit('30/minute', key_func=user_rate_limit_key)
 def search_topic_documents(topic_id):
     """Search documents within a topic."""
     try:
@@ -147,13 +211,14 @@ def search_topic_documents(topic_id):
         results = vector_service.search_topic_documents(topic_id, query, k)
         
         # Format results
-        formatted_results = []
-        for doc in results:
-            formatted_results.append({
-                'content': doc.page_content if hasattr(doc, 'page_content') else str(doc),
+        formatted_results = [
+            {
+                'content': doc.page_content,
                 'metadata': doc.metadata,
                 'score': getattr(doc, 'score', None)  # If available
-            })
+            }
+            for doc in results
+        ]
         
         return jsonify({
             'query': query,
@@ -166,46 +231,35 @@ def search_topic_documents(topic_id):
 
 
 @documents_bp.route('/<document_id>', methods=['DELETE'])
-@jwt_required()
+@require_admin
 def delete_document(document_id):
     """Delete a document (admin only)."""
     try:
-        user_id = get_jwt_identity()
-        db_service, _, vector_service, _ = get_services()
-        
-        # Check if user is admin
-        user = db_service.get_user_by_id(user_id)
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
+        db_service, _, _, doc_service = get_services()
         
         # Get document
-        document = Document.query.filter_by(id=document_id).first()
+        document = doc_service.get_active_document(document_id)
         if not document:
             return jsonify({'error': 'Document not found'}), 404
         
-        # Remove from vector store if processed
-        if document.is_processed:
-            try:
-                vector_service.remove_document_from_topic(document.topic_id, document_id)
-            except Exception as e:
-                current_app.logger.warning(f"Failed to remove document from vector store: {e}")
+        # Hide the document and decrement the topic count in one transaction;
+        # vectors, file and row are removed by the cleanup below
+        with db_service.unit_of_work():
+            document.deleted_at = datetime.utcnow()
+            if document.is_processed:
+                db_service.adjust_topic_document_count(document.topic_id, -1, commit=False)
         
-        # Remove file from filesystem
-        if os.path.exists(document.file_path):
+        if task_queue_enabled(current_app):
+            cleanup_document_task.delay(document_id)
+        else:
             try:
-                os.remove(document.file_path)
+                doc_service.cleanup_deleted_document(document_id)
             except Exception as e:
-                current_app.logger.warning(f"Failed to remove file: {e}")
-        
-        # Delete from database
-        db.session.delete(document)
-        db.session.commit()
-        
-        # Update topic document count
-        topic = db_service.get_topic_by_id(document.topic_id)
-        if topic and topic.document_count > 0:
-            topic.document_count -= 1
-            db.session.commit()
+                # The row stays soft-deleted; the sweep below retries it on a later delete
+                current_app.logger.warning(f"Failed to clean up deleted document {document_id}: {e}")
+            # Without a worker there is no periodic sweep, so retry a few earlier failed
+            # cleanups here; a small batch keeps the request's own latency bounded
+            doc_service.cleanup_deleted_documents(limit=INLINE_CLEANUP_RETRIES)
         
         return jsonify({'message': 'Document deleted successfully'}), 200
         
@@ -219,25 +273,28 @@ def download_document(document_id):
     """Download a document."""
     try:
         user_id = get_jwt_identity()
-        db_service, _, _, _ = get_services()
+        _, _, _, doc_service = get_services()
         
         # Get document
-        document = Document.query.filter_by(id=document_id).first()
+        document = doc_service.get_active_document(document_id)
         if not document:
             return jsonify({'error': 'Document not found'}), 404
         
-        # Check if file exists
-        if not os.path.exists(document.file_path):
-            return jsonify({'error': 'File not found on disk'}), 404
-        
-        # Send file
+        # Send file; the stored SHA-256 doubles as a strong ETag so cached copies get a 304.
+        # send_file stats the path itself, so a missing file surfaces as FileNotFoundError
+        # rather than paying for a separate exists() check
         return send_file(
             document.file_path,
             as_attachment=True,
             download_name=document.original_filename,
-            mimetype='application/pdf'
+            mimetype='application/pdf',
+            conditional=True,
+            etag=document.file_hash,
+            last_modified=document.updated_at
         )
         
+    except FileNotFoundError:
+        return jsonify({'error': 'File not found on disk'}), 404
     except Exception as e:
         return jsonify({'error': f'Failed to download document: {str(e)}'}), 500
 
@@ -248,10 +305,10 @@ def get_document_details(document_id):
     """Get detailed information about a specific document."""
     try:
         user_id = get_jwt_identity()
-        db_service, _, _, _ = get_services()
+        _, _, _, doc_service = get_services()
         
         # Get document
-        document = Document.query.filter_by(id=document_id).first()
+        document = doc_service.get_active_document(document_id)
         if not document:
             return jsonify({'error': 'Document not found'}), 404
         
@@ -262,20 +319,14 @@ def get_document_details(document_id):
 
 
 @documents_bp.route('/<document_id>/reprocess', methods=['POST'])
-@jwt_required()
+@require_admin
 def reprocess_document(document_id):
     """Reprocess a document (admin only)."""
     try:
-        user_id = get_jwt_identity()
         db_service, doc_loader, vector_service, doc_service = get_services()
         
-        # Check if user is admin
-        user = db_service.get_user_by_id(user_id)
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         # Get document
-        document = Document.query.filter_by(id=document_id).first()
+        document = doc_service.get_active_document(document_id)
         if not document:
             return jsonify({'error': 'Document not found'}), 404
         
@@ -283,8 +334,20 @@ def reprocess_document(document_id):
         if not os.path.exists(document.file_path):
             return jsonify({'error': 'File not found on disk'}), 404
         
-        # Reprocess the document
-        result = doc_service.reprocess_document(document_id)
+        # Reprocess the document, in the background when a task queue is configured
+        if task_queue_enabled(current_app):
+            job_id = str(uuid.uuid4())
+            document.job_id = job_id
+            db.session.commit()
+            process_document_task.apply_async(args=[document_id], task_id=job_id)
+            return jsonify({
+                'message': 'Document queued for reprocessing',
+                'document': document.to_dict(),
+                'jobId': job_id,
+                'status': 'queued'
+            }), 202
+        
+        result = doc_service.process_document_by_id(document_id)
         
         return jsonify({
             'message': 'Document reprocessed successfully',
@@ -296,6 +359,38 @@ def reprocess_document(document_id):
         return jsonify({'error': f'Failed to reprocess document: {str(e)}'}), 500
 
 
+@documents_bp.route('/<document_id>/status', methods=['GET'])
+@jwt_required()
+def get_document_status(document_id):
+    """Get the processing status of a document (admins and the uploader only)."""
+    try:
+        doc_service = get_service('documents')
+        document = doc_service.get_active_document(document_id)
+        if not document:
+            return jsonify({'error': 'Document not found'}), 404
+        
+        if document.uploaded_by != get_jwt_identity() and not current_user_is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if document.is_processed:
+            status = 'processed'
+        elif document.job_id and task_queue_enabled(current_app):
+            status = celery_app.AsyncResult(document.job_id).state.lower()
+        else:
+            status = 'pending'
+        
+        return jsonify({
+            'documentId': document.id,
+            'jobId': document.job_id,
+            'isProcessed': document.is_processed,
+            'chunkCount': document.chunk_count,
+            'status': status
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch document status: {str(e)}'}), 500
+
+
 # Error handlers for documents blueprint
 @documents_bp.errorhandler(ValidationError)
 def handle_validation_error(e):
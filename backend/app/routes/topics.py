@@ -1,20 +1,19 @@
 """
 Topics management routes.
 """
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.database import DatabaseService
-from app.services.vector_store import VectorStoreService
+from app.middleware.auth import require_admin, user_rate_limit_key
+from app.extensions import limiter
+from app.services.registry import get_service
 from app.utils.exceptions import ValidationError, AuthorizationError
 
 topics_bp = Blueprint('topics', __name__)
 
 
 def get_services():
-    """Get service instances."""
-    db_service = DatabaseService()
-    vector_service = VectorStoreService(current_app.config['CHROMA_PERSIST_DIR'])
-    return db_service, vector_service
+    """Get the shared service instances for this app."""
+    return get_service('db'), get_service('vector')
 
 
 @topics_bp.route('', methods=['GET'])
@@ -23,27 +22,20 @@ def get_topics():
     """Get all topics."""
     try:
         db_service, vector_service = get_services()
-        topics = db_service.get_all_topics()
-        
-        return jsonify([topic.to_dict() for topic in topics]), 200
+        return jsonify(db_service.get_all_topics_projection()), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch topics'}), 500
 
 
 @topics_bp.route('', methods=['POST'])
-@jwt_required()
+@require_admin
 def create_topic():
     """Create a new topic (admin only)."""
     try:
         user_id = get_jwt_identity()
         db_service, vector_service = get_services()
         
-        # Check if user is admin
-        user = db_service.get_user_by_id(user_id)
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         
         # Validate input
@@ -53,12 +45,7 @@ def create_topic():
         if not data['name'].strip():
             return jsonify({'error': 'Topic name cannot be empty'}), 400
         
-        # Check for duplicate topic names
-        existing_topics = db_service.get_all_topics()
-        if any(topic.name.lower() == data['name'].strip().lower() for topic in existing_topics):
-            return jsonify({'error': 'Topic with this name already exists'}), 400
-        
-        # Create topic
+        # Create topic (duplicate names are rejected by a unique index on lower(name))
         topic = db_service.create_topic(
             name=data['name'].strip(),
             description=data['description'].strip(),
@@ -70,7 +57,7 @@ def create_topic():
             'message': 'Topic created successfully'
         }), 201
         
-    except ValidationError as e:
+    except (ValidationError, ValueError) as e:
         return jsonify({'error': str(e)}), 400
     except AuthorizationError as e:
         return jsonify({'error': str(e)}), 403
@@ -102,18 +89,12 @@ def get_topic(topic_id):
 
 
 @topics_bp.route('/<topic_id>', methods=['PUT'])
-@jwt_required()
+@require_admin
 def update_topic(topic_id):
     """Update a topic (admin only)."""
     try:
-        user_id = get_jwt_identity()
         db_service, vector_service = get_services()
         
-        # Check if user is admin
-        user = db_service.get_user_by_id(user_id)
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         # Check if topic exists
         topic = db_service.get_topic_by_id(topic_id)
         if not topic:
@@ -130,18 +111,12 @@ def update_topic(topic_id):
 
 
 @topics_bp.route('/<topic_id>', methods=['DELETE'])
-@jwt_required()
+@require_admin
 def delete_topic(topic_id):
     """Delete a topic and its associated data (admin only)."""
     try:
-        user_id = get_jwt_identity()
         db_service, vector_service = get_services()
         
-        # Check if user is admin
-        user = db_service.get_user_by_id(user_id)
-        if not user or user.role != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         # Check if topic exists
         topic = db_service.get_topic_by_id(topic_id)
         if not topic:
@@ -161,6 +136,7 @@ def delete_topic(topic_id):
 
 @topics_bp.route('/<topic_id>/search', methods=['POST'])
 @jwt_required()
+@limiter.limit('30/minute', key_func=user_rate_limit_key)
 def search_topic_documents(topic_id):
     """Search documents within a topic."""
     try:
@@ -185,18 +161,28 @@ def search_topic_documents(topic_id):
         if k > 10:  # Limit maximum results
             k = 10
         
+        # Nothing indexed yet: answer without opening the vector store
+        if not vector_service.topic_index_exists(topic_id):
+            return jsonify({
+                'query': query,
+                'results': [],
+                'totalResults': 0,
+                'message': 'No documents indexed for this topic'
+            }), 200
+        
         # Search documents
         results = vector_service.search_topic_documents(topic_id, query, k)
         
         # Format results
-        formatted_results = []
-        for i, doc in enumerate(results):
-            formatted_results.append({
+        formatted_results = [
+            {
                 'id': i,
                 'content': doc.page_content,
                 'metadata': doc.metadata,
                 'score': getattr(doc, 'score', None)  # If available
-            })
+            }
+            for i, doc in enumerate(results)
+        ]
         
         return jsonify({
             'query': query,
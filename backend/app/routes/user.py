@@ -3,8 +3,9 @@ User profile management routes.
 """
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from app.services.database import DatabaseService
+from app.extensions import limiter
+from app.middleware.auth import user_rate_limit_key
+from app.services.registry import get_service
 from app.utils.validators import validate_email, validate_password
 from app.utils.exceptions import ValidationError, AuthenticationError
 
@@ -12,8 +13,8 @@ user_bp = Blueprint('user', __name__)
 
 
 def get_db_service():
-    """Get database service instance."""
-    return DatabaseService()
+    """Get the shared database service instance."""
+    return get_service('db')
 
 
 @user_bp.route('/profile', methods=['GET'])
@@ -24,13 +25,13 @@ def get_profile():
         user_id = get_jwt_identity()
         db_service = get_db_service()
         
-        user = db_service.get_user_by_id(user_id)
+        user = db_service.get_user_profile(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         return jsonify({
-            'user': user.to_dict()
+            'user': user
         }), 200
         
     except Exception as e:
@@ -104,6 +105,7 @@ def update_profile():
 
 @user_bp.route('/change-password', methods=['PUT'])
 @jwt_required()
+@limiter.limit('5/minute', key_func=user_rate_limit_key)
 def change_password():
     """Change user password."""
     try:
@@ -132,11 +134,11 @@ def change_password():
             return jsonify({'error': 'User not found'}), 404
         
         # Verify current password
-        if not check_password_hash(current_user.password_hash, current_password):
+        if not db_service.verify_user_password(current_user, current_password):
             return jsonify({'error': 'Current password is incorrect'}), 400
         
-        # Check if new password is different from current
-        if check_password_hash(current_user.password_hash, new_password):
+        # Check if new password is different from current (plain comparison, no second KDF run)
+        if new_password == current_password:
             return jsonify({'error': 'New password must be different from current password'}), 400
         
         # Update password
@@ -163,8 +165,7 @@ def get_user_stats():
         db_service = get_db_service()
         
         # Verify user exists
-        user = db_service.get_user_by_id(user_id)
-        if not user:
+        if not db_service.get_user_profile(user_id):
             return jsonify({'error': 'User not found'}), 404
         
         stats = db_service.get_user_stats(user_id)
@@ -187,8 +188,7 @@ def get_user_nps_analytics():
         db_service = get_db_service()
         
         # Verify user exists
-        user = db_service.get_user_by_id(user_id)
-        if not user:
+        if not db_service.get_user_profile(user_id):
             return jsonify({'error': 'User not found'}), 404
         
         # Get query parameters
@@ -2,21 +2,137 @@
 Attachment processing service for handling various file types in chat messages.
 This service extracts content from uploaded attachments to provide context to the AI.
 """
+import codecs
+import csv
+import gc
+import importlib
+import io
+import json
 import os
 import tempfile
-from typing import Optional, Dict, List
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple
 from pathlib import Path
 import mimetypes
 
 from langchain_community.document_loaders import (
     PyPDFLoader,
-    TextLoader,
     UnstructuredWordDocumentLoader,
     UnstructuredExcelLoader,
     UnstructuredPowerPointLoader
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+from cachetools import LRUCache
+import charset_normalizer
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # calamine is optional; spreadsheets fall back to openpyxl/Unstructured
+    CalamineWorkbook = None
+
+try:
+    from kreuzberg import extract_file_sync
+except ImportError:  # kreuzberg is optional; legacy Office formats fall back to Unstructured
+    extract_file_sync = None
+
+from app.utils.helpers import cleanup_old_files, hash_file
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# How much of an attachment is passed to the model as context
+MAX_CONTEXT_CHARS = 4000
+MAX_CONTEXT_CHUNKS = 10
+
+# Formats whose parsers are CPU-bound Python; sent to the process pool when enabled
+CPU_BOUND_TYPES = frozenset({'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'})
+
+# Attachments above this size trigger a full garbage collection after parsing
+GC_AFTER_BYTES = 5 * 1024 * 1024
+
+# Read size used when scanning attachments in blocks (CSV row counts)
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Minimum seconds between sweeps of expired entries from the on-disk extraction cache
+CACHE_PRUNE_INTERVAL = 3600
+
+# Bytes of a non-UTF-8 text attachment sampled for encoding detection
+TEXT_DETECT_BYTES = 64 * 1024
+
+# CSV attachments are summarised from their first rows plus a streamed line count
+CSV_SAMPLE_ROWS = 10
+CSV_HEAD_BYTES = 64 * 1024
+
+# Parser packages the processors import on first use
+PARSER_MODULES = (
+    'pypdf',
+    'docx',
+    'openpyxl',
+    'pptx',
+    'unstructured.partition.doc',
+    'unstructured.partition.xlsx',
+    'unstructured.partition.ppt',
+)
+
+# Question sent to the QA chain when an attachment's content is available
+ATTACHMENT_CONTEXT_TEMPLATE = (
+    "The user has uploaded a file named '{filename}' and is asking a question about it.\n"
+    "\n"
+    "File Content:\n"
+    "{content}\n"
+    "\n"
+    "User's Question: {question}\n"
+    "\n"
+    "Please answer the user's question based on both the uploaded file content and any relevant "
+    "information from the course materials. If the question is specifically about the uploaded "
+    "file, prioritize information from the file content."
+)
+
+
+class _ParagraphSplitter(RecursiveCharacterTextSplitter):
+    """
+    Recursive splitter with a str.split fast path for paragraph-separated text.
+    
+    When the text contains blank lines and every paragraph fits in a chunk, the
+    stock splitter never recurses; it only regex-searches for the separator and
+    regex-splits on it. Doing that split with str.split gives the same chunks.
+    """
+    
+    PARAGRAPH_SEPARATOR = "\n\n"
+    
+    def split_text(self, text: str) -> List[str]:
+        if self._separators[0] == self.PARAGRAPH_SEPARATOR and self.PARAGRAPH_SEPARATOR in text:
+            first, *rest = text.split(self.PARAGRAPH_SEPARATOR)
+            # Kept separators lead the paragraph that follows them, as in the stock splitter
+            splits = [first] if first else []
+            splits.extend(self.PARAGRAPH_SEPARATOR + paragraph for paragraph in rest)
+            if self._keep_separator and all(len(split) < self._chunk_size for split in splits):
+                return self._merge_splits(splits, "")
+        return super().split_text(text)
+
+
+@lru_cache(maxsize=8)
+def _get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Build one splitter per chunking configuration and share it between processors."""
+    return _ParagraphSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+
+def _extract_in_subprocess(chunk_size: int, chunk_overlap: int, file_path: str,
+                           original_filename: str, extension: str, file_size: int) -> tuple[Dict, bool]:
+    """Process-pool entry point: extract with a processor local to the worker process."""
+    return _get_worker_processor(chunk_size, chunk_overlap)._extract_uncached(
+        file_path, original_filename, extension, file_size
+    )
 
 
 class AttachmentProcessor:
@@ -27,31 +143,55 @@ class AttachmentProcessor:
         '.pdf': 'process_pdf',
         '.txt': 'process_text',
         '.doc': 'process_word',
-        '.docx': 'process_word',
+        '.docx': 'process_docx',
         '.xls': 'process_excel',
-        '.xlsx': 'process_excel',
+        '.xlsx': 'process_xlsx',
         '.ppt': 'process_powerpoint',
-        '.pptx': 'process_powerpoint',
+        '.pptx': 'process_pptx',
         '.csv': 'process_csv',
         '.rtf': 'process_text',
     }
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
-        """Initialize the attachment processor."""
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50,
+                 cache_dir: Optional[str] = None, memory_cache_size: int = 128,
+                 process_workers: int = 0, cache_max_age_days: int = 7):
+        """
+        Initialize the attachment processor.
+        
+        Extraction results are cached by file content in memory and, when
+        ``cache_dir`` is set, as JSON files there, so re-uploads aren't re-parsed.
+        Disk entries not used for ``cache_max_age_days`` are swept as new ones are written.
+        With ``process_workers`` > 0, CPU-bound formats are parsed in a process pool.
+        """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
+        self.process_workers = process_workers
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self.cache_dir = cache_dir
+        self.cache_max_age_days = cache_max_age_days
+        self._next_cache_prune = 0.0
+        self._cache = LRUCache(maxsize=memory_cache_size)
+        self._cache_lock = threading.Lock()
+        # (path, mtime, size) -> content digest, so an unchanged file isn't re-hashed
+        self._digests = LRUCache(maxsize=memory_cache_size)
+        self.text_splitter = _get_text_splitter(chunk_size, chunk_overlap)
+        
+        # Extension -> bound processor method, resolved once instead of per file
+        self._processors = {
+            extension: getattr(self, method_name)
+            for extension, method_name in self.SUPPORTED_TYPES.items()
+        }
+        
+        # Characters a processor needs to read to fill the context (the char limit
+        # and enough text for MAX_CONTEXT_CHUNKS chunks, plus one chunk of slack)
+        self.extraction_budget = max(MAX_CONTEXT_CHARS, MAX_CONTEXT_CHUNKS * chunk_size) + chunk_size
     
     def is_supported_file(self, filename: str) -> bool:
         """Check if file type is supported for content extraction."""
         if not filename:
             return False
         extension = Path(filename).suffix.lower()
-        return extension in self.SUPPORTED_TYPES
+        return extension in self._processors
     
     def extract_content(self, file_path: str, original_filename: str) -> Optional[Dict]:
         """
@@ -65,151 +205,454 @@ class AttachmentProcessor:
             Dictionary containing extracted content and metadata
         """
         try:
-            if not os.path.exists(file_path):
-                return None
-            
+            file_stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        
+        try:
             extension = Path(original_filename).suffix.lower()
-            
-            if not self.is_supported_file(original_filename):
+            if extension not in self._processors:
                 return {
                     'content': f"File '{original_filename}' uploaded but content extraction not supported for this file type.",
                     'chunks': [],
                     'metadata': {
                         'filename': original_filename,
-                        'file_size': os.path.getsize(file_path),
+                        'file_size': file_stat.st_size,
                         'supported': False
                     }
                 }
             
-            # Get the appropriate processor method
-            processor_method = getattr(self, self.SUPPORTED_TYPES[extension])
+            # Identical files (same bytes, type and chunking) extract identically
+            cache_key = self._cache_key(file_path, file_stat, extension)
+            cached = self._get_cached(cache_key)
+            if cached is not None:
+                return {**cached, 'metadata': {**cached['metadata'], 'filename': original_filename}}
             
-            # Extract content using the appropriate processor
-            documents = processor_method(file_path)
+            # Parsing heavy formats in a separate process keeps it from holding the
+            # GIL that this worker's other request threads need
+            if self.process_workers and extension in CPU_BOUND_TYPES:
+                result, cacheable = self._get_process_pool().submit(
+                    _extract_in_subprocess, self.chunk_size, self.chunk_overlap,
+                    file_path, original_filename, extension, file_stat.st_size
+                ).result()
+            else:
+                result, cacheable = self._extract_uncached(
+                    file_path, original_filename, extension, file_stat.st_size
+                )
             
-            if not documents:
-                return {
-                    'content': f"No content could be extracted from '{original_filename}'.",
-                    'chunks': [],
-                    'metadata': {
-                        'filename': original_filename,
-                        'file_size': os.path.getsize(file_path),
-                        'supported': True
-                    }
-                }
-            
-            # Split into chunks for better processing
-            chunks = self.text_splitter.split_documents(documents)
-            
-            # Combine all content for context
-            full_content = "\n".join([doc.page_content for doc in documents])
-            
-            # Limit content length to prevent overwhelming the AI
-            if len(full_content) > 4000:  # Reasonable limit for context
-                full_content = full_content[:4000] + "\n... [Content truncated]"
+            if cacheable:
+                self._store_cached(cache_key, result)
+            return result
             
+        except Exception as e:
+            # Parser errors propagate from the process_* methods with their tracebacks
+            logger.warning("Could not extract content from '%s'", original_filename, exc_info=True)
             return {
-                'content': full_content,
-                'chunks': [chunk.page_content for chunk in chunks[:10]],  # Limit chunks
+                'content': f"Error processing '{original_filename}': {str(e)}",
+                'chunks': [],
                 'metadata': {
                     'filename': original_filename,
-                    'file_size': os.path.getsize(file_path),
-                    'supported': True,
-                    'chunk_count': len(chunks),
-                    'content_length': len(full_content)
+                    'file_size': file_stat.st_size,
+                    'supported': False,
+                    'error': str(e)
                 }
             }
-            
-        except Exception as e:
+    
+    def _extract_uncached(self, file_path: str, original_filename: str, extension: str,
+                          file_size: int) -> tuple[Dict, bool]:
+        """
+        Run the processor for a supported file and build the extract_content result.
+        
+        Returns:
+            Tuple of (result, whether the result may be cached)
+        """
+        processor_method = self._processors[extension]
+        
+        # Extract content using the appropriate processor; processors may yield
+        # pages lazily, so stop parsing once there is enough for the context
+        full_content, chunks = self._collect_context(
+            processor_method(file_path, max_chars=self.extraction_budget)
+        )
+        
+        if file_size > GC_AFTER_BYTES:
+            # Parsers (pypdf, unstructured) leave reference cycles behind; reclaim
+            # them now rather than letting a large file's objects linger until
+            # the next generational collection
+            gc.collect()
+        
+        if full_content is None:
             return {
-                'content': f"Error processing '{original_filename}': {str(e)}",
+                'content': f"No content could be extracted from '{original_filename}'.",
                 'chunks': [],
                 'metadata': {
                     'filename': original_filename,
-                    'file_size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
-                    'supported': False,
-                    'error': str(e)
+                    'file_size': file_size,
+                    'supported': True
                 }
+            }, False
+        
+        result = {
+            'content': full_content,
+            'chunks': chunks,
+            'metadata': {
+                'filename': original_filename,
+                'file_size': file_size,
+                'supported': True,
+                'chunk_count': len(chunks),
+                'content_length': len(full_content)
             }
+        }
+        return result, True
     
-    def process_pdf(self, file_path: str) -> List[Document]:
-        """Process PDF file."""
-        try:
-            loader = PyPDFLoader(file_path)
-            return loader.load()
-        except Exception as e:
-            raise Exception(f"Failed to process PDF: {str(e)}")
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Start the extraction process pool on first use."""
+        if self._process_pool is None:
+            with self._cache_lock:
+                if self._process_pool is None:
+                    # Spawn rather than fork: forking a threaded server process is unsafe
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.process_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=warm_up_parsers
+                    )
+        return self._process_pool
     
-    def process_text(self, file_path: str) -> List[Document]:
-        """Process text file (txt, rtf)."""
-        try:
-            loader = TextLoader(file_path, encoding='utf-8')
-            return loader.load()
-        except UnicodeDecodeError:
-            # Try with different encoding
-            try:
-                loader = TextLoader(file_path, encoding='latin-1')
-                return loader.load()
-            except Exception as e:
-                raise Exception(f"Failed to process text file: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Failed to process text file: {str(e)}")
+    def _cache_key(self, file_path: str, file_stat: os.stat_result, extension: str) -> str:
+        """Key extraction results by file content, type and chunking settings."""
+        stat_key = (file_path, file_stat.st_mtime_ns, file_stat.st_size)
+        with self._cache_lock:
+            digest = self._digests.get(stat_key)
+        if digest is None:
+            digest = hash_file(file_path)
+            with self._cache_lock:
+                self._digests[stat_key] = digest
+        return f"{digest}-{extension.lstrip('.')}-{self.chunk_size}-{self.chunk_overlap}"
     
-    def process_word(self, file_path: str) -> List[Document]:
-        """Process Word document (doc, docx)."""
+    def _get_cached(self, key: str) -> Optional[Dict]:
+        """Look up an extraction result in memory, then on disk."""
+        with self._cache_lock:
+            result = self._cache.get(key)
+        if result is not None or not self.cache_dir:
+            return result
+        
+        path = os.path.join(self.cache_dir, f'{key}.json')
         try:
-            loader = UnstructuredWordDocumentLoader(file_path)
-            return loader.load()
-        except Exception as e:
-            raise Exception(f"Failed to process Word document: {str(e)}")
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # Refresh the mtime so entries in use aren't swept as expired
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        
+        with self._cache_lock:
+            self._cache[key] = result
+        return result
     
-    def process_excel(self, file_path: str) -> List[Document]:
-        """Process Excel file (xls, xlsx)."""
+    def _store_cached(self, key: str, result: Dict) -> None:
+        """Remember an extraction result; disk write failures only cost a future re-parse."""
+        with self._cache_lock:
+            self._cache[key] = result
+        if not self.cache_dir:
+            return
+        
+        path = os.path.join(self.cache_dir, f'{key}.json')
         try:
-            loader = UnstructuredExcelLoader(file_path)
-            return loader.load()
-        except Exception as e:
-            raise Exception(f"Failed to process Excel file: {str(e)}")
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write attachment cache entry %s: %s", key, e)
+        
+        self._prune_disk_cache()
+    
+    def _prune_disk_cache(self) -> None:
+        """Delete disk cache entries unused for cache_max_age_days, at most once per CACHE_PRUNE_INTERVAL."""
+        now = time.monotonic()
+        with self._cache_lock:
+            if now < self._next_cache_prune:
+                return
+            self._next_cache_prune = now + CACHE_PRUNE_INTERVAL
+        
+        removed = cleanup_old_files(self.cache_dir, self.cache_max_age_days)
+        if removed:
+            logger.info("Removed %d expired attachment cache entries", removed)
+    
+    def _collect_context(self, documents: Iterable[Document]) -> tuple[Optional[str], List[str]]:
+        """
+        Read documents until there is enough text and chunks for the model context.
+        
+        Each document is split on its own (as split_documents would), so stopping
+        early yields the same leading content and chunks as processing everything.
+        Page text is copied into the context only up to the truncation point, and
+        pages are split only until MAX_CONTEXT_CHUNKS chunks have been produced.
+        
+        Returns:
+            Tuple of (newline-joined page text, cut at MAX_CONTEXT_CHARS with a
+            truncation marker, or None if there were no documents; the first
+            MAX_CONTEXT_CHUNKS chunk texts)
+        """
+        buffer = io.StringIO()
+        chunks = []
+        content_length = -1  # No separator before the first page
+        
+        for doc in documents:
+            # tell() is the number of characters written so far
+            if buffer.tell() < MAX_CONTEXT_CHARS:
+                if content_length >= 0:
+                    buffer.write("\n")
+                buffer.write(doc.page_content[:MAX_CONTEXT_CHARS - buffer.tell()])
+            content_length += len(doc.page_content) + 1
+            if len(chunks) < MAX_CONTEXT_CHUNKS:
+                chunks.extend(self._leading_chunks(doc.page_content, MAX_CONTEXT_CHUNKS - len(chunks)))
+            
+            if content_length > MAX_CONTEXT_CHARS and len(chunks) >= MAX_CONTEXT_CHUNKS:
+                break
+        
+        if content_length < 0:
+            return None, chunks
+        if content_length > MAX_CONTEXT_CHARS:
+            # Limit content length to prevent overwhelming the AI
+            buffer.write("\n... [Content truncated]")
+        return buffer.getvalue(), chunks
+    
+    def _leading_chunks(self, text: str, count: int) -> List[str]:
+        """Split just enough of a page's text to produce its first ``count`` chunks."""
+        if len(text) <= self.chunk_size:
+            # The splitter would return the whole (stripped) text as one chunk
+            text = text.strip()
+            return [text] if text else []
+        
+        # The splitter merges pieces left to right, so the leading chunks only
+        # depend on a prefix of the text; two chunk sizes per chunk is ample
+        window = (count + 1) * self.chunk_size * 2
+        return self.text_splitter.split_text(text[:window])[:count]
     
-    def process_powerpoint(self, file_path: str) -> List[Document]:
-        """Process PowerPoint file (ppt, pptx)."""
+    def process_pdf(self, file_path: str, max_chars: Optional[int] = None) -> Iterator[Document]:
+        """Process PDF file page by page, stopping once ``max_chars`` have been read."""
+        total = 0
+        for page in PyPDFLoader(file_path).lazy_load():
+            yield page
+            total += len(page.page_content)
+            if max_chars is not None and total > max_chars:
+                break
+    
+    def process_text(self, file_path: str, max_chars: Optional[int] = None) -> List[Document]:
+        """
+        Process text file (txt, rtf), reading at most ``max_chars`` characters.
+        
+        The bytes are read once; UTF-8 is tried first and anything else is decoded
+        with the encoding charset-normalizer detects.
+        """
+        with open(file_path, 'rb') as f:
+            # A character is at most 4 bytes in any encoding we expect to see
+            raw = f.read(-1 if max_chars is None else max_chars * 4)
+        
         try:
-            loader = UnstructuredPowerPointLoader(file_path)
-            return loader.load()
-        except Exception as e:
-            raise Exception(f"Failed to process PowerPoint file: {str(e)}")
+            # Incremental so a multi-byte character cut off by the read isn't an error
+            text = codecs.getincrementaldecoder('utf-8')().decode(raw)
+        except UnicodeDecodeError:
+            match = charset_normalizer.from_bytes(raw[:TEXT_DETECT_BYTES]).best()
+            text = raw.decode(match.encoding if match else 'latin-1', errors='replace')
+        
+        if max_chars is not None:
+            text = text[:max_chars]
+        return [Document(page_content=text, metadata={'source': file_path})]
+    
+    def process_docx(self, file_path: str, max_chars: Optional[int] = None) -> List[Document]:
+        """Process Word document (docx) with python-docx, skipping the unstructured pipeline."""
+        from docx import Document as DocxDocument
+        
+        docx = DocxDocument(file_path)
+        paragraphs = (paragraph.text for paragraph in docx.paragraphs if paragraph.text.strip())
+        table_rows = (
+            " | ".join(cell.text.strip() for cell in row.cells)
+            for table in docx.tables for row in table.rows
+        )
+        
+        lines, total = [], 0
+        for line in chain(paragraphs, table_rows):
+            lines.append(line)
+            total += len(line) + 1
+            if max_chars is not None and total > max_chars:
+                break
+        
+        if not lines:
+            return []
+        return [Document(page_content="\n".join(lines), metadata={'source': file_path, 'type': 'docx'})]
     
-    def process_csv(self, file_path: str) -> List[Document]:
-        """Process CSV file."""
+    def process_xlsx(self, file_path: str, max_chars: Optional[int] = None) -> Iterator[Document]:
+        """Process Excel workbook (xlsx) sheet by sheet, with calamine if installed, else openpyxl."""
+        if CalamineWorkbook is not None:
+            yield from self._read_calamine(file_path, 'xlsx', max_chars)
+            return
+        
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
         try:
-            import pandas as pd
-            
-            # Read CSV and convert to text representation
-            df = pd.read_csv(file_path)
+            sheets = ((sheet.title, sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets)
+            yield from self._sheet_documents(sheets, file_path, 'xlsx', max_chars)
+        finally:
+            # Read-only workbooks keep the file open until closed
+            workbook.close()
+    
+    def _read_calamine(self, file_path: str, file_type: str, max_chars: Optional[int]) -> Iterator[Document]:
+        """Read a workbook with calamine's native parser, one sheet at a time."""
+        workbook = CalamineWorkbook.from_path(file_path)
+        sheets = (
+            (name, workbook.get_sheet_by_name(name).to_python(skip_empty_area=True))
+            for name in workbook.sheet_names
+        )
+        return self._sheet_documents(sheets, file_path, file_type, max_chars)
+    
+    @staticmethod
+    def _sheet_documents(sheets: Iterable[Tuple[str, Iterable[tuple]]], file_path: str,
+                         file_type: str, max_chars: Optional[int]) -> Iterator[Document]:
+        """Render (title, rows) pairs as tab-separated sheet documents, stopping at ``max_chars``."""
+        total = 0
+        for title, rows in sheets:
+            lines = []
+            for row in rows:
+                if all(value is None or value == '' for value in row):
+                    continue
+                line = "\t".join('' if value is None else str(value) for value in row)
+                lines.append(line)
+                total += len(line) + 1
+                if max_chars is not None and total > max_chars:
+                    break
             
-            # Create a text representation of the CSV
-            content = f"CSV File Content:\n"
-            content += f"Columns: {', '.join(df.columns.tolist())}\n"
-            content += f"Number of rows: {len(df)}\n\n"
+            if lines:
+                yield Document(
+                    page_content=f"Sheet: {title}\n" + "\n".join(lines),
+                    metadata={'source': file_path, 'type': file_type, 'sheet': title}
+                )
+            if max_chars is not None and total > max_chars:
+                break
+    
+    def process_pptx(self, file_path: str, max_chars: Optional[int] = None) -> Iterator[Document]:
+        """Process PowerPoint presentation (pptx) slide by slide with python-pptx."""
+        from pptx import Presentation
+        
+        total = 0
+        for number, slide in enumerate(Presentation(file_path).slides, start=1):
+            texts = [
+                shape.text_frame.text for shape in slide.shapes
+                if shape.has_text_frame and shape.text_frame.text.strip()
+            ]
+            if texts:
+                content = "\n".join(texts)
+                yield Document(
+                    page_content=content,
+                    metadata={'source': file_path, 'type': 'pptx', 'page': number}
+                )
+                total += len(content)
+                if max_chars is not None and total > max_chars:
+                    break
+    
+    def process_word(self, file_path: str, max_chars: Optional[int] = None) -> List[Document]:
+        """Process legacy Word document (doc)."""
+        if extract_file_sync is not None:
+            return self._extract_native(file_path, 'doc', max_chars)
+        loader = UnstructuredWordDocumentLoader(file_path)
+        return loader.load()
+    
+    def process_excel(self, file_path: str, max_chars: Optional[int] = None) -> List[Document]:
+        """Process legacy Excel file (xls)."""
+        if CalamineWorkbook is not None:
+            return list(self._read_calamine(file_path, 'xls', max_chars))
+        if extract_file_sync is not None:
+            return self._extract_native(file_path, 'xls', max_chars)
+        loader = UnstructuredExcelLoader(file_path)
+        return loader.load()
+    
+    def process_powerpoint(self, file_path: str, max_chars: Optional[int] = None) -> List[Document]:
+        """Process legacy PowerPoint file (ppt)."""
+        if extract_file_sync is not None:
+            return self._extract_native(file_path, 'ppt', max_chars)
+        loader = UnstructuredPowerPointLoader(file_path)
+        return loader.load()
+    
+    @staticmethod
+    def _extract_native(file_path: str, file_type: str, max_chars: Optional[int]) -> List[Document]:
+        """Extract a legacy Office file with kreuzberg instead of the unstructured pipeline."""
+        content = extract_file_sync(file_path).content
+        if max_chars is not None:
+            content = content[:max_chars]
+        if not content.strip():
+            return []
+        return [Document(page_content=content, metadata={'source': file_path, 'type': file_type})]
+    
+    def process_csv(self, file_path: str, max_chars: Optional[int] = None) -> List[Document]:
+        """
+        Process CSV file.
+        
+        Only the first CSV_HEAD_BYTES are parsed (for the header and sample rows);
+        the row count comes from a newline scan, so large files cost bounded memory.
+        """
+        with open(file_path, 'rb') as f:
+            head_bytes = f.read(CSV_HEAD_BYTES)
+            truncated = os.fstat(f.fileno()).st_size > len(head_bytes)
             
-            # Add first few rows as sample
-            if len(df) > 0:
-                content += "Sample data:\n"
-                content += df.head(10).to_string(index=False)
-                
-                if len(df) > 10:
-                    content += f"\n... and {len(df) - 10} more rows"
+            line_count = head_bytes.count(b'\n')
+            last_byte = head_bytes[-1:]
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                line_count += block.count(b'\n')
+                last_byte = block[-1:]
+        
+        # A final line without a trailing newline still counts
+        if last_byte and last_byte != b'\n':
+            line_count += 1
+        
+        head_text = head_bytes.decode('utf-8', 'replace')
+        if truncated:
+            # Drop the row cut off at the read boundary
+            head_text = head_text.rsplit('\n', 1)[0]
+        
+        rows = [row for row in islice(csv.reader(io.StringIO(head_text)), CSV_SAMPLE_ROWS + 1) if row]
+        if not rows:
+            raise ValueError("No columns to parse from file")
+        
+        columns, sample = rows[0], rows[1:]
+        row_count = max(line_count - 1, 0)
+        
+        # Create a text representation of the CSV
+        content = f"CSV File Content:\n"
+        content += f"Columns: {', '.join(columns)}\n"
+        content += f"Number of rows: {row_count}\n\n"
+        
+        # Add first few rows as sample
+        if sample:
+            content += "Sample data:\n"
+            content += self._format_rows([columns] + sample)
             
-            # Create document
-            document = Document(
-                page_content=content,
-                metadata={'source': file_path, 'type': 'csv'}
+            if row_count > CSV_SAMPLE_ROWS:
+                content += f"\n... and {row_count - CSV_SAMPLE_ROWS} more rows"
+        
+        # Create document
+        document = Document(
+            page_content=content,
+            metadata={'source': file_path, 'type': 'csv'}
+        )
+        
+        return [document]
+    
+    @staticmethod
+    def _format_rows(rows: List[List[str]]) -> str:
+        """Render rows as right-aligned text columns."""
+        width_count = max(len(row) for row in rows)
+        widths = [
+            max(len(row[i]) if i < len(row) else 0 for row in rows)
+            for i in range(width_count)
+        ]
+        return "\n".join(
+            " ".join(
+                (row[i] if i < len(row) else '').rjust(widths[i]) for i in range(width_count)
             )
-            
-            return [document]
-            
-        except Exception as e:
-            raise Exception(f"Failed to process CSV file: {str(e)}")
+            for row in rows
+        )
     
     def create_attachment_context(self, content_data: Dict, user_question: str) -> str:
         """
@@ -225,18 +668,29 @@ class AttachmentProcessor:
         if not content_data or not content_data.get('content'):
             return user_question
         
-        filename = content_data.get('metadata', {}).get('filename', 'uploaded file')
-        content = content_data.get('content', '')
+        metadata = content_data.get('metadata', {})
+        # Unsupported types and failed extractions only carry a placeholder message
+        if not metadata.get('supported', True):
+            return user_question
         
-        enhanced_context = f"""
-The user has uploaded a file named '{filename}' and is asking a question about it.
+        return ATTACHMENT_CONTEXT_TEMPLATE.format_map({
+            'filename': metadata.get('filename', 'uploaded file'),
+            'content': content_data['content'],
+            'question': user_question
+        })
 
-File Content:
-{content}
 
-User's Question: {user_question}
+def warm_up_parsers() -> None:
+    """Import the parser packages ahead of the first attachment that needs them."""
+    for module_name in PARSER_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            # Missing optional parsers are reported when a file actually needs them
+            continue
 
-Please answer the user's question based on both the uploaded file content and any relevant information from the course materials. If the question is specifically about the uploaded file, prioritize information from the file content.
-"""
-        
-        return enhanced_context.strip()
+
+@lru_cache(maxsize=4)
+def _get_worker_processor(chunk_size: int, chunk_overlap: int) -> AttachmentProcessor:
+    """One processor per chunking configuration in each pool worker process."""
+    return AttachmentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
@@ -2,29 +2,193 @@
 Database service for managing SQLAlchemy ORM operations.
 """
 import uuid
-import json
+import hashlib
+import hmac
+import secrets
+import threading
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from typing import Any, Iterator, List, Optional, Tuple
+import orjson
+from cachetools import TTLCache
+from werkzeug.security import check_password_hash
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import func, desc, and_, or_
-from app.extensions import db
-from app.models import User, Topic, ChatSession, Message
+from sqlalchemy import func, desc, and_, or_, select, insert, update, delete, case, text, tuple_
+from app.extensions import db, pwd_ctx
+from app.models import User, Topic, ChatSession, Message, sqlite_supports_trigram_fts
+from app.utils.logging import get_logger
+
+try:
+    import redis
+except ImportError:  # Redis is optional; user profiles are cached per process without it
+    redis = None
+
+logger = get_logger(__name__)
+
+# Werkzeug generate_password_hash formats, used before passlib
+LEGACY_HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+# Rows fetched per round-trip when streaming unbounded result sets
+STREAM_BATCH_SIZE = 1000
+
+# Case-insensitive unique index on topic names (see models.Topic)
+TOPIC_NAME_INDEX = 'uq_topics_name_lower'
+
+# Upper bound on search results, whatever limit the caller asks for
+MAX_SEARCH_RESULTS = 100
+
+# Users whose name or email contains a phrase, via the SQLite trigram index (see models.USERS_FTS_DDL)
+_USERS_FTS_MATCH = text('users.id IN (SELECT user_id FROM users_fts WHERE users_fts MATCH :phrase)')
+
+# Per-process cache of user profiles (User.to_dict()) for routes that only read them
+USER_CACHE_TTL = 60
+_user_cache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL)
+_user_cache_lock = threading.Lock()
+
+# With Redis configured, profiles are shared by every worker instead and dropped on
+# change, so they can live longer without going stale
+REDIS_USER_CACHE_TTL = 300
+USER_CACHE_KEY_PREFIX = 'user:'
+
+# Redis keys for the admin dashboard payloads, shared by every worker for ADMIN_STATS_TTL
+ADMIN_STATS_KEY = 'admin:stats'
+RECENT_ACTIVITY_KEY = 'admin:recent:{limit}'
+
+# Per-process cache of the default topic's id; topics change rarely
+DEFAULT_TOPIC_TTL = 60
+_default_topic_cache = TTLCache(maxsize=1, ttl=DEFAULT_TOPIC_TTL)
+_default_topic_lock = threading.Lock()
+
+# Per-process cache of successful password checks, so repeated logins skip the KDF.
+# Keys pair the stored hash (a password change invalidates them) with a keyed digest
+# of the password, never the password itself; failed checks are never cached.
+VERIFIED_PASSWORD_TTL = 300
+_verified_passwords = TTLCache(maxsize=4096, ttl=VERIFIED_PASSWORD_TTL)
+_verified_passwords_lock = threading.Lock()
+_VERIFIED_PASSWORD_KEY = secrets.token_bytes(32)
+
+# Per-process cache of the total user count shown by the paginated admin user list;
+# a slightly stale total is fine for page links
+USER_COUNT_TTL = 30
+_user_count_cache = TTLCache(maxsize=1, ttl=USER_COUNT_TTL)
+_user_count_lock = threading.Lock()
+
+# Per-process cache of the admin dashboard statistics; they feed a UI, not transactions
+ADMIN_STATS_TTL = 30
+_admin_stats_cache = TTLCache(maxsize=1, ttl=ADMIN_STATS_TTL)
+_admin_stats_lock = threading.Lock()
+
+
+def _violates(error: IntegrityError, index_name: str) -> bool:
+    """Check whether an IntegrityError came from a given unique index (SQLite and PostgreSQL name it)."""
+    return index_name in str(error.orig)
+
+
+def count_subquery(column, *criteria):
+    """Scalar COUNT subquery, so several counts can share one round-trip."""
+    return select(func.count(column)).where(*criteria).scalar_subquery()
+
+
+def _check_password(stored_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password with a single KDF run; returns (valid, new hash if it should be upgraded)."""
+    digest = hmac.new(_VERIFIED_PASSWORD_KEY, password.encode('utf-8'), hashlib.sha256).digest()
+    cache_key = (stored_hash, digest)
+    with _verified_passwords_lock:
+        if cache_key in _verified_passwords:
+            return True, None
+    
+    if stored_hash.startswith(LEGACY_HASH_PREFIXES):
+        valid = check_password_hash(stored_hash, password)
+        new_hash = pwd_ctx.hash(password) if valid else None
+    else:
+        valid, new_hash = pwd_ctx.verify_and_update(password, stored_hash)
+    
+    # A hash about to be upgraded won't be seen again, so only current ones are cached
+    if valid and not new_hash:
+        with _verified_passwords_lock:
+            _verified_passwords[cache_key] = True
+    return valid, new_hash
+
+
+def forget_user_count() -> None:
+    """Drop the cached user total; call after adding or removing users."""
+    with _user_count_lock:
+        _user_count_cache.clear()
+
+
+def forget_cached_user(user_id: str) -> None:
+    """Drop a user's cached profile; call after any change to the user row."""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+
+def forget_default_topic() -> None:
+    """Drop the cached default topic; call after topics are added, renamed or removed."""
+    with _default_topic_lock:
+        _default_topic_cache.clear()
 
 
 class DatabaseService:
     """Service for database operations using SQLAlchemy ORM."""
     
-    def __init__(self):
-        """Initialize database service."""
-        pass
+    def __init__(self, redis_url: Optional[str] = None):
+        """
+        Initialize database service.
+        
+        Args:
+            redis_url: Optional Redis URL for the user profile cache shared by all workers
+        """
+        self._redis = None
+        if redis_url and redis is not None:
+            self._redis = redis.Redis.from_url(redis_url)
+    
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Group several writes into one transaction with a single COMMIT.
+        
+        Call the ``commit=False`` variants inside the block; everything is
+        committed on exit, or rolled back if the block raises. On SQLite the
+        transaction starts with BEGIN IMMEDIATE, taking the write lock up front
+        so it can't deadlock upgrading from a read lock halfway through.
+        """
+        try:
+            self._begin_immediate()
+            yield db.session
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    
+    def _insert(self, *instances) -> None:
+        """
+        Write fully built model instances with one INSERT (an executemany for several).
+        
+        The instances are not added to the session, so they stay detached: reading
+        them after the commit needs no SELECT to reload expired attributes. The
+        caller commits.
+        """
+        table = type(instances[0]).__table__
+        db.session.execute(insert(table), [
+            {column.key: getattr(instance, column.key) for column in table.columns}
+            for instance in instances
+        ])
+    
+    def _begin_immediate(self) -> None:
+        """Open an IMMEDIATE transaction on SQLite unless one is already in progress."""
+        connection = db.session.connection()
+        if connection.dialect.name != 'sqlite':
+            return
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
     
     # User methods
     def create_user(self, name: str, email: str, password: str, role: str) -> User:
         """Create a new user."""
         user_id = str(uuid.uuid4())
-        password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        password_hash = pwd_ctx.hash(password)
         
         try:
             user = User(
@@ -34,8 +198,9 @@ class DatabaseService:
                 password_hash=password_hash,
                 role=role
             )
-            db.session.add(user)
+            self._insert(user)
             db.session.commit()
+            forget_user_count()
             return user
         except IntegrityError:
             db.session.rollback()
@@ -47,20 +212,128 @@ class DatabaseService:
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Authenticate user with email and password."""
         try:
-            user = User.query.filter_by(email=email).first()
-            if user and check_password_hash(user.password_hash, password):
-                return user
-            return None
+            # Only the hash is needed to reject a bad password; the full user is loaded on success
+            row = db.session.query(User.id, User.password_hash).filter(
+                func.lower(User.email) == email.lower()
+            ).first()
+            if not row:
+                # Spend the same time as a real check so response timing doesn't reveal emails
+                pwd_ctx.dummy_verify()
+                return None
+            
+            valid, new_hash = _check_password(row.password_hash, password)
+            if not valid:
+                return None
+            
+            user = db.session.get(User, row.id)
+            if new_hash:
+                self._store_password_hash(user, new_hash)
+            return user
         except SQLAlchemyError:
             return None
     
+    def verify_user_password(self, user: User, password: str, upgrade: bool = False) -> bool:
+        """
+        Check a password against the user's stored hash with a single KDF run.
+        
+        Hashes written by Werkzeug before the switch to passlib are still accepted.
+        With upgrade=True, a correct password stored under a legacy or outdated
+        scheme is rehashed with the current one.
+        """
+        valid, new_hash = _check_password(user.password_hash, password)
+        if valid and upgrade and new_hash:
+            self._store_password_hash(user, new_hash)
+        return valid
+    
+    def _store_password_hash(self, user: User, new_hash: str) -> None:
+        """Save a rehashed password; a failure only means the upgrade is retried next login."""
+        try:
+            user.password_hash = new_hash
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+    
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Get user by ID."""
         try:
-            return User.query.filter_by(id=user_id).first()
+            return db.session.get(User, user_id)
         except SQLAlchemyError:
             return None
     
+    def get_user_profile(self, user_id: str) -> Optional[dict]:
+        """
+        Get a user's profile dict, served from a short-lived cache.
+        
+        The cache lives in Redis when configured. Otherwise it is per process, and
+        other workers may see a profile change up to USER_CACHE_TTL seconds late;
+        use get_user_by_id when the row itself is needed.
+        
+        Args:
+            user_id: ID of the user
+            
+        Returns:
+            User.to_dict() output, or None if the user doesn't exist
+        """
+        if self._redis is not None:
+            try:
+                return self._get_shared_user_profile(user_id)
+            except redis.RedisError as e:
+                logger.warning("User cache lookup failed: %s", e)
+        
+        with _user_cache_lock:
+            profile = _user_cache.get(user_id)
+        if profile is None:
+            user = self.get_user_by_id(user_id)
+            if user is None:
+                return None
+            profile = user.to_dict()
+            with _user_cache_lock:
+                _user_cache[user_id] = profile
+        return dict(profile)
+    
+    def _get_shared(self, key: str) -> Any:
+        """Get a JSON value from Redis; None when missing, or when Redis is unset or failing."""
+        if self._redis is None:
+            return None
+        try:
+            cached = self._redis.get(key)
+        except redis.RedisError as e:
+            logger.warning("Redis cache lookup failed for %s: %s", key, e)
+            return None
+        return orjson.loads(cached) if cached is not None else None
+    
+    def _set_shared(self, key: str, value: Any, ttl: int) -> None:
+        """Store a JSON value in Redis for ``ttl`` seconds (a no-op without Redis)."""
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(key, orjson.dumps(value), ex=ttl)
+        except redis.RedisError as e:
+            logger.warning("Redis cache store failed for %s: %s", key, e)
+    
+    def _get_shared_user_profile(self, user_id: str) -> Optional[dict]:
+        """Read-through lookup of a profile in the Redis cache."""
+        key = f'{USER_CACHE_KEY_PREFIX}{user_id}'
+        cached = self._redis.get(key)
+        if cached is not None:
+            return orjson.loads(cached)
+        
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return None
+        profile = user.to_dict()
+        self._redis.set(key, orjson.dumps(profile), ex=REDIS_USER_CACHE_TTL)
+        return profile
+    
+    def _forget_user(self, user_id: str) -> None:
+        """Drop a user's cached profile here and, when configured, from Redis."""
+        forget_cached_user(user_id)
+        if self._redis is not None:
+            try:
+                self._redis.delete(f'{USER_CACHE_KEY_PREFIX}{user_id}')
+            except redis.RedisError as e:
+                logger.warning("User cache invalidation failed for %s: %s", user_id, e)
+    
     def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email."""
         try:
@@ -71,7 +344,7 @@ class DatabaseService:
     def update_user(self, user_id: str, name: str = None, email: str = None, role: str = None) -> Optional[User]:
         """Update user information."""
         try:
-            user = User.query.filter_by(id=user_id).first()
+            user = db.session.get(User, user_id)
             if not user:
                 return None
             
@@ -83,6 +356,7 @@ class DatabaseService:
                 user.role = role
             
             db.session.commit()
+            self._forget_user(user_id)
             return user
         except IntegrityError:
             db.session.rollback()
@@ -94,14 +368,12 @@ class DatabaseService:
     def update_user_password(self, user_id: str, new_password: str) -> bool:
         """Update user password."""
         try:
-            user = User.query.filter_by(id=user_id).first()
-            if not user:
-                return False
-            
-            password_hash = generate_password_hash(new_password, method='pbkdf2:sha256')
-            user.password_hash = password_hash
+            result = db.session.execute(
+                update(User).where(User.id == user_id).values(password_hash=pwd_ctx.hash(new_password))
+            )
             db.session.commit()
-            return True
+            self._forget_user(user_id)
+            return result.rowcount > 0
         except SQLAlchemyError:
             db.session.rollback()
             return False
@@ -109,27 +381,25 @@ class DatabaseService:
     def get_user_stats(self, user_id: str) -> dict:
         """Get user statistics."""
         try:
-            # Total chat sessions for user
-            total_sessions = ChatSession.query.filter_by(user_id=user_id).count()
-            
-            # Total messages from user
-            total_messages = db.session.query(Message).join(ChatSession).filter(
-                ChatSession.user_id == user_id,
-                Message.sender == 'user'
-            ).count()
-            
-            # Get recent activity (last 7 days)
             seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            recent_sessions = ChatSession.query.filter(
-                ChatSession.user_id == user_id,
-                ChatSession.created_at >= seven_days_ago
-            ).count()
+            user_session_ids = select(ChatSession.id).where(ChatSession.user_id == user_id)
             
-            return {
-                'total_sessions': total_sessions,
-                'total_messages': total_messages,
-                'recent_sessions': recent_sessions
-            }
+            # Sessions, messages sent and recent (last 7 days) sessions in one query
+            stats = db.session.execute(select(
+                count_subquery(ChatSession.id, ChatSession.user_id == user_id).label('total_sessions'),
+                count_subquery(
+                    Message.id,
+                    Message.session_id.in_(user_session_ids),
+                    Message.sender == 'user'
+                ).label('total_messages'),
+                count_subquery(
+                    ChatSession.id,
+                    ChatSession.user_id == user_id,
+                    ChatSession.created_at >= seven_days_ago
+                ).label('recent_sessions')
+            )).one()
+            
+            return dict(stats._mapping)
         except SQLAlchemyError:
             return {
                 'total_sessions': 0,
@@ -137,40 +407,52 @@ class DatabaseService:
                 'recent_sessions': 0
             }
     
-    def get_all_users(self, limit: int = 100, offset: int = 0) -> Tuple[List[User], int]:
-        """Get all users with pagination."""
+    def get_all_users(self, limit: int = 100, offset: int = 0,
+                      after: Optional[Tuple[datetime, str]] = None) -> Tuple[List[User], Optional[int]]:
+        """
+        Get users newest first, one page at a time.
+        
+        Args:
+            limit: Page size
+            offset: Users to skip (page-number pagination)
+            after: (created_at, id) of the last user on the previous page; the page
+                is then found with an index seek instead of skipping ``offset`` rows,
+                and the total is not counted again
+        
+        Returns:
+            (users, total user count (cached for USER_COUNT_TTL seconds), or None
+            for ``after`` pages)
+        """
         try:
-            # Get total count
-            total_count = User.query.count()
-            
-            # Get users with pagination
-            users = User.query.order_by(User.created_at.desc()).limit(limit).offset(offset).all()
+            query = select(User).order_by(User.created_at.desc(), User.id.desc()).limit(limit)
+            if after is not None:
+                query = query.where(tuple_(User.created_at, User.id) < tuple_(*after))
+                total_count = None
+            else:
+                query = query.offset(offset)
+                with _user_count_lock:
+                    total_count = _user_count_cache.get('total')
+                if total_count is None:
+                    total_count = db.session.scalar(select(func.count(User.id)))
+                    with _user_count_lock:
+                        _user_count_cache['total'] = total_count
             
-            return users, total_count
+            return db.session.scalars(query).all(), total_count
         except SQLAlchemyError:
             return [], 0
     
     def delete_user(self, user_id: str) -> bool:
         """Delete a user and all associated data."""
         try:
-            # Delete associated messages first (through cascade or explicit deletion)
-            db.session.query(Message).join(ChatSession).filter(
-                ChatSession.user_id == user_id
-            ).delete(synchronize_session=False)
-            
-            # Delete chat sessions
-            ChatSession.query.filter_by(user_id=user_id).delete()
-            
-            # Delete topics created by user
-            Topic.query.filter_by(created_by=user_id).delete()
-            
-            # Delete the user
-            user = User.query.filter_by(id=user_id).first()
-            if user:
-                db.session.delete(user)
-                db.session.commit()
-                return True
-            return False
+            # Chat sessions, messages, topics and documents go with the user
+            # through the schema's ON DELETE CASCADE
+            deleted = db.session.execute(delete(User).where(User.id == user_id)).rowcount
+            db.session.commit()
+            if deleted:
+                self._forget_user(user_id)
+                forget_default_topic()
+                forget_user_count()
+            return bool(deleted)
         except SQLAlchemyError:
             db.session.rollback()
             return False
@@ -178,28 +460,32 @@ class DatabaseService:
     def delete_user_sessions_with_cleanup(self, user_id: str, file_service=None) -> bool:
         """Delete all sessions for a user with proper file cleanup."""
         try:
-            # Get all sessions for the user
-            user_sessions = self.get_user_chat_sessions(user_id)
-            
             if file_service:
-                # Clean up files for each session
-                for session in user_sessions:
-                    # Get attachment paths for this session
-                    attachment_paths = self.get_session_attachment_paths(session.id)
-                    
-                    # Delete individual attachment files
-                    for file_path in attachment_paths:
-                        file_service.delete_file(file_path)
-                    
-                    # Clean up session directory
-                    file_service.cleanup_session_files(session.id)
-            
-            # Delete all messages for user sessions
-            db.session.query(Message).join(ChatSession).filter(
-                ChatSession.user_id == user_id
-            ).delete(synchronize_session=False)
-            
-            # Delete all chat sessions for the user
+                # Fetch every attachment path across the user's sessions in one
+                # query rather than one query per session, streamed in batches
+                # (a server-side cursor on PostgreSQL) instead of loaded into a list
+                attachment_paths = db.session.scalars(
+                    select(Message.attachment_path).join(ChatSession).where(
+                        ChatSession.user_id == user_id,
+                        Message.attachment_path.isnot(None),
+                        Message.attachment_path != ''
+                    ).execution_options(yield_per=STREAM_BATCH_SIZE)
+                )
+                
+                # Delete individual attachment files
+                for file_path in attachment_paths:
+                    file_service.delete_file(file_path)
+                
+                session_ids = db.session.scalars(
+                    select(ChatSession.id).where(ChatSession.user_id == user_id)
+                    .execution_options(yield_per=STREAM_BATCH_SIZE)
+                )
+                
+                # Clean up session directories
+                for session_id in session_ids:
+                    file_service.cleanup_session_files(session_id)
+            
+            # Delete all chat sessions for the user (their messages cascade)
             ChatSession.query.filter_by(user_id=user_id).delete()
             
             return True
@@ -207,6 +493,26 @@ class DatabaseService:
             db.session.rollback()
             return False
 
+    def get_user_topic_files(self, user_id: str) -> Tuple[List[str], List[str]]:
+        """
+        Get the topics a user created and the file paths of their documents.
+        
+        Deleting the user deletes those topics and documents (ON DELETE CASCADE),
+        but not their vector indexes and files, which live outside the database.
+        
+        Returns:
+            Tuple of (topic IDs, document file paths)
+        """
+        topic_ids = db.session.scalars(select(Topic.id).where(Topic.created_by == user_id)).all()
+        if not topic_ids:
+            return [], []
+        
+        from app.models import Document
+        file_paths = db.session.scalars(
+            select(Document.file_path).where(Document.topic_id.in_(topic_ids))
+        ).all()
+        return topic_ids, file_paths
+    
     # Topic methods
     def create_topic(self, name: str, description: str, created_by: str) -> Topic:
         """Create a new topic."""
@@ -223,9 +529,15 @@ class DatabaseService:
                 updated_at=now
             )
             
-            db.session.add(topic)
+            self._insert(topic)
             db.session.commit()
+            forget_default_topic()
             return topic
+        except IntegrityError as e:
+            db.session.rollback()
+            if _violates(e, TOPIC_NAME_INDEX):
+                raise ValueError("Topic with this name already exists")
+            raise RuntimeError(f"Database error: {str(e)}")
         except SQLAlchemyError as e:
             db.session.rollback()
             raise RuntimeError(f"Database error: {str(e)}")
@@ -233,7 +545,7 @@ class DatabaseService:
     def get_topic_by_id(self, topic_id: str) -> Optional[Topic]:
         """Get topic by ID."""
         try:
-            return Topic.query.filter_by(id=topic_id).first()
+            return db.session.get(Topic, topic_id)
         except SQLAlchemyError:
             return None
     
@@ -244,10 +556,38 @@ class DatabaseService:
         except SQLAlchemyError:
             return []
     
+    def get_all_topics_projection(self) -> List[dict]:
+        """
+        Get all topics as API dicts, selecting columns directly instead of loading ORM objects.
+        
+        Output matches Topic.to_dict().
+        """
+        try:
+            rows = db.session.execute(
+                select(
+                    Topic.id, Topic.name, Topic.description, Topic.created_by,
+                    Topic.document_count, Topic.created_at, Topic.updated_at
+                ).order_by(Topic.created_at.desc())
+            ).all()
+            return [
+                {
+                    'id': topic_id,
+                    'name': name,
+                    'description': description,
+                    'createdBy': created_by,
+                    'documentCount': document_count,
+                    'createdAt': created_at.isoformat(),
+                    'updatedAt': updated_at.isoformat()
+                }
+                for topic_id, name, description, created_by, document_count, created_at, updated_at in rows
+            ]
+        except SQLAlchemyError:
+            return []
+    
     def update_topic(self, topic_id: str, name: str = None, description: str = None) -> Optional[Topic]:
         """Update topic information."""
         try:
-            topic = Topic.query.filter_by(id=topic_id).first()
+            topic = db.session.get(Topic, topic_id)
             if not topic:
                 return None
             
@@ -258,32 +598,64 @@ class DatabaseService:
             
             topic.updated_at = datetime.utcnow()
             db.session.commit()
+            if name is not None:
+                forget_default_topic()
             return topic
+        except IntegrityError as e:
+            db.session.rollback()
+            if _violates(e, TOPIC_NAME_INDEX):
+                raise ValueError("Topic with this name already exists")
+            raise RuntimeError(f"Database error: {str(e)}")
         except SQLAlchemyError as e:
             db.session.rollback()
             raise RuntimeError(f"Database error: {str(e)}")
     
-    def increment_topic_document_count(self, topic_id: str) -> bool:
-        """Increment the document count for a topic."""
+    def adjust_topic_document_count(self, topic_id: str, delta: int, commit: bool = True) -> bool:
+        """
+        Atomically add ``delta`` to a topic's document count (never below zero).
+        
+        The arithmetic happens in the UPDATE itself, so concurrent uploads and
+        deletes can't lose each other's changes.
+        
+        Args:
+            topic_id: Topic to adjust
+            delta: Amount to add (negative to decrement)
+            commit: Commit immediately; pass False to fold the update into the
+                caller's transaction (errors are then raised, not returned)
+        
+        Returns:
+            True if the topic exists and was updated
+        """
+        new_count = Topic.document_count + delta
         try:
-            topic = Topic.query.filter_by(id=topic_id).first()
-            if not topic:
-                return False
-            
-            topic.document_count += 1
-            topic.updated_at = datetime.utcnow()
-            db.session.commit()
-            return True
+            result = db.session.execute(
+                update(Topic)
+                .where(Topic.id == topic_id)
+                .values(
+                    document_count=case((new_count < 0, 0), else_=new_count),
+                    updated_at=datetime.utcnow()
+                )
+            )
+            if commit:
+                db.session.commit()
+            return result.rowcount > 0
         except SQLAlchemyError:
+            if not commit:
+                # The caller's transaction owns the rollback (and its other pending work)
+                raise
             db.session.rollback()
             return False
     
+    def increment_topic_document_count(self, topic_id: str) -> bool:
+        """Increment the document count for a topic."""
+        return self.adjust_topic_document_count(topic_id, 1)
+    
     def get_topic_document_count(self, topic_id: str) -> int:
         """Get the document count for a topic."""
         try:
             # Count actual processed documents instead of using the counter
             from app.models import Document
-            return Document.query.filter_by(topic_id=topic_id, is_processed=True).count()
+            return Document.query.filter_by(topic_id=topic_id, is_processed=True, deleted_at=None).count()
         except SQLAlchemyError:
             return 0
     
@@ -291,7 +663,7 @@ class DatabaseService:
         """Get the actual document count from the Document table."""
         try:
             from app.models import Document
-            return Document.query.filter_by(topic_id=topic_id, is_processed=True).count()
+            return Document.query.filter_by(topic_id=topic_id, is_processed=True, deleted_at=None).count()
         except SQLAlchemyError:
             return 0
     
@@ -299,15 +671,15 @@ class DatabaseService:
         """Sync document counts for all topics with actual document counts."""
         try:
             from app.models import Document
-            topics = self.get_all_topics()
-            
-            for topic in topics:
-                actual_count = Document.query.filter_by(
-                    topic_id=topic.id, 
-                    is_processed=True
-                ).count()
-                topic.document_count = actual_count
-            
+            # One UPDATE with a correlated count, rather than a count query per topic
+            db.session.execute(
+                update(Topic).values(document_count=count_subquery(
+                    Document.id,
+                    Document.topic_id == Topic.id,
+                    Document.is_processed.is_(True),
+                    Document.deleted_at.is_(None)
+                ))
+            )
             db.session.commit()
             return True
         except SQLAlchemyError as e:
@@ -326,7 +698,7 @@ class DatabaseService:
                 title=title
             )
             
-            db.session.add(session)
+            self._insert(session)
             db.session.commit()
             return session
         except SQLAlchemyError as e:
@@ -336,7 +708,14 @@ class DatabaseService:
     def get_chat_session_by_id(self, session_id: str) -> Optional[ChatSession]:
         """Get chat session by ID."""
         try:
-            return ChatSession.query.filter_by(id=session_id).first()
+            return db.session.get(ChatSession, session_id)
+        except SQLAlchemyError:
+            return None
+    
+    def get_chat_session_by_id_for_user(self, session_id: str, user_id: str) -> Optional[ChatSession]:
+        """Get chat session by ID, or None if it does not exist or belongs to another user."""
+        try:
+            return ChatSession.query.filter_by(id=session_id, user_id=user_id).first()
         except SQLAlchemyError:
             return None
     
@@ -352,25 +731,18 @@ class DatabaseService:
         except SQLAlchemyError:
             return []
     
-    def get_chat_sessions(self, user_id: str, topic_id: str = None) -> List[ChatSession]:
-        """Get chat sessions for a user (alias for get_user_chat_sessions for backward compatibility)."""
-        return self.get_user_chat_sessions(user_id, topic_id)
+    # Backward-compatible alias
+    get_chat_sessions = get_user_chat_sessions
     
     def delete_chat_session(self, session_id: str) -> bool:
         """Delete a chat session and all its messages."""
         try:
-            # Check if session exists
-            session = ChatSession.query.filter_by(id=session_id).first()
-            if not session:
-                return False
-            
-            # Delete all messages in the session (CASCADE should handle this, but explicit is better)
-            Message.query.filter_by(session_id=session_id).delete()
-            
-            # Delete the session
-            db.session.delete(session)
+            # Deleted without loading the session first; its messages cascade in the database
+            deleted = db.session.execute(
+                delete(ChatSession).where(ChatSession.id == session_id)
+            ).rowcount
             db.session.commit()
-            return True
+            return bool(deleted)
         except SQLAlchemyError:
             db.session.rollback()
             return False
@@ -378,19 +750,20 @@ class DatabaseService:
     def get_session_attachment_paths(self, session_id: str) -> List[str]:
         """Get all attachment file paths for a session."""
         try:
-            messages = Message.query.filter_by(session_id=session_id).all()
-            attachment_paths = []
-            for message in messages:
-                if message.attachment_path:
-                    attachment_paths.append(message.attachment_path)
-            return attachment_paths
+            return db.session.scalars(
+                select(Message.attachment_path).where(
+                    Message.session_id == session_id,
+                    Message.attachment_path.isnot(None),
+                    Message.attachment_path != ''
+                )
+            ).all()
         except SQLAlchemyError:
             return []
     
     def update_chat_session_title(self, session_id: str, title: str) -> Optional[ChatSession]:
         """Update chat session title."""
         try:
-            session = ChatSession.query.filter_by(id=session_id).first()
+            session = db.session.get(ChatSession, session_id)
             if not session:
                 return None
             
@@ -419,13 +792,43 @@ class DatabaseService:
                 attachment_size=attachment_size
             )
             
-            db.session.add(msg)
+            self._insert(msg)
             db.session.commit()
             return msg
         except SQLAlchemyError as e:
             db.session.rollback()
             raise RuntimeError(f"Database error: {str(e)}")
     
+    def build_message(self, session_id: str, sender: str, message: str,
+                      sources: Optional[List[str]] = None, attachment_filename: Optional[str] = None,
+                      attachment_path: Optional[str] = None, attachment_size: Optional[int] = None) -> Message:
+        """Build an unsaved message timestamped now; persist it with create_messages."""
+        return Message(
+            id=str(uuid.uuid4()),
+            session_id=session_id,
+            sender=sender,
+            message=message,
+            sources=sources,
+            attachment_filename=attachment_filename,
+            attachment_path=attachment_path,
+            attachment_size=attachment_size
+        )
+    
+    def create_messages(self, messages: List[Message]) -> List[Message]:
+        """
+        Insert several messages with one batched INSERT and a single commit.
+        
+        The returned messages stay detached (see _insert) and serialize without
+        being reloaded after the commit.
+        """
+        try:
+            with self.unit_of_work():
+                self._insert(*messages)
+            return messages
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise RuntimeError(f"Database error: {str(e)}")
+    
     def save_message(self, session_id: str, sender: str, message: str, 
                     sources: Optional[List[str]] = None, attachment_filename: Optional[str] = None,
                     attachment_path: Optional[str] = None, attachment_size: Optional[int] = None) -> Message:
@@ -433,19 +836,26 @@ class DatabaseService:
         return self.create_message(session_id, sender, message, sources, 
                                  attachment_filename, attachment_path, attachment_size)
     
+    def iter_session_messages(self, session_id: str, limit: int = 100) -> Iterator[Message]:
+        """Yield a chat session's messages oldest first, fetched in batches rather than as one list."""
+        return db.session.scalars(
+            select(Message).where(Message.session_id == session_id)
+            .order_by(Message.created_at.asc())
+            .limit(limit)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+    
     def get_session_messages(self, session_id: str, limit: int = 100) -> List[Message]:
         """Get all messages for a chat session."""
         try:
-            return Message.query.filter_by(session_id=session_id)\
-                .order_by(Message.created_at.asc())\
-                .limit(limit).all()
+            return list(self.iter_session_messages(session_id, limit))
         except SQLAlchemyError:
             return []
     
     def update_message_rating(self, message_id: str, rating: str) -> Optional[Message]:
         """Update the rating for a message."""
         try:
-            message = Message.query.filter_by(id=message_id).first()
+            message = db.session.get(Message, message_id)
             if not message:
                 return None
             
@@ -459,7 +869,7 @@ class DatabaseService:
     def get_message_by_id(self, message_id: str) -> Optional[Message]:
         """Get message by ID."""
         try:
-            return Message.query.filter_by(id=message_id).first()
+            return db.session.get(Message, message_id)
         except SQLAlchemyError:
             return None
     
@@ -467,34 +877,46 @@ class DatabaseService:
                          days: int = 30) -> dict:
         """Get NPS analytics based on message ratings."""
         try:
-            # Calculate date range
-            start_date = datetime.utcnow() - timedelta(days=days)
+            # The window is the last ``days`` calendar days (UTC), today included
+            first_day = datetime.utcnow().date() - timedelta(days=days - 1)
+            start_date = datetime.combine(first_day, datetime.min.time())
             
-            # Base query for AI messages (only assistant messages can be rated)
-            query = db.session.query(Message).filter(
+            # Count assistant messages (the only ones that can be rated) per day
+            # and rating in one aggregate query
+            day = func.date(Message.created_at).label('day')
+            query = db.session.query(day, Message.rating, func.count(Message.id)).filter(
                 Message.sender == 'assistant',
                 Message.created_at >= start_date
             )
             
-            # Filter by user if specified
+            if user_id or topic_id:
+                query = query.join(ChatSession)
             if user_id:
-                query = query.join(ChatSession).filter(
-                    ChatSession.user_id == user_id
-                )
-            
-            # Filter by topic if specified
+                query = query.filter(ChatSession.user_id == user_id)
             if topic_id:
-                if not user_id:  # Need to join if not already joined
-                    query = query.join(ChatSession)
                 query = query.filter(ChatSession.topic_id == topic_id)
             
-            # Get all rated messages
-            messages = query.all()
+            daily_counts = {
+                (first_day + timedelta(days=i)).isoformat(): {'total': 0, 'positive': 0, 'negative': 0}
+                for i in range(days)
+            }
+            # Period totals are tallied in the same pass as the daily counts
+            totals = Counter()
+            for day_value, rating, count in query.group_by(day, Message.rating):
+                # SQLite returns the date as a string, PostgreSQL as a date
+                counts = daily_counts.get(str(day_value))
+                if counts is None:
+                    continue
+                counts['total'] += count
+                totals['total'] += count
+                if rating in ('positive', 'negative'):
+                    counts[rating] += count
+                    totals[rating] += count
             
             # Count ratings
-            total_messages = len(messages)
-            positive_ratings = len([m for m in messages if m.rating == 'positive'])
-            negative_ratings = len([m for m in messages if m.rating == 'negative'])
+            total_messages = totals['total']
+            positive_ratings = totals['positive']
+            negative_ratings = totals['negative']
             no_ratings = total_messages - positive_ratings - negative_ratings
             
             # Calculate NPS
@@ -509,32 +931,12 @@ class DatabaseService:
                 passive_percentage = 0
                 nps_score = 0
             
-            # Get daily breakdown for the chart
+            # Daily breakdown for the chart
             daily_breakdown = []
-            for i in range(days):
-                day_start = start_date + timedelta(days=i)
-                day_end = day_start + timedelta(days=1)
-                
-                day_query = db.session.query(Message).filter(
-                    Message.sender == 'assistant',
-                    Message.created_at >= day_start,
-                    Message.created_at < day_end
-                )
-                
-                if user_id:
-                    day_query = day_query.join(ChatSession).filter(
-                        ChatSession.user_id == user_id
-                    )
-                
-                if topic_id:
-                    if not user_id:
-                        day_query = day_query.join(ChatSession)
-                    day_query = day_query.filter(ChatSession.topic_id == topic_id)
-                
-                day_messages = day_query.all()
-                day_total = len(day_messages)
-                day_positive = len([m for m in day_messages if m.rating == 'positive'])
-                day_negative = len([m for m in day_messages if m.rating == 'negative'])
+            for date_key, counts in daily_counts.items():
+                day_total = counts['total']
+                day_positive = counts['positive']
+                day_negative = counts['negative']
                 
                 if day_total > 0:
                     day_nps = ((day_positive / day_total) * 100) - ((day_negative / day_total) * 100)
@@ -542,7 +944,7 @@ class DatabaseService:
                     day_nps = 0
                 
                 daily_breakdown.append({
-                    'date': day_start.strftime('%Y-%m-%d'),
+                    'date': date_key,
                     'nps_score': round(day_nps, 1),
                     'total_responses': day_total,
                     'positive_ratings': day_positive,
@@ -579,40 +981,36 @@ class DatabaseService:
 
     # Admin methods
     def get_admin_stats(self) -> dict:
-        """Get admin dashboard statistics."""
+        """Get admin dashboard statistics (cached for ADMIN_STATS_TTL seconds, in Redis when configured)."""
+        with _admin_stats_lock:
+            cached = _admin_stats_cache.get('stats')
+        if cached is None:
+            cached = self._get_shared(ADMIN_STATS_KEY)
+        if cached is not None:
+            return cached
+        
         try:
-            # Total users
-            total_users = User.query.count()
-            
-            # Total topics
-            total_topics = Topic.query.count()
-            
-            # Total chat sessions
-            total_sessions = ChatSession.query.count()
-            
-            # Total messages
-            total_messages = Message.query.count()
-            
-            # Recent activity (last 7 days)
+            # Totals and recent activity (last 7 days) in one query
             seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            recent_users = User.query.filter(User.created_at >= seven_days_ago).count()
-            recent_sessions = ChatSession.query.filter(ChatSession.created_at >= seven_days_ago).count()
+            counts = db.session.execute(select(
+                count_subquery(User.id).label('total_users'),
+                count_subquery(Topic.id).label('total_topics'),
+                count_subquery(ChatSession.id).label('total_sessions'),
+                count_subquery(Message.id).label('total_messages'),
+                count_subquery(User.id, User.created_at >= seven_days_ago).label('recent_users'),
+                count_subquery(ChatSession.id, ChatSession.created_at >= seven_days_ago).label('recent_sessions')
+            )).one()
             
-            # Popular topics (by session count)
-            popular_topics = db.session.query(
-                Topic.id,
-                Topic.name,
-                func.count(ChatSession.id).label('session_count')
-            ).outerjoin(ChatSession).group_by(Topic.id, Topic.name)\
-            .order_by(desc('session_count')).limit(5).all()
+            # Popular topics (by session count): a correlated count per topic, served
+            # from the topic_id index, instead of aggregating the whole sessions table
+            session_count = count_subquery(ChatSession.id, ChatSession.topic_id == Topic.id).label('session_count')
+            popular_topics = db.session.execute(
+                select(Topic.id, Topic.name, session_count)
+                .order_by(desc('session_count')).limit(5)
+            ).all()
             
-            return {
-                'total_users': total_users,
-                'total_topics': total_topics,
-                'total_sessions': total_sessions,
-                'total_messages': total_messages,
-                'recent_users': recent_users,
-                'recent_sessions': recent_sessions,
+            stats = {
+                **counts._mapping,
                 'popular_topics': [
                     {
                         'id': topic.id,
@@ -622,6 +1020,10 @@ class DatabaseService:
                     for topic in popular_topics
                 ]
             }
+            with _admin_stats_lock:
+                _admin_stats_cache['stats'] = stats
+            self._set_shared(ADMIN_STATS_KEY, stats, ADMIN_STATS_TTL)
+            return stats
         except SQLAlchemyError:
             return {
                 'total_users': 0,
@@ -633,8 +1035,44 @@ class DatabaseService:
                 'popular_topics': []
             }
     
+    # Backward-compatible alias
+    get_system_stats = get_admin_stats
+    
+    def get_dashboard_metrics(self) -> dict:
+        """
+        Get the document and 24-hour activity counts for the admin dashboard.
+        
+        Every count is a plain ``SELECT count(...) FROM table`` subquery of one
+        statement, instead of ORM ``.count()`` calls that each wrap a
+        ``SELECT *`` subquery and take their own round-trip.
+        
+        Returns:
+            dict with total_documents, processed_documents, active_topics,
+            active_users_24h and messages_24h
+        """
+        from app.models import Document
+        
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        active_document = Document.deleted_at.is_(None)
+        counts = db.session.execute(select(
+            count_subquery(Document.id, active_document).label('total_documents'),
+            count_subquery(Document.id, active_document, Document.is_processed.is_(True)).label('processed_documents'),
+            # Topics with at least one processed document
+            count_subquery(
+                Document.topic_id.distinct(), active_document, Document.is_processed.is_(True)
+            ).label('active_topics'),
+            count_subquery(ChatSession.user_id.distinct(), ChatSession.created_at >= yesterday).label('active_users_24h'),
+            count_subquery(Message.id, Message.created_at >= yesterday).label('messages_24h')
+        )).one()
+        return dict(counts._mapping)
+    
     def get_recent_activity(self, limit: int = 10) -> List[dict]:
-        """Get recent activity across the system."""
+        """Get recent activity across the system (cached in Redis for ADMIN_STATS_TTL seconds when configured)."""
+        cache_key = RECENT_ACTIVITY_KEY.format(limit=limit)
+        cached = self._get_shared(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Get recent chat sessions with user and topic info
             recent_sessions = db.session.query(
@@ -643,7 +1081,9 @@ class DatabaseService:
                 ChatSession.created_at,
                 User.name.label('user_name'),
                 Topic.name.label('topic_name')
-            ).join(User).join(Topic)\
+            ).select_from(ChatSession)\
+            .join(User, ChatSession.user_id == User.id)\
+            .join(Topic, ChatSession.topic_id == Topic.id)\
             .order_by(ChatSession.created_at.desc())\
             .limit(limit).all()
             
@@ -658,13 +1098,28 @@ class DatabaseService:
                     'created_at': session.created_at.isoformat()
                 })
             
+            self._set_shared(cache_key, activities, ADMIN_STATS_TTL)
             return activities
         except SQLAlchemyError:
             return []
     
     def search_users(self, query: str, limit: int = 50) -> List[User]:
-        """Search users by name or email."""
+        """Search users by name or email (trigram-indexed on PostgreSQL and SQLite)."""
         try:
+            limit = min(limit, MAX_SEARCH_RESULTS)
+            
+            # Trigrams need at least three characters; shorter queries scan with ILIKE
+            if (len(query) >= 3 and db.session.get_bind().dialect.name == 'sqlite'
+                    and sqlite_supports_trigram_fts()):
+                phrase = '"' + query.replace('"', '""') + '"'
+                try:
+                    return db.session.scalars(
+                        select(User).where(_USERS_FTS_MATCH.bindparams(phrase=phrase)).limit(limit)
+                    ).all()
+                except OperationalError:
+                    # users_fts is only created along with the users table or by the migrations
+                    logger.warning("User search index unavailable; falling back to ILIKE", exc_info=True)
+            
             search_pattern = f"%{query}%"
             return User.query.filter(
                 or_(
@@ -676,8 +1131,9 @@ class DatabaseService:
             return []
     
     def search_topics(self, query: str, limit: int = 50) -> List[Topic]:
-        """Search topics by name or description."""
+        """Search topics by name or description (trigram-indexed on PostgreSQL)."""
         try:
+            limit = min(limit, MAX_SEARCH_RESULTS)
             search_pattern = f"%{query}%"
             return Topic.query.filter(
                 or_(
@@ -691,20 +1147,24 @@ class DatabaseService:
     def get_default_topic(self) -> Optional[Topic]:
         """Get the default GST topic (first topic named 'GST' or the first topic)."""
         try:
+            # The id is cached, so the usual case is a primary key lookup
+            with _default_topic_lock:
+                topic_id = _default_topic_cache.get('id')
+            if topic_id:
+                topic = db.session.get(Topic, topic_id)
+                if topic:
+                    return topic
+            
             # First try to find a topic named 'GST'
-            gst_topic = Topic.query.filter(Topic.name.ilike('%GST%')).first()
-            if gst_topic:
-                return gst_topic
+            topic = Topic.query.filter(Topic.name.ilike('%GST%')).first()
             
             # If no GST topic found, return the first available topic
-            return Topic.query.order_by(Topic.created_at.asc()).first()
+            if not topic:
+                topic = Topic.query.order_by(Topic.created_at.asc()).first()
+            
+            if topic:
+                with _default_topic_lock:
+                    _default_topic_cache['id'] = topic.id
+            return topic
         except SQLAlchemyError:
-            return None
-    
-    def get_chat_sessions(self, user_id: str, topic_id: str = None) -> List[ChatSession]:
-        """Get chat sessions for a user (alias for get_user_chat_sessions for backward compatibility)."""
-        return self.get_user_chat_sessions(user_id, topic_id)
-    
-    def get_system_stats(self) -> dict:
-        """Get system statistics (alias for get_admin_stats for backward compatibility)."""
-        return self.get_admin_stats()
\ No newline at end of file
+            return None
\ No newline at end of file
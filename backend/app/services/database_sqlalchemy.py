@@ -2,15 +2,15 @@
 Database service for managing SQLAlchemy ORM operations.
 """
 import uuid
-import json
 from datetime import datetime, timedelta
 from typing import List, Optional, Tuple
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import func, desc, and_, or_
-from app.extensions import db
+from sqlalchemy import func, desc, and_, or_, select, update, delete
+from app.extensions import db, pwd_ctx
 from app.models import User, Topic, ChatSession, Message
+from app.services.database import LEGACY_HASH_PREFIXES, count_subquery
 
 
 class DatabaseService:
@@ -24,7 +24,7 @@ class DatabaseService:
     def create_user(self, name: str, email: str, password: str, role: str) -> User:
         """Create a new user."""
         user_id = str(uuid.uuid4())
-        password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        password_hash = pwd_ctx.hash(password)
         
         try:
             user = User(
@@ -47,17 +47,24 @@ class DatabaseService:
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Authenticate user with email and password."""
         try:
-            user = User.query.filter_by(email=email).first()
-            if user and check_password_hash(user.password_hash, password):
-                return user
-            return None
+            # Only the hash is needed to reject a bad password; the full user is loaded on success
+            row = db.session.query(User.id, User.password_hash).filter_by(email=email).first()
+            if not row:
+                return None
+            
+            # Hashes written by Werkzeug before the switch to passlib are still accepted
+            if row.password_hash.startswith(LEGACY_HASH_PREFIXES):
+                valid = check_password_hash(row.password_hash, password)
+            else:
+                valid = pwd_ctx.verify(password, row.password_hash)
+            return db.session.get(User, row.id) if valid else None
         except SQLAlchemyError:
             return None
     
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Get user by ID."""
         try:
-            return User.query.filter_by(id=user_id).first()
+            return db.session.get(User, user_id)
         except SQLAlchemyError:
             return None
     
@@ -71,7 +78,7 @@ class DatabaseService:
     def update_user(self, user_id: str, name: str = None, email: str = None, role: str = None) -> Optional[User]:
         """Update user information."""
         try:
-            user = User.query.filter_by(id=user_id).first()
+            user = db.session.get(User, user_id)
             if not user:
                 return None
             
@@ -94,14 +101,11 @@ class DatabaseService:
     def update_user_password(self, user_id: str, new_password: str) -> bool:
         """Update user password."""
         try:
-            user = User.query.filter_by(id=user_id).first()
-            if not user:
-                return False
-            
-            password_hash = generate_password_hash(new_password, method='pbkdf2:sha256')
-            user.password_hash = password_hash
+            result = db.session.execute(
+                update(User).where(User.id == user_id).values(password_hash=pwd_ctx.hash(new_password))
+            )
             db.session.commit()
-            return True
+            return result.rowcount > 0
         except SQLAlchemyError:
             db.session.rollback()
             return False
@@ -109,27 +113,19 @@ class DatabaseService:
     def get_user_stats(self, user_id: str) -> dict:
         """Get user statistics."""
         try:
-            # Total chat sessions for user
-            total_sessions = ChatSession.query.filter_by(user_id=user_id).count()
-            
-            # Total messages from user
-            total_messages = db.session.query(Message).join(ChatSession).filter(
-                ChatSession.user_id == user_id,
-                Message.sender == 'user'
-            ).count()
-            
-            # Get recent activity (last 7 days)
+            # All three counts in one query
             seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            recent_sessions = ChatSession.query.filter(
-                ChatSession.user_id == user_id,
-                ChatSession.created_at >= seven_days_ago
-            ).count()
-            
-            return {
-                'total_sessions': total_sessions,
-                'total_messages': total_messages,
-                'recent_sessions': recent_sessions
-            }
+            user_sessions = select(ChatSession.id).where(ChatSession.user_id == user_id)
+            counts = db.session.execute(select(
+                count_subquery(ChatSession.id, ChatSession.user_id == user_id).label('total_sessions'),
+                count_subquery(
+                    Message.id, Message.session_id.in_(user_sessions), Message.sender == 'user'
+                ).label('total_messages'),
+                count_subquery(
+                    ChatSession.id, ChatSession.user_id == user_id, ChatSession.created_at >= seven_days_ago
+                ).label('recent_sessions')
+            )).one()
+            return dict(counts._mapping)
         except SQLAlchemyError:
             return {
                 'total_sessions': 0,
@@ -176,7 +172,7 @@ class DatabaseService:
     def get_topic_by_id(self, topic_id: str) -> Optional[Topic]:
         """Get topic by ID."""
         try:
-            return Topic.query.filter_by(id=topic_id).first()
+            return db.session.get(Topic, topic_id)
         except SQLAlchemyError:
             return None
     
@@ -190,7 +186,7 @@ class DatabaseService:
     def update_topic(self, topic_id: str, name: str = None, description: str = None) -> Optional[Topic]:
         """Update topic information."""
         try:
-            topic = Topic.query.filter_by(id=topic_id).first()
+            topic = db.session.get(Topic, topic_id)
             if not topic:
                 return None
             
@@ -209,14 +205,14 @@ class DatabaseService:
     def increment_topic_document_count(self, topic_id: str) -> bool:
         """Increment the document count for a topic."""
         try:
-            topic = Topic.query.filter_by(id=topic_id).first()
-            if not topic:
-                return False
-            
-            topic.document_count += 1
-            topic.updated_at = datetime.utcnow()
+            # Incremented in the UPDATE itself so concurrent uploads can't lose counts
+            result = db.session.execute(
+                update(Topic)
+                .where(Topic.id == topic_id)
+                .values(document_count=Topic.document_count + 1, updated_at=datetime.utcnow())
+            )
             db.session.commit()
-            return True
+            return result.rowcount > 0
         except SQLAlchemyError:
             db.session.rollback()
             return False
@@ -224,8 +220,7 @@ class DatabaseService:
     def get_topic_document_count(self, topic_id: str) -> int:
         """Get the document count for a topic."""
         try:
-            topic = Topic.query.filter_by(id=topic_id).first()
-            return topic.document_count if topic else 0
+            return db.session.query(Topic.document_count).filter(Topic.id == topic_id).scalar() or 0
         except SQLAlchemyError:
             return 0
     
@@ -251,7 +246,7 @@ class DatabaseService:
     def get_chat_session_by_id(self, session_id: str) -> Optional[ChatSession]:
         """Get chat session by ID."""
         try:
-            return ChatSession.query.filter_by(id=session_id).first()
+            return db.session.get(ChatSession, session_id)
         except SQLAlchemyError:
             return None
     
@@ -270,16 +265,12 @@ class DatabaseService:
     def delete_chat_session(self, session_id: str) -> bool:
         """Delete a chat session and all its messages."""
         try:
-            # First delete all messages in the session
-            Message.query.filter_by(session_id=session_id).delete()
-            
-            # Then delete the session
-            session = ChatSession.query.filter_by(id=session_id).first()
-            if session:
-                db.session.delete(session)
-                db.session.commit()
-                return True
-            return False
+            # One DELETE; the session's messages go with it through ON DELETE CASCADE
+            deleted = db.session.execute(
+                delete(ChatSession).where(ChatSession.id == session_id)
+            ).rowcount
+            db.session.commit()
+            return bool(deleted)
         except SQLAlchemyError:
             db.session.rollback()
             return False
@@ -317,13 +308,11 @@ class DatabaseService:
     def update_message_rating(self, message_id: str, rating: str) -> bool:
         """Update the rating for a message."""
         try:
-            message = Message.query.filter_by(id=message_id).first()
-            if not message:
-                return False
-            
-            message.rating = rating
+            result = db.session.execute(
+                update(Message).where(Message.id == message_id).values(rating=rating)
+            )
             db.session.commit()
-            return True
+            return result.rowcount > 0
         except SQLAlchemyError:
             db.session.rollback()
             return False
@@ -331,7 +320,7 @@ class DatabaseService:
     def get_message_by_id(self, message_id: str) -> Optional[Message]:
         """Get message by ID."""
         try:
-            return Message.query.filter_by(id=message_id).first()
+            return db.session.get(Message, message_id)
         except SQLAlchemyError:
             return None
     
@@ -339,22 +328,16 @@ class DatabaseService:
     def get_admin_stats(self) -> dict:
         """Get admin dashboard statistics."""
         try:
-            # Total users
-            total_users = User.query.count()
-            
-            # Total topics
-            total_topics = Topic.query.count()
-            
-            # Total chat sessions
-            total_sessions = ChatSession.query.count()
-            
-            # Total messages
-            total_messages = Message.query.count()
-            
-            # Recent activity (last 7 days)
+            # Totals and recent activity (last 7 days) in one query
             seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            recent_users = User.query.filter(User.created_at >= seven_days_ago).count()
-            recent_sessions = ChatSession.query.filter(ChatSession.created_at >= seven_days_ago).count()
+            counts = db.session.execute(select(
+                count_subquery(User.id).label('total_users'),
+                count_subquery(Topic.id).label('total_topics'),
+                count_subquery(ChatSession.id).label('total_sessions'),
+                count_subquery(Message.id).label('total_messages'),
+                count_subquery(User.id, User.created_at >= seven_days_ago).label('recent_users'),
+                count_subquery(ChatSession.id, ChatSession.created_at >= seven_days_ago).label('recent_sessions')
+            )).one()
             
             # Popular topics (by session count)
             popular_topics = db.session.query(
@@ -365,12 +348,7 @@ class DatabaseService:
             .order_by(desc('session_count')).limit(5).all()
             
             return {
-                'total_users': total_users,
-                'total_topics': total_topics,
-                'total_sessions': total_sessions,
-                'total_messages': total_messages,
-                'recent_users': recent_users,
-                'recent_sessions': recent_sessions,
+                **counts._mapping,
                 'popular_topics': [
                     {
                         'id': topic.id,
@@ -401,7 +379,9 @@ class DatabaseService:
                 ChatSession.created_at,
                 User.name.label('user_name'),
                 Topic.name.label('topic_name')
-            ).join(User).join(Topic)\
+            ).select_from(ChatSession)\
+            .join(User, ChatSession.user_id == User.id)\
+            .join(Topic, ChatSession.topic_id == Topic.id)\
             .order_by(ChatSession.created_at.desc())\
             .limit(limit).all()
             
@@ -10,6 +10,9 @@ from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.schema import Document
 
+# Every PDF file starts with this header
+PDF_MAGIC = b'%PDF-'
+
 
 class DocumentLoader:
     """Service for loading and processing documents."""
@@ -106,6 +109,10 @@ class DocumentLoader:
         if not file.filename.lower().endswith('.pdf'):
             return False
         
+        # Check the magic bytes before anything else reads the body
+        if not self.validate_header(file.stream):
+            return False
+        
         # Check file size (should be handled by Flask config, but double-check)
         file.seek(0, 2)  # Seek to end
         size = file.tell()
@@ -117,6 +124,21 @@ class DocumentLoader:
         
         return True
     
+    def validate_header(self, stream) -> bool:
+        """
+        Fast path: check only the %PDF- magic bytes of a seekable stream, then rewind.
+        
+        Args:
+            stream: Seekable binary stream
+            
+        Returns:
+            True if the stream starts with a PDF header
+        """
+        position = stream.tell()
+        header = stream.read(len(PDF_MAGIC))
+        stream.seek(position)
+        return header == PDF_MAGIC
+    
     def load_pdf_from_bytes(self, pdf_bytes: bytes) -> List[Document]:
         """
         Load PDF from bytes and split into chunks.
@@ -4,13 +4,35 @@ Document service for handling file uploads and deduplication.
 import hashlib
 import os
 import uuid
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Optional, Tuple
+from sqlalchemy import bindparam, delete, lambda_stmt, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
 from app.models import Document
 from app.extensions import db
 from app.services.document_loader import DocumentLoader
 from langchain_core.documents import Document as LangchainDocument
+from app.utils.helpers import hash_file
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Read size used when copying upload streams to disk
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Soft-deleted documents younger than this are left to the cleanup queued by the delete itself
+DELETED_DOCUMENT_GRACE = timedelta(minutes=5)
+
+# Earlier failed cleanups retried by each delete request when there is no worker to sweep them
+INLINE_CLEANUP_RETRIES = 3
+
+# Built once; lambda_stmt caches the construction and compiled form across calls
+_ACTIVE_DOCUMENT_BY_ID = lambda_stmt(
+    lambda: select(Document).where(Document.id == bindparam('document_id'), Document.deleted_at.is_(None))
+)
 
 
 class DocumentService:
@@ -22,11 +44,7 @@ class DocumentService:
     
     def calculate_file_hash(self, file_path: str) -> str:
         """Calculate SHA-256 hash of a file."""
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+        return hash_file(file_path)
     
     def calculate_content_hash(self, content: str) -> str:
         """Calculate SHA-256 hash of text content."""
@@ -50,23 +68,27 @@ class DocumentService:
     
     def check_duplicate_by_file_hash(self, file_hash: str, topic_id: Optional[str] = None) -> Optional[Document]:
         """Check if a document with the same file hash already exists."""
-        query = Document.query.filter_by(file_hash=file_hash)
+        query = Document.query.filter_by(file_hash=file_hash, deleted_at=None)
         if topic_id:
             query = query.filter_by(topic_id=topic_id)
         return query.first()
     
-    def check_duplicate_by_content_hash(self, content_hash: str, topic_id: Optional[str] = None) -> Optional[Document]:
-        """Check if a document with the same content hash already exists."""
-        query = Document.query.filter_by(content_hash=content_hash)
+    def check_duplicate_by_content_hash(self, content_hash: str, topic_id: Optional[str] = None,
+                                        exclude_id: Optional[str] = None) -> Optional[Document]:
+        """Check if another document with the same content hash already exists."""
+        query = Document.query.filter_by(content_hash=content_hash, deleted_at=None)
         if topic_id:
             query = query.filter_by(topic_id=topic_id)
+        if exclude_id:
+            query = query.filter(Document.id != exclude_id)
         return query.first()
     
     def check_duplicate_by_filename(self, filename: str, topic_id: str) -> Optional[Document]:
         """Check if a document with the same filename already exists in the topic."""
         return Document.query.filter_by(
             original_filename=filename,
-            topic_id=topic_id
+            topic_id=topic_id,
+            deleted_at=None
         ).first()
     
     def is_document_already_processed(self, file_path: str, topic_id: str) -> Tuple[bool, Optional[Document]]:
@@ -95,21 +117,67 @@ class DocumentService:
             
         except Exception as e:
             # If we can't check, assume it's not a duplicate to be safe
-            print(f"Warning: Could not check for duplicates: {str(e)}")
+            logger.warning("Could not check for duplicates: %s", e)
             return False, None
     
+    def _insert_if_new(self, **values) -> Optional[Document]:
+        """
+        Insert a document unless the topic already has one with the same file hash.
+        
+        Uses INSERT ... ON CONFLICT DO NOTHING RETURNING, so the duplicate check and
+        the insert are one atomic statement. Other databases fall back to catching
+        the unique index violation.
+        
+        Returns:
+            The new document, or None if it collided with an existing one
+        """
+        dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(db.session.get_bind().dialect.name)
+        if dialect is None:
+            try:
+                document = Document(**values)
+                db.session.add(document)
+                db.session.flush()
+                return document
+            except IntegrityError:
+                db.session.rollback()
+                return None
+        
+        stmt = (
+            dialect.insert(Document)
+            .values(**values)
+            .on_conflict_do_nothing(
+                index_elements=['topic_id', 'file_hash'],
+                index_where=Document.deleted_at.is_(None)
+            )
+            .returning(Document)
+        )
+        return db.session.execute(stmt).scalar_one_or_none()
+    
     def create_document_record(
         self,
         topic_id: str,
         file_path: str,
         original_filename: str,
         uploaded_by: str,
-        chunks: List[LangchainDocument]
-    ) -> Document:
-        """Create a document record in the database."""
+        chunks: List[LangchainDocument],
+        file_hash: Optional[str] = None,
+        commit: bool = True,
+        processed: bool = True
+    ) -> Optional[Document]:
+        """
+        Create a document record in the database.
+        
+        Pass commit=False to leave the insert in the caller's transaction
+        (e.g. inside DatabaseService.unit_of_work), and processed=False to record
+        the document as pending, with no chunks, until it has been indexed.
+        
+        Returns:
+            The new document, or None if the topic already has this file
+        """
         try:
-            # Calculate hashes
-            file_hash = self.calculate_file_hash(file_path)
+            # Calculate hashes (reuse the hash computed while streaming when given)
+            if file_hash is None:
+                file_hash = self.calculate_file_hash(file_path)
             combined_content = "\n".join([chunk.page_content for chunk in chunks])
             content_hash = self.calculate_content_hash(combined_content)
             
@@ -121,7 +189,7 @@ class DocumentService:
             filename = f"{uuid.uuid4()}{file_extension}"
             
             # Create document record
-            document = Document(
+            document = self._insert_if_new(
                 id=str(uuid.uuid4()),
                 topic_id=topic_id,
                 filename=filename,
@@ -130,13 +198,12 @@ class DocumentService:
                 file_hash=file_hash,
                 file_size=file_size,
                 content_hash=content_hash,
-                chunk_count=len(chunks),
-                is_processed=True,
+                chunk_count=len(chunks) if processed else 0,
+                is_processed=processed,
                 uploaded_by=uploaded_by
             )
-            
-            db.session.add(document)
-            db.session.commit()
+            if commit:
+                db.session.commit()
             
             return document
             
@@ -144,12 +211,50 @@ class DocumentService:
             db.session.rollback()
             raise Exception(f"Failed to create document record: {str(e)}")
     
+    def get_active_document(self, document_id: str) -> Optional[Document]:
+        """Get a document by ID, ignoring documents that have been deleted."""
+        return db.session.execute(_ACTIVE_DOCUMENT_BY_ID, {'document_id': document_id}).scalar_one_or_none()
+    
     def get_topic_documents(self, topic_id: str, include_unprocessed: bool = False) -> List[Document]:
         """Get all documents for a topic."""
-        query = Document.query.filter_by(topic_id=topic_id)
+        query = select(Document).where(Document.topic_id == topic_id, Document.deleted_at.is_(None))
         if not include_unprocessed:
-            query = query.filter_by(is_processed=True)
-        return query.all()
+            query = query.where(Document.is_processed.is_(True))
+        return db.session.execute(query).scalars().all()
+    
+    def get_topic_documents_projection(self, topic_id: str) -> List[dict]:
+        """
+        Get all documents for a topic as API dicts without loading ORM objects.
+        
+        Output matches Document.to_dict().
+        """
+        rows = db.session.execute(
+            select(
+                Document.id, Document.topic_id, Document.filename, Document.original_filename,
+                Document.file_path, Document.file_hash, Document.file_size, Document.content_hash,
+                Document.chunk_count, Document.is_processed, Document.job_id, Document.uploaded_by,
+                Document.created_at, Document.updated_at
+            ).where(Document.topic_id == topic_id, Document.deleted_at.is_(None))
+        ).all()
+        return [
+            {
+                'id': row.id,
+                'topicId': row.topic_id,
+                'filename': row.filename,
+                'originalFilename': row.original_filename,
+                'filePath': row.file_path,
+                'fileHash': row.file_hash,
+                'fileSize': row.file_size,
+                'contentHash': row.content_hash,
+                'chunkCount': row.chunk_count,
+                'isProcessed': row.is_processed,
+                'jobId': row.job_id,
+                'uploadedBy': row.uploaded_by,
+                'createdAt': row.created_at.isoformat(),
+                'updatedAt': row.updated_at.isoformat()
+            }
+            for row in rows
+        ]
     
     def delete_document(self, document_id: str) -> bool:
         """Delete a document record and its file."""
@@ -172,6 +277,107 @@ class DocumentService:
             db.session.rollback()
             raise Exception(f"Failed to delete document: {str(e)}")
     
+    def cleanup_deleted_document(self, document_id: str) -> bool:
+        """
+        Remove a soft-deleted document's vectors and file, then purge its row.
+        
+        Every step tolerates having already run, so a failed cleanup can simply be
+        retried (see cleanup_deleted_documents); the row stays soft-deleted, hidden
+        from queries and from the unique file index, until it succeeds.
+        
+        Args:
+            document_id: ID of the document record
+            
+        Returns:
+            True if the document is gone, False if it isn't marked as deleted
+        """
+        document = db.session.get(Document, document_id)
+        if document is None:
+            return True
+        if document.deleted_at is None:
+            return False
+        
+        from app.services.registry import get_service
+        
+        get_service('vector').remove_document_from_topic(
+            document.topic_id, document.id, sources=self._chunk_sources(document)
+        )
+        
+        if os.path.exists(document.file_path):
+            os.remove(document.file_path)
+        
+        try:
+            db.session.delete(document)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to purge document: {str(e)}")
+        
+        return True
+    
+    def discard_staged_upload(self, document_id: str) -> bool:
+        """
+        Remove a staged upload whose background processing failed.
+        
+        Only documents that were never processed are removed, so a failed reprocess
+        keeps the indexed copy. The row is soft-deleted first, which frees its slot
+        on the unique file index, then cleaned up; cleanup_deleted_documents retries
+        the cleanup if it fails here.
+        
+        Args:
+            document_id: ID of the document record
+            
+        Returns:
+            True if the upload was discarded
+        """
+        db.session.rollback()
+        try:
+            document = self.get_active_document(document_id)
+            if document is None or document.is_processed:
+                return False
+            document.deleted_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Failed to discard staged upload %s: %s", document_id, e)
+            return False
+        
+        try:
+            self.cleanup_deleted_document(document_id)
+        except Exception as e:
+            logger.warning("Cleanup of discarded upload %s failed; it will be retried: %s", document_id, e)
+        return True
+    
+    def cleanup_deleted_documents(self, limit: int = 100) -> int:
+        """
+        Retry cleanup for documents that are still soft-deleted after DELETED_DOCUMENT_GRACE.
+        
+        Args:
+            limit: Maximum number of documents to clean up in one sweep
+            
+        Returns:
+            Number of documents purged
+        """
+        try:
+            pending = db.session.scalars(
+                select(Document.id)
+                .where(Document.deleted_at < datetime.utcnow() - DELETED_DOCUMENT_GRACE)
+                .order_by(Document.deleted_at)
+                .limit(limit)
+            ).all()
+        except Exception as e:
+            logger.warning("Could not list deleted documents for cleanup: %s", e)
+            return 0
+        
+        purged = 0
+        for document_id in pending:
+            try:
+                if self.cleanup_deleted_document(document_id):
+                    purged += 1
+            except Exception as e:
+                logger.warning("Failed to clean up deleted document %s: %s", document_id, e)
+        return purged
+    
     def mark_document_processed(self, document_id: str, chunk_count: int) -> bool:
         """Mark a document as processed with chunk count."""
         try:
@@ -195,15 +401,53 @@ class DocumentService:
     
     def get_total_documents_count(self) -> int:
         """Get total number of processed documents."""
-        return Document.query.filter_by(is_processed=True).count()
+        return Document.query.filter_by(is_processed=True, deleted_at=None).count()
     
     def get_topic_documents_count(self, topic_id: str) -> int:
         """Get count of processed documents for a topic."""
-        return Document.query.filter_by(topic_id=topic_id, is_processed=True).count()
+        return Document.query.filter_by(topic_id=topic_id, is_processed=True, deleted_at=None).count()
+    
+    def save_upload_stream(self, stream, original_filename: str, upload_folder: str,
+                           prefix: bytes = b"") -> Tuple[str, str]:
+        """
+        Copy an upload stream to disk in fixed-size chunks, hashing it on the way.
+        
+        Args:
+            stream: Readable binary stream (e.g. request.stream or FileStorage.stream)
+            original_filename: Client-supplied filename
+            upload_folder: Directory to save uploaded files
+            prefix: Bytes already read from a non-seekable stream (e.g. the PDF header)
+            
+        Returns:
+            Tuple of (file_path, file_hash)
+        """
+        # Generate unique filename
+        name, ext = os.path.splitext(secure_filename(original_filename))
+        filename = f"{name}_{uuid.uuid4()}{ext}"
+        file_path = os.path.join(upload_folder, filename)
+        
+        # Ensure upload directory exists
+        os.makedirs(upload_folder, exist_ok=True)
+        
+        sha256_hash = hashlib.sha256()
+        try:
+            with open(file_path, 'wb') as f:
+                if prefix:
+                    sha256_hash.update(prefix)
+                    f.write(prefix)
+                for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+                    sha256_hash.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        
+        return file_path, sha256_hash.hexdigest()
     
     def process_document_upload(self, file, topic_id: str, user_id: str, upload_folder: str) -> dict:
         """
-        Process a complete document upload with deduplication.
+        Process a complete multipart document upload with deduplication.
         
         Args:
             file: Uploaded file object
@@ -211,43 +455,250 @@ class DocumentService:
             user_id: User ID of uploader
             upload_folder: Directory to save uploaded files
             
+        Returns:
+            dict: See process_stored_file
+        """
+        return self.process_document_stream(file.stream, file.filename, topic_id, user_id, upload_folder)
+    
+    def process_document_stream(self, stream, original_filename: str, topic_id: str,
+                                user_id: str, upload_folder: str, prefix: bytes = b"") -> dict:
+        """
+        Save a raw upload stream and process it with deduplication.
+        
+        Args:
+            stream: Readable binary stream with the PDF bytes
+            original_filename: Client-supplied filename
+            topic_id: Topic ID to associate with
+            user_id: User ID of uploader
+            upload_folder: Directory to save uploaded files
+            prefix: Bytes already read from the stream
+            
+        Returns:
+            dict: See process_stored_file
+        """
+        temp_file_path, file_hash = self.save_upload_stream(stream, original_filename, upload_folder, prefix)
+        
+        return self.process_stored_file(
+            temp_file_path=temp_file_path,
+            file_hash=file_hash,
+            original_filename=original_filename,
+            topic_id=topic_id,
+            user_id=user_id,
+            upload_folder=upload_folder
+        )
+    
+    def stage_document_stream(self, stream, original_filename: str, topic_id: str,
+                              user_id: str, upload_folder: str, job_id: str, prefix: bytes = b"") -> dict:
+        """
+        Save an upload and record it as pending so a background task can process it.
+        
+        Only the cheap file-hash duplicate check runs here; parsing, embedding and the
+        content-hash check happen in process_document_by_id.
+        
+        Args:
+            stream: Readable binary stream with the PDF bytes
+            original_filename: Client-supplied filename
+            topic_id: Topic ID to associate with
+            user_id: User ID of uploader
+            upload_folder: Directory to save uploaded files
+            job_id: Task ID the processing job will run under
+            prefix: Bytes already read from the stream
+            
         Returns:
             dict: {
                 'is_duplicate': bool,
                 'document_record': dict or None,
-                'existing_document': dict or None,
-                'chunks_created': int,
-                'file_path': str
+                'existing_document': dict or None
             }
         """
+        temp_file_path, file_hash = self.save_upload_stream(stream, original_filename, upload_folder, prefix)
+        
         try:
-            # Generate unique filename
-            original_filename = secure_filename(file.filename)
-            name, ext = os.path.splitext(original_filename)
-            filename = f"{name}_{uuid.uuid4()}{ext}"
-            temp_file_path = os.path.join(upload_folder, filename)
+            existing_doc = self.check_duplicate_by_file_hash(file_hash, topic_id)
+            if existing_doc:
+                os.remove(temp_file_path)
+                return {
+                    'is_duplicate': True,
+                    'document_record': None,
+                    'existing_document': existing_doc.to_dict()
+                }
             
-            # Ensure upload directory exists
-            os.makedirs(upload_folder, exist_ok=True)
+            final_file_path = os.path.join(upload_folder, f"{topic_id}_{os.path.basename(temp_file_path)}")
+            os.rename(temp_file_path, final_file_path)
+            temp_file_path = final_file_path
             
-            # Save file
-            file.save(temp_file_path)
+            document = self._insert_if_new(
+                id=str(uuid.uuid4()),
+                topic_id=topic_id,
+                filename=f"{uuid.uuid4()}{Path(final_file_path).suffix}",
+                original_filename=original_filename,
+                file_path=final_file_path,
+                file_hash=file_hash,
+                file_size=os.path.getsize(final_file_path),
+                content_hash='',  # Filled in once the content has been extracted
+                is_processed=False,
+                job_id=job_id,
+                uploaded_by=user_id
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            raise Exception(f"Failed to stage document upload: {str(e)}")
+        
+        if document is None:
+            # A concurrent upload of the same file was recorded first
+            os.remove(temp_file_path)
+            existing_doc = self._existing_by_file_hash(file_hash, topic_id)
+            return {
+                'is_duplicate': True,
+                'document_record': None,
+                'existing_document': existing_doc.to_dict()
+            }
+        
+        return {
+            'is_duplicate': False,
+            'document_record': document.to_dict(),
+            'existing_document': None
+        }
+    
+    def process_document_by_id(self, document_id: str) -> dict:
+        """
+        Extract, deduplicate and index a stored document.
+        
+        Used by the background task for staged uploads and for reprocessing. The
+        topic document count is only incremented the first time a document is processed.
+        
+        Args:
+            document_id: ID of the document record
             
-            # Calculate file hash
-            file_hash = self.calculate_file_hash(temp_file_path)
+        Returns:
+            dict: See process_stored_file
+        """
+        document = self.get_active_document(document_id)
+        if not document:
+            raise ValueError(f"Document {document_id} not found")
+        
+        first_run = not document.is_processed
+        content_hash, chunks = self.extract_and_hash_content(document.file_path)
+        self._tag_chunks(chunks, document.id, document.file_path)
+        
+        from app.services.registry import get_service
+        
+        vector_service = get_service('vector')
+        # Drop chunks left by an earlier run, including one that failed before the
+        # document was marked processed, so they aren't indexed twice or outlive a
+        # duplicate that is dropped below
+        vector_service.remove_document_from_topic(
+            document.topic_id, document.id, sources=self._chunk_sources(document)
+        )
+        
+        if first_run:
+            existing_doc = self.check_duplicate_by_content_hash(
+                content_hash, document.topic_id, exclude_id=document.id
+            )
+            if existing_doc:
+                # Same content already indexed under another file; drop this upload
+                self.delete_document(document.id)
+                return self._duplicate_result(existing_doc)
+        
+        if vector_service.topic_index_exists(document.topic_id):
+            vector_service.update_topic_index(document.topic_id, chunks)
+        else:
+            vector_service.create_topic_index(document.topic_id, chunks)
+        
+        # The document and the topic count are updated in one transaction
+        db_service = get_service('db')
+        try:
+            with db_service.unit_of_work():
+                document.content_hash = content_hash
+                document.chunk_count = len(chunks)
+                document.is_processed = True
+                if first_run:
+                    db_service.adjust_topic_document_count(document.topic_id, 1, commit=False)
+        except Exception as e:
+            raise Exception(f"Failed to mark document as processed: {str(e)}")
+        
+        return {
+            'is_duplicate': False,
+            'document_record': document.to_dict(),
+            'existing_document': None,
+            'chunks_created': len(chunks),
+            'file_path': document.file_path
+        }
+    
+    @staticmethod
+    def _tag_chunks(chunks: List[LangchainDocument], document_id: str, file_path: str) -> None:
+        """Record the owning document and its final path on each chunk so its vectors can be removed later."""
+        for chunk in chunks:
+            chunk.metadata['document_id'] = document_id
+            chunk.metadata['source'] = file_path
+    
+    @staticmethod
+    def _chunk_sources(document: Document) -> List[str]:
+        """
+        Paths a document's chunks may carry as ``source`` metadata.
+        
+        Chunks indexed before they were tagged with ``document_id`` can only be
+        matched by source, and uploads were extracted from their temporary path
+        (``<name>_<uuid>.pdf``) before being moved to ``<topic_id>_<name>_<uuid>.pdf``.
+        """
+        sources = [document.file_path]
+        directory, filename = os.path.split(document.file_path)
+        prefix = f"{document.topic_id}_"
+        if filename.startswith(prefix):
+            sources.append(os.path.join(directory, filename[len(prefix):]))
+        return sources
+    
+    def _existing_by_file_hash(self, file_hash: str, topic_id: str) -> Document:
+        """Look up the document an upload collided with on the unique (topic_id, file_hash) index."""
+        existing_doc = self.check_duplicate_by_file_hash(file_hash, topic_id)
+        if existing_doc is None:
+            # The copy it collided with was deleted in the meantime
+            raise ValueError("This file was just deleted from the topic; try uploading it again")
+        return existing_doc
+    
+    def _duplicate_result(self, existing_doc: Document) -> dict:
+        """Build the process_stored_file result for an upload that matched an existing document."""
+        return {
+            'is_duplicate': True,
+            'document_record': None,
+            'existing_document': existing_doc.to_dict(),
+            'chunks_created': existing_doc.chunk_count or 0,
+            'file_path': existing_doc.file_path
+        }
+    
+    def process_stored_file(self, temp_file_path: str, file_hash: str, original_filename: str,
+                            topic_id: str, user_id: str, upload_folder: str) -> dict:
+        """
+        Deduplicate, index and record an upload that has already been saved to disk.
+        
+        Args:
+            temp_file_path: Path the upload was saved to
+            file_hash: SHA-256 of the saved file
+            original_filename: Client-supplied filename
+            topic_id: Topic ID to associate with
+            user_id: User ID of uploader
+            upload_folder: Directory to save uploaded files
             
+        Returns:
+            dict: {
+                'is_duplicate': bool,
+                'document_record': dict or None,
+                'existing_document': dict or None,
+                'chunks_created': int,
+                'file_path': str
+            }
+        """
+        document_record = None
+        try:
             # Check for duplicate by file hash
             existing_doc = self.check_duplicate_by_file_hash(file_hash, topic_id)
             if existing_doc:
                 # Remove temp file since it's a duplicate
                 os.remove(temp_file_path)
-                return {
-                    'is_duplicate': True,
-                    'document_record': None,
-                    'existing_document': existing_doc.to_dict(),
-                    'chunks_created': existing_doc.chunk_count or 0,
-                    'file_path': existing_doc.file_path
-                }
+                return self._duplicate_result(existing_doc)
             
             # Extract content and calculate content hash
             content_hash, chunks = self.extract_and_hash_content(temp_file_path)
@@ -257,43 +708,52 @@ class DocumentService:
             if existing_content_doc:
                 # Remove temp file since content is duplicate
                 os.remove(temp_file_path)
-                return {
-                    'is_duplicate': True,
-                    'document_record': None,
-                    'existing_document': existing_content_doc.to_dict(),
-                    'chunks_created': existing_content_doc.chunk_count or 0,
-                    'file_path': existing_content_doc.file_path
-                }
+                return self._duplicate_result(existing_content_doc)
             
             # Create final file path
-            final_filename = f"{topic_id}_{filename}"
+            final_filename = f"{topic_id}_{os.path.basename(temp_file_path)}"
             final_file_path = os.path.join(upload_folder, final_filename)
             
             # Move file to final location
             os.rename(temp_file_path, final_file_path)
+            temp_file_path = final_file_path
             
-            # Create document record
+            from app.services.registry import get_service
+            
+            # Record the document as pending before any embedding; the unique
+            # (topic_id, file_hash) index makes this the point where a concurrent
+            # upload of the same file loses
             document_record = self.create_document_record(
                 topic_id=topic_id,
                 file_path=final_file_path,
-                original_filename=file.filename,
+                original_filename=original_filename,
                 uploaded_by=user_id,
-                chunks=chunks
+                chunks=chunks,
+                file_hash=file_hash,
+                processed=False
             )
+            if document_record is None:
+                os.remove(final_file_path)
+                return self._duplicate_result(self._existing_by_file_hash(file_hash, topic_id))
             
             # Add to vector store
-            from app.services.vector_store import VectorStoreService
-            from app.config import Config
             
-            vector_service = VectorStoreService(Config.CHROMA_PERSIST_DIR)
+            self._tag_chunks(chunks, document_record.id, final_file_path)
+            
+            vector_service = get_service('vector')
             
             if vector_service.topic_index_exists(topic_id):
                 vector_service.update_topic_index(topic_id, chunks)
             else:
                 vector_service.create_topic_index(topic_id, chunks)
             
-            # Mark as processed
-            self.mark_document_processed(document_record.id, len(chunks))
+            # The document and the topic count are updated in one transaction; an
+            # upload interrupted before this stays pending and can be reprocessed
+            db_service = get_service('db')
+            with db_service.unit_of_work():
+                document_record.chunk_count = len(chunks)
+                document_record.is_processed = True
+                db_service.adjust_topic_document_count(topic_id, 1, commit=False)
             
             return {
                 'is_duplicate': False,
@@ -304,7 +764,30 @@ class DocumentService:
             }
             
         except Exception as e:
+            # The pending record was committed before embedding; remove it so the
+            # failed upload doesn't linger or block a retry on the unique file index
+            if document_record is not None:
+                self._discard_failed_upload(document_record.id, topic_id)
+            
             # Clean up temp file if it exists
-            if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
+            if os.path.exists(temp_file_path):
                 os.remove(temp_file_path)
             raise Exception(f"Failed to process document upload: {str(e)}")
+    
+    def _discard_failed_upload(self, document_id: str, topic_id: str) -> None:
+        """Remove a pending upload whose indexing failed: its chunks and its row."""
+        from app.services.registry import get_service
+        
+        try:
+            get_service('vector').remove_document_from_topic(topic_id, document_id)
+        except Exception as e:
+            logger.warning("Failed to remove chunks of failed upload %s: %s", document_id, e)
+        
+        try:
+            db.session.execute(delete(Document).where(
+                Document.id == document_id, Document.is_processed.is_(False)
+            ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Failed to discard record of failed upload %s: %s", document_id, e)
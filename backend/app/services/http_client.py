@@ -0,0 +1,82 @@
+"""
+Shared HTTP client for outbound API calls (OpenAI chat and embeddings).
+"""
+import atexit
+import threading
+from typing import Optional
+
+import httpx
+import openai
+
+_client: Optional[httpx.Client] = None
+_openai_client: Optional[openai.OpenAI] = None
+_client_lock = threading.Lock()
+
+
+def _build_client(timeout: float, max_keepalive_connections: int) -> httpx.Client:
+    """Build a keep-alive client, preferring HTTP/2 when the h2 package is installed."""
+    limits = httpx.Limits(max_keepalive_connections=max_keepalive_connections)
+    try:
+        return httpx.Client(http2=True, limits=limits, timeout=timeout)
+    except ImportError:
+        # h2 is not installed; HTTP/1.1 keep-alive still avoids repeated TLS handshakes
+        return httpx.Client(limits=limits, timeout=timeout)
+
+
+def get_http_client(timeout: float = 60.0, max_keepalive_connections: int = 20) -> httpx.Client:
+    """
+    Get the process-wide HTTP client.
+
+    The client is created lazily on first use (after any worker fork) and reused
+    for the lifetime of the process so connections are pooled across requests.
+
+    Args:
+        timeout: Request timeout in seconds (only applied when the client is created)
+        max_keepalive_connections: Maximum idle connections kept in the pool
+
+    Returns:
+        Shared httpx.Client instance
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client(timeout, max_keepalive_connections)
+
+    return _client
+
+
+def get_openai_client() -> openai.OpenAI:
+    """
+    Get the process-wide OpenAI client backed by the shared HTTP client.
+
+    Pass ``client=get_openai_client().chat.completions`` / ``.embeddings`` to the
+    LangChain wrappers so every service instance reuses the same connection pool.
+
+    Returns:
+        Shared openai.OpenAI instance
+    """
+    global _openai_client
+
+    if _openai_client is None:
+        http_client = get_http_client()
+        with _client_lock:
+            if _openai_client is None:
+                _openai_client = openai.OpenAI(http_client=http_client)
+
+    return _openai_client
+
+
+def close_http_client() -> None:
+    """Close the shared HTTP client and release pooled connections."""
+    global _client, _openai_client
+
+    with _client_lock:
+        _openai_client = None
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_http_client)
@@ -6,13 +6,18 @@ from langchain.chains import RetrievalQA
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import Document
+from app.services.http_client import get_openai_client
 
 
 class QAChainService:
     """Service for creating and managing QA chains."""
     
     def __init__(self, model_name: str = "gpt-3.5-turbo", temperature: float = 0.0):
-        self.llm = ChatOpenAI(model=model_name, temperature=temperature)
+        self.llm = ChatOpenAI(
+            model=model_name,
+            temperature=temperature,
+            client=get_openai_client().chat.completions
+        )
         self.prompt_template = PromptTemplate(
             template="""You are a helpful AI teaching assistant. Answer the student's question using the provided course materials. 
             Provide clear, direct answers without mentioning the context or source limitations. 
@@ -0,0 +1,92 @@
+"""
+Per-application registry of long-lived service instances.
+
+Services hold no per-request state (database access goes through the scoped
+``db.session``), so each worker builds them once and shares them across requests.
+"""
+import threading
+from typing import Any, Callable, Dict
+
+from flask import Flask, current_app
+
+from app.services.attachment_processor import AttachmentProcessor, warm_up_parsers
+from app.services.database import DatabaseService
+from app.services.document_loader import DocumentLoader
+from app.services.document_service import DocumentService
+from app.utils.file_upload import FileUploadService
+from app.services.qa_chain import QAChainService
+from app.services.semantic_cache import SemanticCache
+from app.services.vector_store import VectorStoreService
+
+EXTENSION_KEY = 'course_pilot_services'
+
+# Re-entrant so factories can resolve the services they depend on
+_registry_lock = threading.RLock()
+
+_FACTORIES: Dict[str, Callable[[Flask], Any]] = {
+    'db': lambda app: DatabaseService(redis_url=app.config.get('REDIS_URL')),
+    'doc_loader': lambda app: DocumentLoader(
+        chunk_size=app.config.get('CHUNK_SIZE', 1000),
+        chunk_overlap=app.config.get('CHUNK_OVERLAP', 200)
+    ),
+    'search_cache': lambda app: SemanticCache(
+        app.config.get('REDIS_URL'),
+        ttl=app.config.get('SEMANTIC_CACHE_TTL', 900),
+        threshold=app.config.get('SEMANTIC_CACHE_THRESHOLD', 0.95)
+    ),
+    'vector': lambda app: VectorStoreService(
+        app.config['CHROMA_PERSIST_DIR'],
+        search_cache=get_service('search_cache', app)
+    ),
+    'documents': lambda app: DocumentService(get_service('db', app)),
+    'qa': lambda app: QAChainService(
+        model_name=app.config.get('MODEL_NAME', 'gpt-3.5-turbo'),
+        temperature=app.config.get('MODEL_TEMPERATURE', 0.0)
+    ),
+    'files': lambda app: FileUploadService(app.config.get('UPLOAD_DIR', 'uploads/attachments')),
+    'attachments': lambda app: AttachmentProcessor(
+        cache_dir=app.config.get('ATTACHMENT_CACHE_DIR'),
+        process_workers=app.config.get('ATTACHMENT_PROCESS_WORKERS', 0),
+        cache_max_age_days=app.config.get('ATTACHMENT_CACHE_MAX_AGE_DAYS', 7)
+    ),
+}
+
+
+def get_service(name: str, app: Flask = None) -> Any:
+    """
+    Get a shared service instance, building it on first use.
+
+    Args:
+        name: Registry key (see ``_FACTORIES``)
+        app: Flask application; defaults to ``current_app``
+
+    Returns:
+        Service instance owned by the application
+    """
+    if app is None:
+        app = current_app._get_current_object()
+
+    services = app.extensions.setdefault(EXTENSION_KEY, {})
+    service = services.get(name)
+    if service is None:
+        with _registry_lock:
+            service = services.get(name)
+            if service is None:
+                service = _FACTORIES[name](app)
+                services[name] = service
+    return service
+
+
+def init_services(app: Flask) -> None:
+    """Build every service up front so the first request doesn't pay for it."""
+    app.extensions.setdefault(EXTENSION_KEY, {})
+
+    # The LLM and embedding clients need an API key; tests build services lazily
+    if app.config.get('TESTING') or not app.config.get('OPENAI_API_KEY'):
+        return
+
+    for name in _FACTORIES:
+        get_service(name, app)
+
+    # Attachment parsers are imported on first use; load them while the worker starts
+    threading.Thread(target=warm_up_parsers, name='parser-warmup', daemon=True).start()
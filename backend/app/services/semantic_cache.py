@@ -0,0 +1,148 @@
+"""
+Redis semantic cache for topic document searches.
+
+Search results are stored next to the query embedding in a RediSearch vector
+index; a later query whose embedding is close enough (cosine similarity above
+the threshold) is answered from Redis without touching Chroma. The cache is
+disabled when no REDIS_URL is configured or the redis package is missing.
+"""
+import json
+import uuid
+from array import array
+from typing import List, Optional
+
+from langchain.schema import Document
+
+from app.utils.logging import get_logger
+
+try:
+    import redis
+    from redis.commands.search.field import NumericField, TagField, VectorField
+    from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+    from redis.commands.search.query import Query
+except ImportError:  # Redis is optional; searches go straight to Chroma without it
+    redis = None
+
+logger = get_logger(__name__)
+
+INDEX_NAME = 'semantic_cache_idx'
+KEY_PREFIX = 'sc:'
+
+
+def _escape_tag(value: str) -> str:
+    """Escape characters RediSearch treats specially inside TAG queries (e.g. UUID hyphens)."""
+    return ''.join(f'\\{ch}' if not ch.isalnum() else ch for ch in value)
+
+
+def _to_bytes(embedding: List[float]) -> bytes:
+    return array('f', embedding).tobytes()
+
+
+class SemanticCache:
+    """Embedding-keyed cache of search results, scoped per topic."""
+
+    def __init__(self, redis_url: Optional[str], ttl: int = 900, threshold: float = 0.95):
+        self.ttl = ttl
+        self.threshold = threshold
+        self._client = None
+        self._index_ready = False
+
+        if redis_url and redis is not None:
+            self._client = redis.Redis.from_url(redis_url)
+
+    @property
+    def enabled(self) -> bool:
+        return self._client is not None
+
+    def _ensure_index(self, dim: int) -> None:
+        """Create the vector index on first use; the dimension comes from the first embedding."""
+        if self._index_ready:
+            return
+
+        try:
+            self._client.ft(INDEX_NAME).info()
+        except redis.ResponseError:
+            self._client.ft(INDEX_NAME).create_index(
+                [
+                    TagField('topic_id'),
+                    NumericField('k'),
+                    VectorField('embedding', 'HNSW', {
+                        'TYPE': 'FLOAT32',
+                        'DIM': dim,
+                        'DISTANCE_METRIC': 'COSINE'
+                    })
+                ],
+                definition=IndexDefinition(prefix=[KEY_PREFIX], index_type=IndexType.HASH)
+            )
+        self._index_ready = True
+
+    def lookup(self, topic_id: str, embedding: List[float], k: int) -> Optional[List[Document]]:
+        """
+        Find cached results for a semantically equivalent query.
+
+        Args:
+            topic_id: Topic the search is scoped to
+            embedding: Query embedding
+            k: Number of results requested
+
+        Returns:
+            Cached documents, or None on a miss (or if Redis is unavailable)
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            self._ensure_index(len(embedding))
+            query = (
+                Query(f'(@topic_id:{{{_escape_tag(topic_id)}}} @k:[{k} +inf])=>[KNN 1 @embedding $vec AS distance]')
+                .sort_by('distance')
+                .return_fields('results', 'distance')
+                .dialect(2)
+            )
+            hits = self._client.ft(INDEX_NAME).search(query, query_params={'vec': _to_bytes(embedding)}).docs
+        except redis.RedisError as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+            return None
+
+        # Cosine distance is 1 - similarity
+        if not hits or 1 - float(hits[0].distance) < self.threshold:
+            return None
+
+        cached = json.loads(hits[0].results)
+        return [Document(page_content=item['content'], metadata=item['metadata']) for item in cached[:k]]
+
+    def store(self, topic_id: str, embedding: List[float], k: int, results: List[Document]) -> None:
+        """Cache search results for a query embedding."""
+        if not self.enabled:
+            return
+
+        key = f'{KEY_PREFIX}{topic_id}:{uuid.uuid4().hex}'
+        payload = json.dumps([
+            {'content': doc.page_content, 'metadata': doc.metadata} for doc in results
+        ])
+
+        try:
+            self._ensure_index(len(embedding))
+            pipe = self._client.pipeline(transaction=False)
+            pipe.hset(key, mapping={
+                'topic_id': topic_id,
+                'k': k,
+                'embedding': _to_bytes(embedding),
+                'results': payload
+            })
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Semantic cache store failed: %s", e)
+
+    def invalidate_topic(self, topic_id: str) -> None:
+        """Drop every cached search for a topic (call whenever its index changes)."""
+        if not self.enabled:
+            return
+
+        try:
+            keys = list(self._client.scan_iter(match=f'{KEY_PREFIX}{topic_id}:*', count=500))
+            if keys:
+                self._client.unlink(*keys)
+        except redis.RedisError as e:
+            logger.warning("Semantic cache invalidation failed for topic %s: %s", topic_id, e)
@@ -3,70 +3,102 @@ Vector store service for managing Chroma embeddings.
 """
 import os
 import shutil
-from typing import List, Optional
+import time
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
 from app.services.document_service import DocumentService
+from app.services.http_client import get_openai_client
+from app.services.semantic_cache import SemanticCache
+from app.utils.helpers import batched
+
+# How long a missing index is remembered before the filesystem is checked again
+INDEX_NEGATIVE_TTL = 5.0
+
+# How long an existing index is remembered; indexes are rarely deleted, but another
+# worker's delete_topic_index only clears its own process's cache
+INDEX_POSITIVE_TTL = 60.0
+
+# Chunks per embeddings request / Chroma upsert
+EMBED_BATCH_SIZE = 64
 
 
 class VectorStoreService:
     """Service for managing vector store operations."""
     
-    def __init__(self, persist_directory: str):
+    # Per-process index existence caches shared by all instances, keyed by index
+    # directory; values are the monotonic time each entry expires
+    _index_exists_cache: Dict[str, float] = {}
+    _index_missing_cache: Dict[str, float] = {}
+    
+    def __init__(self, persist_directory: str, search_cache: Optional[SemanticCache] = None):
         self.persist_directory = persist_directory
-        self.embeddings = OpenAIEmbeddings()
+        self.embeddings = OpenAIEmbeddings(client=get_openai_client().embeddings)
         self.document_service = DocumentService()
+        self.search_cache = search_cache
         
         # Ensure persist directory exists
         os.makedirs(persist_directory, exist_ok=True)
     
-    def create_topic_index(self, topic_id: str, documents: List[Document]) -> bool:
+    def create_topic_index(self, topic_id: str, documents: Iterable[Document]) -> bool:
         """
         Create vector index for a specific topic.
         
         Args:
             topic_id: Unique identifier for the topic
-            documents: List of documents to index
+            documents: Documents to index (any iterable, e.g. a chunk generator)
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            if not documents:
-                raise ValueError("No documents provided for indexing")
-            
             topic_persist_dir = os.path.join(self.persist_directory, topic_id)
             
-            # Process documents in smaller batches to avoid token limits
-            batch_size = 50  # Process 50 chunks at a time
-            vectorstore = None
-            
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i:i + batch_size]
-                
-                if vectorstore is None:
-                    # Create initial vectorstore with first batch
-                    vectorstore = Chroma.from_documents(
-                        documents=batch,
-                        embedding=self.embeddings,
-                        persist_directory=topic_persist_dir
-                    )
-                else:
-                    # Add subsequent batches to existing vectorstore
-                    vectorstore.add_documents(documents=batch)
-                
-                # Persist after each batch
-                vectorstore.persist()
+            if not self._add_in_batches(topic_persist_dir, documents):
+                raise ValueError("No documents provided for indexing")
             
+            self._mark_index_exists(topic_persist_dir)
+            self._invalidate_search_cache(topic_id)
             return True
             
         except Exception as e:
             # Clean up if creation fails
             if os.path.exists(topic_persist_dir):
                 shutil.rmtree(topic_persist_dir)
+                self._forget_index(topic_persist_dir)
             raise Exception(f"Failed to create vector index: {str(e)}")
     
+    def _add_in_batches(self, topic_persist_dir: str, documents: Iterable[Document]) -> int:
+        """
+        Embed and insert documents into a topic store in fixed-size batches.
+        
+        Each batch costs one embeddings request and one Chroma upsert, and the
+        documents may be any iterable, so chunk generators are never materialized.
+        With no documents the store is not opened, so no empty index is created.
+        
+        Returns:
+            Number of documents added
+        """
+        batches = batched(documents, EMBED_BATCH_SIZE)
+        first_batch = next(batches, None)
+        if first_batch is None:
+            return 0
+        
+        vectorstore = Chroma(
+            persist_directory=topic_persist_dir,
+            embedding_function=self.embeddings
+        )
+        
+        added = 0
+        for batch in chain([first_batch], batches):
+            vectorstore.add_documents(documents=batch)
+            added += len(batch)
+        
+        vectorstore.persist()
+        return added
+    
     def get_topic_retriever(self, topic_id: str, search_kwargs: Optional[dict] = None):
         """
         Get retriever for a specific topic.
@@ -99,13 +131,13 @@ class VectorStoreService:
         except Exception as e:
             raise Exception(f"Failed to load retriever: {str(e)}")
     
-    def update_topic_index(self, topic_id: str, new_documents: List[Document]) -> bool:
+    def update_topic_index(self, topic_id: str, new_documents: Iterable[Document]) -> bool:
         """
         Update existing topic index with new documents.
         
         Args:
             topic_id: Unique identifier for the topic
-            new_documents: List of new documents to add
+            new_documents: New documents to add (any iterable)
             
         Returns:
             True if successful, False otherwise
@@ -113,26 +145,10 @@ class VectorStoreService:
         try:
             topic_persist_dir = os.path.join(self.persist_directory, topic_id)
             
-            if os.path.exists(topic_persist_dir):
-                # Load existing vectorstore
-                vectorstore = Chroma(
-                    persist_directory=topic_persist_dir,
-                    embedding_function=self.embeddings
-                )
-                
-                # Add new documents
-                vectorstore.add_documents(new_documents)
-            else:
-                # Create new vectorstore if it doesn't exist
-                vectorstore = Chroma.from_documents(
-                    documents=new_documents,
-                    embedding=self.embeddings,
-                    persist_directory=topic_persist_dir
-                )
-            
-            # Persist changes
-            vectorstore.persist()
-            
+            # Opens the existing store, or creates it if it doesn't exist
+            if self._add_in_batches(topic_persist_dir, new_documents):
+                self._mark_index_exists(topic_persist_dir)
+                self._invalidate_search_cache(topic_id)
             return True
             
         except Exception as e:
@@ -150,6 +166,8 @@ class VectorStoreService:
         """
         try:
             topic_persist_dir = os.path.join(self.persist_directory, topic_id)
+            self._forget_index(topic_persist_dir)
+            self._invalidate_search_cache(topic_id)
             
             if os.path.exists(topic_persist_dir):
                 shutil.rmtree(topic_persist_dir)
@@ -161,6 +179,42 @@ class VectorStoreService:
         except Exception as e:
             raise Exception(f"Failed to delete index: {str(e)}")
     
+    def remove_document_from_topic(self, topic_id: str, document_id: str, sources: Sequence[str] = ()) -> bool:
+        """
+        Remove a document's chunks from a topic index.
+        
+        Chunks are matched on their ``document_id`` metadata; ``sources`` (file
+        paths the chunks may have been loaded from) also catches chunks indexed
+        before that tag existed. Removing chunks that are already gone is a no-op.
+        
+        Args:
+            topic_id: Unique identifier for the topic
+            document_id: ID of the document record
+            sources: File paths recorded in the chunks' ``source`` metadata
+            
+        Returns:
+            True if successful
+        """
+        try:
+            if not self.topic_index_exists(topic_id):
+                return True
+            
+            topic_persist_dir = os.path.join(self.persist_directory, topic_id)
+            vectorstore = Chroma(
+                persist_directory=topic_persist_dir,
+                embedding_function=self.embeddings
+            )
+            
+            vectorstore._collection.delete(where={'document_id': document_id})
+            if sources:
+                vectorstore._collection.delete(where={'source': {'$in': list(sources)}})
+            
+            self._invalidate_search_cache(topic_id)
+            return True
+            
+        except Exception as e:
+            raise Exception(f"Failed to remove document from index: {str(e)}")
+    
     def topic_index_exists(self, topic_id: str) -> bool:
         """
         Check if a topic index exists.
@@ -172,7 +226,40 @@ class VectorStoreService:
             True if index exists, False otherwise
         """
         topic_persist_dir = os.path.join(self.persist_directory, topic_id)
-        return os.path.exists(topic_persist_dir)
+        
+        now = time.monotonic()
+        exists_until = self._index_exists_cache.get(topic_persist_dir)
+        if exists_until is not None and exists_until > now:
+            return True
+        
+        missing_until = self._index_missing_cache.get(topic_persist_dir)
+        if missing_until is not None and missing_until > now:
+            return False
+        
+        if os.path.exists(topic_persist_dir):
+            self._mark_index_exists(topic_persist_dir)
+            return True
+        
+        self._index_exists_cache.pop(topic_persist_dir, None)
+        self._index_missing_cache[topic_persist_dir] = now + INDEX_NEGATIVE_TTL
+        return False
+    
+    @classmethod
+    def _mark_index_exists(cls, topic_persist_dir: str) -> None:
+        """Record that an index directory exists."""
+        cls._index_missing_cache.pop(topic_persist_dir, None)
+        cls._index_exists_cache[topic_persist_dir] = time.monotonic() + INDEX_POSITIVE_TTL
+    
+    @classmethod
+    def _forget_index(cls, topic_persist_dir: str) -> None:
+        """Drop any cached existence state for an index directory."""
+        cls._index_exists_cache.pop(topic_persist_dir, None)
+        cls._index_missing_cache.pop(topic_persist_dir, None)
+    
+    def _invalidate_search_cache(self, topic_id: str) -> None:
+        """Drop cached search results once a topic's index has changed."""
+        if self.search_cache is not None:
+            self.search_cache.invalidate_topic(topic_id)
     
     def get_topic_document_count(self, topic_id: str) -> int:
         """
@@ -216,8 +303,28 @@ class VectorStoreService:
             List of relevant documents
         """
         try:
-            retriever = self.get_topic_retriever(topic_id, {"k": k})
-            return retriever.get_relevant_documents(query)
+            if self.search_cache is None or not self.search_cache.enabled:
+                retriever = self.get_topic_retriever(topic_id, {"k": k})
+                return retriever.get_relevant_documents(query)
+            
+            # Embed once and reuse the vector for both the cache lookup and the Chroma search
+            embedding = self.embeddings.embed_query(query)
+            cached = self.search_cache.lookup(topic_id, embedding, k)
+            if cached is not None:
+                return cached
+            
+            topic_persist_dir = os.path.join(self.persist_directory, topic_id)
+            if not os.path.exists(topic_persist_dir):
+                raise ValueError(f"No vector store found for topic: {topic_id}")
+            
+            vectorstore = Chroma(
+                persist_directory=topic_persist_dir,
+                embedding_function=self.embeddings
+            )
+            results = vectorstore.similarity_search_by_vector(embedding, k=k)
+            
+            self.search_cache.store(topic_id, embedding, k, results)
+            return results
             
         except Exception as e:
             raise Exception(f"Failed to search topic documents: {str(e)}")
@@ -290,33 +397,10 @@ class VectorStoreService:
             # Create or update vector index
             topic_persist_dir = os.path.join(self.persist_directory, topic_id)
             
-            # Process documents in smaller batches to avoid token limits
-            batch_size = 50
-            vectorstore = None
+            self._add_in_batches(topic_persist_dir, chunks)
             
-            if os.path.exists(topic_persist_dir):
-                # Load existing vectorstore
-                vectorstore = Chroma(
-                    persist_directory=topic_persist_dir,
-                    embedding_function=self.embeddings
-                )
-            
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                
-                if vectorstore is None:
-                    # Create initial vectorstore with first batch
-                    vectorstore = Chroma.from_documents(
-                        documents=batch,
-                        embedding=self.embeddings,
-                        persist_directory=topic_persist_dir
-                    )
-                else:
-                    # Add subsequent batches to existing vectorstore
-                    vectorstore.add_documents(documents=batch)
-                
-                # Persist after each batch
-                vectorstore.persist()
+            self._mark_index_exists(topic_persist_dir)
+            self._invalidate_search_cache(topic_id)
             
             # Create document record in database
             document = self.document_service.create_document_record(
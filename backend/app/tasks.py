@@ -0,0 +1,56 @@
+"""
+Background tasks for document processing.
+
+Tasks are only registered when Celery is installed; the worker is started with
+``celery -A celery_worker.celery worker``.
+"""
+from app.extensions import celery_app
+from app.services.registry import get_service
+
+
+def process_document(document_id: str) -> dict:
+    """Extract, embed and index a staged document, discarding the upload if that fails."""
+    doc_service = get_service('documents')
+    try:
+        result = doc_service.process_document_by_id(document_id)
+    except Exception:
+        # Otherwise the unindexed upload would answer every later upload of the same file
+        doc_service.discard_staged_upload(document_id)
+        raise
+    return {
+        'documentId': document_id,
+        'duplicate': result['is_duplicate'],
+        'chunksCreated': result['chunks_created']
+    }
+
+
+def cleanup_document(document_id: str) -> dict:
+    """Remove a deleted document's vectors and file, then purge its row."""
+    purged = get_service('documents').cleanup_deleted_document(document_id)
+    return {
+        'documentId': document_id,
+        'purged': purged
+    }
+
+
+def cleanup_deleted_documents() -> dict:
+    """Retry cleanup for documents that are still soft-deleted."""
+    return {'purged': get_service('documents').cleanup_deleted_documents()}
+
+
+if celery_app is not None:
+    process_document_task = celery_app.task(name='documents.process_document')(process_document)
+    # Cleanup retries with backoff; the periodic sweep picks up any that exhaust their retries
+    cleanup_document_task = celery_app.task(
+        name='documents.cleanup_document',
+        autoretry_for=(Exception,),
+        retry_backoff=True,
+        max_retries=5
+    )(cleanup_document)
+    cleanup_deleted_documents_task = celery_app.task(
+        name='documents.cleanup_deleted_documents'
+    )(cleanup_deleted_documents)
+else:
+    process_document_task = None
+    cleanup_document_task = None
+    cleanup_deleted_documents_task = None
@@ -3,9 +3,12 @@ Helper utilities for the application.
 """
 import os
 import json
+import mmap
 import uuid
+import hashlib
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 
 def generate_uuid() -> str:
@@ -97,6 +100,34 @@ def cleanup_old_files(directory: str, max_age_days: int = 30) -> int:
     return deleted_count
 
 
+def hash_file(file_path: str) -> str:
+    """
+    Calculate the SHA-256 hex digest of a file.
+
+    The file is memory-mapped and hashed in one call, so hashlib reads straight
+    from the page cache instead of copying it through Python-level read buffers.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest of the file's contents
+    """
+    with open(file_path, 'rb') as f:
+        # Zero-length files can't be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to ``size`` items from any iterable."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
 def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
     """Truncate text to specified length."""
     if not text or len(text) <= max_length:
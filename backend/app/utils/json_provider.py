@@ -0,0 +1,32 @@
+"""
+orjson-backed JSON provider for Flask.
+"""
+from typing import Any
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Non-string keys are stringified like the stdlib encoder does; datetimes are
+# passed to Flask's default so they keep the HTTP date format jsonify has always used
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Encode responses with orjson, falling back to Flask's default for types it doesn't handle."""
+
+    # Keep insertion order; sorting every payload costs more than it's worth
+    sort_keys = False
+
+    def _dumps_bytes(self, obj: Any) -> bytes:
+        option = ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
@@ -1,11 +1,42 @@
 """
 Logging configuration for the Flask application
 """
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 from pathlib import Path
 
+# Third-party loggers turned down to WARNING and routed through the log queue
+QUIET_LOGGERS = ('werkzeug', 'langchain', 'chromadb', 'openai')
+
+# One queue listener per process; setup_logging (e.g. each create_app) replaces it
+_listener = None
+_queue_handler = None
+_attached_loggers = []
+_listener_lock = threading.Lock()
+
+
+def _stop_listener():
+    """Detach the current queue handler and stop its listener, flushing queued records."""
+    global _listener, _queue_handler
+    with _listener_lock:
+        if _listener is None:
+            return
+        for logger in _attached_loggers:
+            logger.removeHandler(_queue_handler)
+        _attached_loggers.clear()
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
+
+
+atexit.register(_stop_listener)
+
 
 def setup_logging(app):
     """Configure logging for the Flask application."""
@@ -36,26 +67,42 @@ def setup_logging(app):
     console_handler.setFormatter(formatter)
     console_handler.setLevel(log_level)
     
-    # Configure app logger
-    app.logger.setLevel(log_level)
-    app.logger.addHandler(file_handler)
+    # Handlers run on a background listener thread; request threads only enqueue records
+    handlers = [file_handler]
     
     # Only add console handler in development
     if app.config.get('FLASK_ENV') == 'development':
-        app.logger.addHandler(console_handler)
+        handlers.append(console_handler)
     
-    # Configure other loggers
-    loggers = [
-        'werkzeug',
-        'langchain',
-        'chromadb',
-        'openai'
-    ]
+    # Replace any listener from an earlier call instead of leaking its thread and
+    # doubling every record through a second queue handler
+    _stop_listener()
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setLevel(log_level)
+    
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    
+    # Configure app logger
+    app.logger.setLevel(log_level)
     
-    for logger_name in loggers:
+    # Configure other loggers
+    loggers = [app.logger]
+    for logger_name in QUIET_LOGGERS:
         logger = logging.getLogger(logger_name)
         logger.setLevel(logging.WARNING)  # Reduce noise from third-party libraries
-        logger.addHandler(file_handler)
+        loggers.append(logger)
+    
+    global _listener, _queue_handler
+    with _listener_lock:
+        for logger in loggers:
+            logger.addHandler(queue_handler)
+        _attached_loggers.extend(loggers)
+        _queue_handler = queue_handler
+        _listener = listener
+        listener.start()
+    app.extensions['log_listener'] = listener
     
     app.logger.info("Logging configured successfully")
 
@@ -4,6 +4,12 @@ Validation utilities for the application.
 import re
 from typing import Any
 
+# Compiled once at import; these run on every auth and profile request
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+TOPIC_NAME_RE = re.compile(r'^[a-zA-Z0-9\s\-_]+$')
+UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+UNSAFE_FILENAME_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+
 
 def validate_email(email: str) -> bool:
     """
@@ -18,8 +24,7 @@ def validate_email(email: str) -> bool:
     if not email or not isinstance(email, str):
         return False
     
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(email_pattern, email.strip()) is not None
+    return EMAIL_RE.match(email.strip()) is not None
 
 
 def validate_password(password: str) -> bool:
@@ -68,7 +73,7 @@ def validate_topic_name(name: str) -> bool:
         return False
     
     # Check for valid characters (letters, numbers, spaces, hyphens, underscores)
-    if not re.match(r'^[a-zA-Z0-9\s\-_]+$', name):
+    if not TOPIC_NAME_RE.match(name):
         return False
     
     return True
@@ -102,8 +107,7 @@ def validate_uuid(uuid_string: str) -> bool:
     if not uuid_string or not isinstance(uuid_string, str):
         return False
     
-    uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
-    return re.match(uuid_pattern, uuid_string.lower()) is not None
+    return UUID_RE.match(uuid_string.lower()) is not None
 
 
 def sanitize_filename(filename: str) -> str:
@@ -120,7 +124,7 @@ def sanitize_filename(filename: str) -> str:
         return "untitled"
     
     # Remove path separators and dangerous characters
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = UNSAFE_FILENAME_CHARS_RE.sub('_', filename)
     
     # Limit length
     if len(filename) > 255:
@@ -0,0 +1,13 @@
+"""
+Celery worker entry point.
+
+Run with: celery -A celery_worker.celery worker --loglevel=info
+Add -B (or run `celery -A celery_worker.celery beat`) for the periodic sweep that
+retries failed cleanups of deleted documents. Requires CELERY_BROKER_URL to be set.
+"""
+import os
+from app import create_app
+import app.tasks  # noqa: F401  (registers tasks with the worker)
+
+flask_app = create_app(os.getenv('FLASK_ENV', 'production'))
+celery = flask_app.extensions['celery']
@@ -0,0 +1,31 @@
+"""Add job_id to documents for background processing
+
+Revision ID: 002_add_document_job_id
+Revises: 001_add_document_model
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002_add_document_job_id'
+down_revision = '001_add_document_model'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('documents')]
+
+    if 'job_id' not in columns:
+        with op.batch_alter_table('documents', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('job_id', sa.String(length=36), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('job_id')
@@ -0,0 +1,32 @@
+"""Enforce one copy of a file per topic
+
+Revision ID: 003_unique_document_file_hash
+Revises: 002_add_document_job_id
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_unique_document_file_hash'
+down_revision = '002_add_document_job_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    index_names = [idx['name'] for idx in inspector.get_indexes('documents')]
+
+    if 'uq_documents_topic_file_hash' not in index_names:
+        # Fails if duplicates already exist; remove them before upgrading
+        with op.batch_alter_table('documents', schema=None) as batch_op:
+            batch_op.create_index('uq_documents_topic_file_hash', ['topic_id', 'file_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index('uq_documents_topic_file_hash')
@@ -0,0 +1,29 @@
+"""Enforce case-insensitive unique topic names
+
+Revision ID: 004_unique_topic_name
+Revises: 003_unique_document_file_hash
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_unique_topic_name'
+down_revision = '003_unique_document_file_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Reflection can't see expression indexes on SQLite, so let the database skip an
+    # index db.create_all() already made. Fails if names differing only by case
+    # already exist; rename them before upgrading
+    op.create_index(
+        'uq_topics_name_lower', 'topics', [sa.text('lower(name)')], unique=True, if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_topics_name_lower', table_name='topics')
@@ -0,0 +1,31 @@
+"""Index documents by topic and processing state
+
+Revision ID: 005_document_topic_indexes
+Revises: 004_unique_topic_name
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_document_topic_indexes'
+down_revision = '004_unique_topic_name'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    index_names = [idx['name'] for idx in inspector.get_indexes('documents')]
+
+    if 'ix_documents_topic_processed' not in index_names:
+        with op.batch_alter_table('documents', schema=None) as batch_op:
+            batch_op.create_index('ix_documents_topic_processed', ['topic_id', 'is_processed'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index('ix_documents_topic_processed')
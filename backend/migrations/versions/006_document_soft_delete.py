@@ -0,0 +1,31 @@
+"""Add deleted_at to documents for deferred cleanup
+
+Revision ID: 006_document_soft_delete
+Revises: 005_document_topic_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_document_soft_delete'
+down_revision = '005_document_topic_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = [col['name'] for col in inspector.get_columns('documents')]
+
+    if 'deleted_at' not in columns:
+        with op.batch_alter_table('documents', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
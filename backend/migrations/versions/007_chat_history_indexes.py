@@ -0,0 +1,52 @@
+"""Index chat sessions, messages and topics for their listing queries
+
+Revision ID: 007_chat_history_indexes
+Revises: 006_document_soft_delete
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_chat_history_indexes'
+down_revision = '006_document_soft_delete'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'topics': [
+        ('ix_topics_created_at', ['created_at']),
+    ],
+    'chat_sessions': [
+        ('ix_chat_sessions_user_created', ['user_id', 'created_at']),
+        ('ix_chat_sessions_user_topic_created', ['user_id', 'topic_id', 'created_at']),
+    ],
+    'messages': [
+        ('ix_messages_session_created', ['session_id', 'created_at']),
+        ('ix_messages_sender_created', ['sender', 'created_at']),
+    ],
+}
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    for table_name, indexes in INDEXES.items():
+        index_names = [idx['name'] for idx in inspector.get_indexes(table_name)]
+        missing = [(name, columns) for name, columns in indexes if name not in index_names]
+        if not missing:
+            continue
+
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name, columns in missing:
+                batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table_name, indexes in INDEXES.items():
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name, _ in indexes:
+                batch_op.drop_index(name)
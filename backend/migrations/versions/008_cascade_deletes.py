@@ -0,0 +1,76 @@
+"""Cascade deletes from users, topics and chat sessions to their dependent rows
+
+Revision ID: 008_cascade_deletes
+Revises: 007_chat_history_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_cascade_deletes'
+down_revision = '007_chat_history_indexes'
+branch_labels = None
+depends_on = None
+
+# table -> [(column, referred table)]
+FOREIGN_KEYS = {
+    'topics': [('created_by', 'users')],
+    'documents': [('topic_id', 'topics')],
+    'chat_sessions': [('user_id', 'users'), ('topic_id', 'topics')],
+    'messages': [('session_id', 'chat_sessions')],
+}
+
+# Gives SQLite's unnamed foreign keys a name batch mode can drop them by
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def _set_ondelete(ondelete):
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    sqlite = connection.dialect.name == 'sqlite'
+
+    if sqlite:
+        # Batch mode rebuilds each table and drops the old copy; with foreign keys
+        # enforced that drop would fail (or cascade into the child tables)
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    for table_name, foreign_keys in FOREIGN_KEYS.items():
+        existing = {
+            tuple(fk['constrained_columns']): fk for fk in inspector.get_foreign_keys(table_name)
+        }
+        changes = []
+        for column, referred_table in foreign_keys:
+            fk = existing.get((column,))
+            current = (fk or {}).get('options', {}).get('ondelete')
+            if fk is not None and (current or '').upper() != (ondelete or '').upper():
+                changes.append((fk['name'], column, referred_table))
+        if not changes:
+            continue
+
+        with op.batch_alter_table(table_name, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for name, column, referred_table in changes:
+                new_name = f'fk_{table_name}_{column}_{referred_table}'
+                batch_op.drop_constraint(name or new_name, type_='foreignkey')
+                batch_op.create_foreign_key(new_name, referred_table, [column], ['id'], ondelete=ondelete)
+
+        # The rebuild can't reflect expression indexes, so restore the case-insensitive name index
+        if sqlite and table_name == 'topics':
+            op.create_index(
+                'uq_topics_name_lower', 'topics', [sa.text('lower(name)')], unique=True, if_not_exists=True
+            )
+
+    if sqlite:
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def upgrade():
+    _set_ondelete('CASCADE')
+
+
+def downgrade():
+    _set_ondelete(None)
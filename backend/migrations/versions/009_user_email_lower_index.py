@@ -0,0 +1,26 @@
+"""Index lower(email) for case-insensitive logins
+
+Revision ID: 009_user_email_lower_index
+Revises: 008_cascade_deletes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_user_email_lower_index'
+down_revision = '008_cascade_deletes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Reflection can't see expression indexes on SQLite, so let the database skip an
+    # index db.create_all() already made
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_users_email_lower', table_name='users')
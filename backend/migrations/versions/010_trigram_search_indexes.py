@@ -0,0 +1,57 @@
+"""Add trigram indexes for user and topic substring search
+
+Revision ID: 010_trigram_search_indexes
+Revises: 009_user_email_lower_index
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010_trigram_search_indexes'
+down_revision = '009_user_email_lower_index'
+branch_labels = None
+depends_on = None
+
+# GIN trigram indexes let PostgreSQL answer ILIKE '%q%' without a full scan
+INDEXES = {
+    'users': [
+        ('ix_users_name_trgm', 'name'),
+        ('ix_users_email_trgm', 'email'),
+    ],
+    'topics': [
+        ('ix_topics_name_trgm', 'name'),
+        ('ix_topics_description_trgm', 'description'),
+    ],
+}
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        # pg_trgm is PostgreSQL-only; other databases keep scanning (fine at SQLite sizes)
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    inspector = sa.inspect(connection)
+
+    for table_name, indexes in INDEXES.items():
+        index_names = [idx['name'] for idx in inspector.get_indexes(table_name)]
+        for name, column in indexes:
+            if name not in index_names:
+                op.create_index(
+                    name, table_name, [column],
+                    postgresql_using='gin',
+                    postgresql_ops={column: 'gin_trgm_ops'}
+                )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table_name, indexes in INDEXES.items():
+        for name, _ in indexes:
+            op.drop_index(name, table_name=table_name)
@@ -0,0 +1,31 @@
+"""Index chat sessions by topic
+
+Revision ID: 011_chat_session_topic_index
+Revises: 010_trigram_search_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011_chat_session_topic_index'
+down_revision = '010_trigram_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    index_names = [idx['name'] for idx in inspector.get_indexes('chat_sessions')]
+
+    if 'ix_chat_sessions_topic_id' not in index_names:
+        with op.batch_alter_table('chat_sessions', schema=None) as batch_op:
+            batch_op.create_index('ix_chat_sessions_topic_id', ['topic_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_sessions_topic_id')
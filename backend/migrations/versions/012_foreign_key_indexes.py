@@ -0,0 +1,48 @@
+"""Index the remaining foreign keys to users
+
+Revision ID: 012_foreign_key_indexes
+Revises: 011_chat_session_topic_index
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012_foreign_key_indexes'
+down_revision = '011_chat_session_topic_index'
+branch_labels = None
+depends_on = None
+
+# ON DELETE CASCADE from users looks rows up by these columns
+INDEXES = {
+    'topics': [
+        ('ix_topics_created_by', ['created_by']),
+    ],
+    'documents': [
+        ('ix_documents_uploaded_by', ['uploaded_by']),
+    ],
+}
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+
+    for table_name, indexes in INDEXES.items():
+        index_names = [idx['name'] for idx in inspector.get_indexes(table_name)]
+        missing = [(name, columns) for name, columns in indexes if name not in index_names]
+        if not missing:
+            continue
+
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name, columns in missing:
+                batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table_name, indexes in INDEXES.items():
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for name, _ in indexes:
+                batch_op.drop_index(name)
@@ -0,0 +1,31 @@
+"""Index users by creation time for keyset pagination
+
+Revision ID: 013_user_created_at_index
+Revises: 012_foreign_key_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013_user_created_at_index'
+down_revision = '012_foreign_key_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    index_names = [idx['name'] for idx in inspector.get_indexes('users')]
+
+    if 'ix_users_created_at_id' not in index_names:
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.create_index('ix_users_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_created_at_id')
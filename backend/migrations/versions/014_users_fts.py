@@ -0,0 +1,48 @@
+"""Add a trigram FTS5 index for user search on SQLite
+
+Revision ID: 014_users_fts
+Revises: 013_user_created_at_index
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '014_users_fts'
+down_revision = '013_user_created_at_index'
+branch_labels = None
+depends_on = None
+
+# The original rowid-keyed index; 017 replaces it with the one in app.models.USERS_FTS_DDL
+STATEMENTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "name, email, content='users', content_rowid='rowid', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, name, email) VALUES (new.rowid, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.rowid, old.name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.rowid, old.name, old.email); "
+    "INSERT INTO users_fts(rowid, name, email) VALUES (new.rowid, new.name, new.email); END",
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        # PostgreSQL searches through the pg_trgm indexes from 010
+        return
+
+    for statement in STATEMENTS:
+        op.execute(statement)
+    # Index the users that already exist
+    op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for trigger in ('users_fts_insert', 'users_fts_delete', 'users_fts_update'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS users_fts')
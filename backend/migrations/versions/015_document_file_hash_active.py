@@ -0,0 +1,31 @@
+"""Limit the unique file hash index to documents that aren't deleted
+
+Revision ID: 015_document_file_hash_active
+Revises: 014_users_fts
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015_document_file_hash_active'
+down_revision = '014_users_fts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A soft-deleted row waiting for cleanup no longer blocks re-uploading the same file
+    op.drop_index('uq_documents_topic_file_hash', table_name='documents', if_exists=True)
+    op.create_index(
+        'uq_documents_topic_file_hash', 'documents', ['topic_id', 'file_hash'], unique=True,
+        sqlite_where=sa.text('deleted_at IS NULL'), postgresql_where=sa.text('deleted_at IS NULL')
+    )
+
+
+def downgrade():
+    # Fails if a file was re-uploaded while its deleted copy was still pending cleanup
+    op.drop_index('uq_documents_topic_file_hash', table_name='documents')
+    op.create_index('uq_documents_topic_file_hash', 'documents', ['topic_id', 'file_hash'], unique=True)
@@ -0,0 +1,69 @@
+"""Keep documents when their uploader is deleted
+
+Revision ID: 016_document_uploader_set_null
+Revises: 015_document_file_hash_active
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016_document_uploader_set_null'
+down_revision = '015_document_file_hash_active'
+branch_labels = None
+depends_on = None
+
+FK_NAME = 'fk_documents_uploaded_by_users'
+
+# Gives SQLite's unnamed foreign keys a name batch mode can drop them by
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def _set_uploader_fk(ondelete, nullable):
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    sqlite = connection.dialect.name == 'sqlite'
+
+    fk = next(
+        (fk for fk in inspector.get_foreign_keys('documents') if fk['constrained_columns'] == ['uploaded_by']),
+        None
+    )
+    # Batch mode can't carry the partial unique index across a SQLite rebuild
+    unique_index = next(
+        (idx for idx in inspector.get_indexes('documents') if idx['name'] == 'uq_documents_topic_file_hash'),
+        None
+    )
+
+    if sqlite:
+        # Batch mode rebuilds the table and drops the old copy; with foreign keys
+        # enforced that drop would fail
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    with op.batch_alter_table('documents', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        if fk is not None:
+            batch_op.drop_constraint(fk['name'] or FK_NAME, type_='foreignkey')
+        batch_op.alter_column('uploaded_by', existing_type=sa.String(length=36), nullable=nullable)
+        batch_op.create_foreign_key(FK_NAME, 'users', ['uploaded_by'], ['id'], ondelete=ondelete)
+
+    if sqlite and unique_index is not None:
+        op.drop_index('uq_documents_topic_file_hash', table_name='documents', if_exists=True)
+        op.create_index(
+            'uq_documents_topic_file_hash', 'documents', ['topic_id', 'file_hash'], unique=True,
+            sqlite_where=sa.text('deleted_at IS NULL')
+        )
+
+    if sqlite:
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def upgrade():
+    _set_uploader_fk('SET NULL', nullable=True)
+
+
+def downgrade():
+    # Fails if documents of deleted uploaders (uploaded_by NULL) exist; reassign them first
+    _set_uploader_fk(None, nullable=False)
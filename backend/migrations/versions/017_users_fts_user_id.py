@@ -0,0 +1,68 @@
+"""Key the user search index by user id instead of rowid
+
+Revision ID: 017_users_fts_user_id
+Revises: 016_document_uploader_set_null
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '017_users_fts_user_id'
+down_revision = '016_document_uploader_set_null'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ('users_fts_insert', 'users_fts_delete', 'users_fts_update')
+
+# Same statements as app.models.USERS_FTS_DDL
+STATEMENTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "user_id UNINDEXED, name, email, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(user_id, name, email) VALUES (new.id, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_fts WHERE user_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN "
+    "UPDATE users_fts SET name = new.name, email = new.email WHERE user_id = old.id; END",
+)
+
+# The rowid-keyed index from 014, which VACUUM and table rebuilds could leave pointing at the wrong users
+ROWID_STATEMENTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "name, email, content='users', content_rowid='rowid', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, name, email) VALUES (new.rowid, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.rowid, old.name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, email) VALUES ('delete', old.rowid, old.name, old.email); "
+    "INSERT INTO users_fts(rowid, name, email) VALUES (new.rowid, new.name, new.email); END",
+)
+
+
+def _drop_index():
+    for trigger in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS users_fts')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    _drop_index()
+    for statement in STATEMENTS:
+        op.execute(statement)
+    op.execute("INSERT INTO users_fts(user_id, name, email) SELECT id, name, email FROM users")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    _drop_index()
+    for statement in ROWID_STATEMENTS:
+        op.execute(statement)
+    op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
@@ -0,0 +1,239 @@
+"""
+Test cases for the database service and the admin routes built on it
+"""
+import pytest
+from werkzeug.security import generate_password_hash
+from app.extensions import db
+from app.models import ChatSession, Document, Message, Topic, User
+from app.services.registry import get_service
+
+
+def register(client, name, email, role='student'):
+    """Register a user and return its ID."""
+    response = client.post('/api/auth/register', json={
+        'name': name,
+        'email': email,
+        'password': 'testpassword',
+        'role': role
+    })
+    return response.get_json()['user']['id']
+
+
+def add_document(topic_id, uploaded_by, file_hash):
+    """Record a processed document directly."""
+    document = Document(
+        id=file_hash[:36],
+        topic_id=topic_id,
+        filename=f'{file_hash[:8]}.pdf',
+        original_filename='notes.pdf',
+        file_path=f'/nonexistent/{file_hash[:8]}.pdf',
+        file_hash=file_hash,
+        file_size=10,
+        content_hash=file_hash,
+        uploaded_by=uploaded_by,
+        is_processed=True
+    )
+    db.session.add(document)
+    db.session.commit()
+    return document.id
+
+
+class TestPasswords:
+    """Test password verification and hash upgrades."""
+    
+    def test_legacy_hash_is_upgraded(self, app):
+        """Test that a Werkzeug hash is accepted and rehashed with the current scheme."""
+        with app.app_context():
+            db_service = get_service('db')
+            user = db_service.create_user('Legacy User', 'legacy@example.com', 'unused', 'student')
+            user = db.session.get(User, user.id)
+            user.password_hash = generate_password_hash('oldpassword', method='pbkdf2:sha256')
+            db.session.commit()
+            
+            assert db_service.verify_user_password(user, 'oldpassword', upgrade=True) is True
+            
+            user = db.session.get(User, user.id)
+            assert user.password_hash.startswith('$argon2')
+            assert db_service.verify_user_password(user, 'oldpassword') is True
+    
+    def test_wrong_password_keeps_legacy_hash(self, app):
+        """Test that a failed check leaves a legacy hash alone."""
+        with app.app_context():
+            db_service = get_service('db')
+            user = db_service.create_user('Legacy User', 'legacy@example.com', 'unused', 'student')
+            user = db.session.get(User, user.id)
+            legacy_hash = generate_password_hash('oldpassword', method='pbkdf2:sha256')
+            user.password_hash = legacy_hash
+            db.session.commit()
+            
+            assert db_service.verify_user_password(user, 'wrongpassword', upgrade=True) is False
+            assert db.session.get(User, user.id).password_hash == legacy_hash
+    
+    def test_login_with_legacy_hash(self, app, client):
+        """Test logging in with a password stored before the switch to passlib."""
+        user_id = register(client, 'Legacy User', 'legacy@example.com')
+        with app.app_context():
+            db.session.get(User, user_id).password_hash = generate_password_hash('oldpassword', method='pbkdf2:sha256')
+            db.session.commit()
+        
+        response = client.post('/api/auth/login', json={
+            'email': 'legacy@example.com',
+            'password': 'oldpassword'
+        })
+        
+        assert response.status_code == 200
+        with app.app_context():
+            assert db.session.get(User, user_id).password_hash.startswith('$argon2')
+
+
+class TestUserList:
+    """Test the paginated admin user list."""
+    
+    @pytest.fixture
+    def users(self, client, admin_headers):
+        """Five students in addition to the admin."""
+        return [register(client, f'Student {i}', f'student{i}@example.com') for i in range(5)]
+    
+    def test_pages_do_not_overlap(self, client, admin_headers, users):
+        """Test that page numbers skip whole pages."""
+        first = client.get('/api/admin/users?page=1&limit=2', headers=admin_headers).get_json()
+        second = client.get('/api/admin/users?page=2&limit=2', headers=admin_headers).get_json()
+        
+        first_ids = [user['id'] for user in first['data']]
+        second_ids = [user['id'] for user in second['data']]
+        assert len(first_ids) == 2
+        assert len(second_ids) == 2
+        assert not set(first_ids) & set(second_ids)
+        assert first['pagination']['total'] == 6
+        assert first['pagination']['pages'] == 3
+    
+    def test_cursor_walks_every_user_once(self, client, admin_headers, users):
+        """Test following nextCursor through the whole list."""
+        seen = []
+        url = '/api/admin/users?limit=4'
+        while url:
+            data = client.get(url, headers=admin_headers).get_json()
+            seen.extend(user['id'] for user in data['data'])
+            cursor = data['pagination']['nextCursor']
+            url = f'/api/admin/users?limit=4&cursor={cursor}' if cursor else None
+        
+        assert len(seen) == 6
+        assert set(users) <= set(seen)
+    
+    def test_search(self, client, admin_headers, users):
+        """Test searching users by part of their email."""
+        response = client.get('/api/admin/users?search=student3', headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [user['id'] for user in data['data']] == [users[3]]
+        assert data['pagination']['nextCursor'] is None
+    
+    def test_search_survives_vacuum(self, app, client, admin_headers, users):
+        """Test that search still finds the right users after SQLite renumbers rowids."""
+        with app.app_context():
+            get_service('db').delete_user(users[0])
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql('VACUUM')
+        
+        response = client.get('/api/admin/users?search=Student 4', headers=admin_headers)
+        
+        assert [user['id'] for user in response.get_json()['data']] == [users[4]]
+    
+    def test_search_without_index(self, app, client, admin_headers, users):
+        """Test that search falls back to ILIKE when the database predates users_fts."""
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql('DROP TABLE users_fts')
+        
+        response = client.get('/api/admin/users?search=student3', headers=admin_headers)
+        
+        assert [user['id'] for user in response.get_json()['data']] == [users[3]]
+    
+    def test_user_list_unauthorized(self, client, auth_headers):
+        """Test listing users without admin privileges."""
+        response = client.get('/api/admin/users', headers=auth_headers)
+        
+        assert response.status_code == 403
+
+
+class TestUnitOfWork:
+    """Test grouping writes into one transaction."""
+    
+    def test_commits_on_success(self, app, client, sample_topic):
+        """Test that the writes in the block are committed together."""
+        topic_id = sample_topic['topic']['id']
+        with app.app_context():
+            db_service = get_service('db')
+            with db_service.unit_of_work():
+                db_service.adjust_topic_document_count(topic_id, 2, commit=False)
+                db_service.adjust_topic_document_count(topic_id, 1, commit=False)
+            
+            db.session.remove()
+            assert db.session.get(Topic, topic_id).document_count == 3
+    
+    def test_rolls_back_on_error(self, app, client, sample_topic):
+        """Test that an error in the block undoes every write in it."""
+        topic_id = sample_topic['topic']['id']
+        with app.app_context():
+            db_service = get_service('db')
+            with pytest.raises(RuntimeError):
+                with db_service.unit_of_work():
+                    db_service.adjust_topic_document_count(topic_id, 2, commit=False)
+                    raise RuntimeError('failed halfway')
+            
+            db.session.remove()
+            assert db.session.get(Topic, topic_id).document_count == 0
+    
+    def test_begins_before_first_statement(self, app):
+        """Test that SQLite opens the transaction (BEGIN IMMEDIATE) on entry."""
+        with app.app_context():
+            with get_service('db').unit_of_work() as session:
+                assert session.connection().connection.dbapi_connection.in_transaction
+
+
+class TestCascadeDeletes:
+    """Test what deleting a user takes with it."""
+    
+    def test_delete_user(self, app, client, admin_headers, sample_topic):
+        """Test that a user's sessions and topics go, and their uploads elsewhere stay."""
+        other_admin_id = register(client, 'Other Admin', 'other@example.com', role='admin')
+        shared_topic_id = sample_topic['topic']['id']
+        with app.app_context():
+            db_service = get_service('db')
+            own_topic_id = db_service.create_topic('Own Topic', 'Created by the other admin', other_admin_id).id
+            own_document_id = add_document(own_topic_id, other_admin_id, 'a' * 64)
+            shared_document_id = add_document(shared_topic_id, other_admin_id, 'b' * 64)
+            session_id = db_service.create_chat_session(other_admin_id, shared_topic_id, 'Questions').id
+            db_service.create_message(session_id, 'user', 'What is this topic about?')
+        
+        response = client.delete(f'/api/admin/users/{other_admin_id}', headers=admin_headers)
+        
+        assert response.status_code == 200
+        with app.app_context():
+            assert db.session.get(User, other_admin_id) is None
+            assert db.session.get(ChatSession, session_id) is None
+            assert Message.query.filter_by(session_id=session_id).count() == 0
+            assert db.session.get(Topic, own_topic_id) is None
+            assert db.session.get(Document, own_document_id) is None
+            shared_document = db.session.get(Document, shared_document_id)
+            assert shared_document is not None
+            assert shared_document.uploaded_by is None
+
+
+class TestRecentActivity:
+    """Test the admin dashboard activity feed."""
+    
+    def test_recent_sessions(self, app, client, auth_headers, sample_topic):
+        """Test that recent chat sessions carry their user and topic names."""
+        with app.app_context():
+            db_service = get_service('db')
+            student = db_service.get_user_by_email('test@example.com')
+            db_service.create_chat_session(student.id, sample_topic['topic']['id'], 'Questions')
+            
+            activity = db_service.get_recent_activity()
+        
+        assert len(activity) == 1
+        assert activity[0]['title'] == 'Questions'
+        assert activity[0]['user_name'] == 'Test User'
+        assert activity[0]['topic_name'] == 'Test Topic'
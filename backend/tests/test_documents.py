@@ -0,0 +1,342 @@
+"""
+Test cases for document routes and upload deduplication
+"""
+import pytest
+import io
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models import Document, Topic
+from app.services.document_service import DocumentService
+from app.services.registry import get_service
+from app.services import vector_store
+from app.services.vector_store import VectorStoreService
+from app.tasks import process_document
+
+
+PDF_BYTES = b'%PDF-1.4\n% course notes\n%%EOF\n'
+
+
+@pytest.fixture
+def upload_folder(app, tmp_path):
+    """Send uploads to a per-test directory."""
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def topic_id(sample_topic):
+    """ID of the sample topic."""
+    return sample_topic['topic']['id']
+
+
+def stage_upload(app, topic_id, content=PDF_BYTES, filename='notes.pdf'):
+    """Record an upload as pending, the way the queued upload path does."""
+    with app.app_context():
+        return get_service('documents').stage_document_stream(
+            io.BytesIO(content), filename, topic_id, None,
+            app.config['UPLOAD_FOLDER'], str(uuid.uuid4())
+        )
+
+
+def soft_delete(app, document_id, age=timedelta(0)):
+    """Mark a document as deleted ``age`` ago, as the delete route does."""
+    with app.app_context():
+        document = db.session.get(Document, document_id)
+        document.deleted_at = datetime.utcnow() - age
+        db.session.commit()
+
+
+class TestDocumentDeduplication:
+    """Test that a file is recorded once per topic."""
+    
+    def test_duplicate_upload_returns_existing_document(self, app, upload_folder, topic_id):
+        """Test uploading the same file twice."""
+        first = stage_upload(app, topic_id)
+        second = stage_upload(app, topic_id, filename='copy.pdf')
+        
+        assert first['is_duplicate'] is False
+        assert second['is_duplicate'] is True
+        assert second['existing_document']['id'] == first['document_record']['id']
+        assert len(os.listdir(upload_folder)) == 1
+        
+        with app.app_context():
+            assert Document.query.filter_by(topic_id=topic_id).count() == 1
+    
+    def test_conflicting_insert_is_skipped(self, app, upload_folder, topic_id):
+        """Test that the ON CONFLICT insert returns None instead of raising."""
+        with app.app_context():
+            doc_service = get_service('documents')
+            values = {
+                'topic_id': topic_id,
+                'filename': 'notes.pdf',
+                'original_filename': 'notes.pdf',
+                'file_path': str(upload_folder / 'notes.pdf'),
+                'file_hash': 'a' * 64,
+                'file_size': len(PDF_BYTES),
+                'content_hash': '',
+                'uploaded_by': None
+            }
+            
+            assert doc_service._insert_if_new(id=str(uuid.uuid4()), **values) is not None
+            assert doc_service._insert_if_new(id=str(uuid.uuid4()), **values) is None
+            db.session.commit()
+            
+            assert Document.query.filter_by(topic_id=topic_id).count() == 1
+    
+    def test_same_file_in_another_topic(self, app, client, admin_headers, upload_folder, topic_id):
+        """Test that deduplication is scoped to a topic."""
+        response = client.post('/api/topics',
+            json={'name': 'Another Topic', 'description': 'Second topic'},
+            headers=admin_headers
+        )
+        other_topic_id = response.get_json()['topic']['id']
+        
+        stage_upload(app, topic_id)
+        result = stage_upload(app, other_topic_id)
+        
+        assert result['is_duplicate'] is False
+    
+    def test_reupload_after_delete(self, app, upload_folder, topic_id):
+        """Test that a soft-deleted copy awaiting cleanup doesn't block a re-upload."""
+        first = stage_upload(app, topic_id)
+        soft_delete(app, first['document_record']['id'])
+        
+        second = stage_upload(app, topic_id)
+        
+        assert second['is_duplicate'] is False
+        assert second['document_record']['id'] != first['document_record']['id']
+    
+    def test_content_duplicate_ignores_deleted_and_self(self, app, upload_folder, topic_id):
+        """Test that the content-hash check skips soft-deleted rows and the document being processed."""
+        deleted_id = stage_upload(app, topic_id)['document_record']['id']
+        current_id = stage_upload(app, topic_id, content=PDF_BYTES + b'%copy\n')['document_record']['id']
+        soft_delete(app, deleted_id)
+        
+        with app.app_context():
+            doc_service = get_service('documents')
+            # Staged uploads share the empty content hash until they are processed
+            assert doc_service.check_duplicate_by_content_hash('', topic_id, exclude_id=current_id) is None
+            assert doc_service.check_duplicate_by_content_hash('', topic_id).id == current_id
+
+
+class TestUploadStream:
+    """Test the raw-body upload endpoint."""
+    
+    def test_upload_stream_requires_filename(self, client, admin_headers, topic_id):
+        """Test upload without the X-Filename header."""
+        response = client.post(f'/api/documents/topics/{topic_id}/upload-stream',
+            data=PDF_BYTES,
+            headers=admin_headers
+        )
+        
+        assert response.status_code == 400
+    
+    def test_upload_stream_rejects_non_pdf(self, client, admin_headers, topic_id, upload_folder):
+        """Test upload of a body that isn't a PDF."""
+        response = client.post(f'/api/documents/topics/{topic_id}/upload-stream',
+            data=b'not a pdf',
+            headers={**admin_headers, 'X-Filename': 'notes.pdf'}
+        )
+        
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid PDF file'
+        assert os.listdir(upload_folder) == []
+    
+    def test_upload_stream_duplicate(self, app, client, admin_headers, topic_id, upload_folder):
+        """Test streaming a file the topic already has."""
+        existing = stage_upload(app, topic_id)
+        
+        response = client.post(f'/api/documents/topics/{topic_id}/upload-stream',
+            data=PDF_BYTES,
+            headers={**admin_headers, 'X-Filename': 'notes.pdf'}
+        )
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['duplicate'] is True
+        assert data['existing_document']['id'] == existing['document_record']['id']
+        assert len(os.listdir(upload_folder)) == 1
+    
+    def test_upload_stream_topic_not_found(self, client, admin_headers):
+        """Test streaming to a topic that doesn't exist."""
+        response = client.post('/api/documents/topics/nonexistent-id/upload-stream',
+            data=PDF_BYTES,
+            headers={**admin_headers, 'X-Filename': 'notes.pdf'}
+        )
+        
+        assert response.status_code == 404
+    
+    def test_upload_stream_unauthorized(self, client, auth_headers, topic_id):
+        """Test streaming an upload without admin privileges."""
+        response = client.post(f'/api/documents/topics/{topic_id}/upload-stream',
+            data=PDF_BYTES,
+            headers={**auth_headers, 'X-Filename': 'notes.pdf'}
+        )
+        
+        assert response.status_code == 403
+
+
+class TestDocumentDelete:
+    """Test document deletion and cleanup of deleted documents."""
+    
+    def test_delete_document(self, app, client, admin_headers, upload_folder, topic_id):
+        """Test that deleting a document removes its file, row and topic count."""
+        document_id = stage_upload(app, topic_id)['document_record']['id']
+        with app.app_context():
+            get_service('documents').mark_document_processed(document_id, 3)
+            get_service('db').adjust_topic_document_count(topic_id, 1)
+        
+        response = client.delete(f'/api/documents/{document_id}', headers=admin_headers)
+        
+        assert response.status_code == 200
+        assert os.listdir(upload_folder) == []
+        with app.app_context():
+            assert db.session.get(Document, document_id) is None
+            assert db.session.get(Topic, topic_id).document_count == 0
+        
+        response = client.get(f'/api/documents/{document_id}', headers=admin_headers)
+        assert response.status_code == 404
+    
+    def test_delete_document_not_found(self, client, admin_headers):
+        """Test deleting a document that doesn't exist."""
+        response = client.delete('/api/documents/nonexistent-id', headers=admin_headers)
+        
+        assert response.status_code == 404
+    
+    def test_delete_document_unauthorized(self, app, client, auth_headers, upload_folder, topic_id):
+        """Test deleting a document without admin privileges."""
+        document_id = stage_upload(app, topic_id)['document_record']['id']
+        
+        response = client.delete(f'/api/documents/{document_id}', headers=auth_headers)
+        
+        assert response.status_code == 403
+        with app.app_context():
+            assert db.session.get(Document, document_id).deleted_at is None
+    
+    def test_cleanup_retries_stale_deletes(self, app, upload_folder, topic_id):
+        """Test that the sweep purges documents whose cleanup didn't finish."""
+        stale_id = stage_upload(app, topic_id)['document_record']['id']
+        recent_id = stage_upload(app, topic_id, content=PDF_BYTES + b'%recent\n')['document_record']['id']
+        soft_delete(app, stale_id, age=timedelta(hours=1))
+        soft_delete(app, recent_id)
+        
+        with app.app_context():
+            assert get_service('documents').cleanup_deleted_documents() == 1
+            assert db.session.get(Document, stale_id) is None
+            assert db.session.get(Document, recent_id) is not None
+        assert len(os.listdir(upload_folder)) == 1
+    
+    def test_cleanup_skips_live_documents(self, app, upload_folder, topic_id):
+        """Test that cleanup refuses a document that isn't marked as deleted."""
+        document_id = stage_upload(app, topic_id)['document_record']['id']
+        
+        with app.app_context():
+            assert get_service('documents').cleanup_deleted_document(document_id) is False
+            assert db.session.get(Document, document_id) is not None
+    
+    def test_failed_processing_discards_staged_upload(self, app, upload_folder, topic_id, monkeypatch):
+        """Test that a failed background job frees the file for a later upload."""
+        document_id = stage_upload(app, topic_id)['document_record']['id']
+        
+        def fail(self, file_path):
+            raise RuntimeError('parse failed')
+        
+        monkeypatch.setattr(DocumentService, 'extract_and_hash_content', fail)
+        with app.app_context():
+            with pytest.raises(RuntimeError):
+                process_document(document_id)
+            assert db.session.get(Document, document_id) is None
+        assert os.listdir(upload_folder) == []
+        
+        assert stage_upload(app, topic_id)['is_duplicate'] is False
+    
+    def test_discard_keeps_processed_documents(self, app, upload_folder, topic_id):
+        """Test that a failed reprocess doesn't discard an indexed document."""
+        document_id = stage_upload(app, topic_id)['document_record']['id']
+        
+        with app.app_context():
+            doc_service = get_service('documents')
+            doc_service.mark_document_processed(document_id, 5)
+            assert doc_service.discard_staged_upload(document_id) is False
+            assert db.session.get(Document, document_id).deleted_at is None
+
+
+class TestDocumentStatus:
+    """Test the document processing status endpoint."""
+    
+    def test_status_pending(self, app, client, admin_headers, upload_folder, topic_id):
+        """Test the status of a document that hasn't been processed."""
+        record = stage_upload(app, topic_id)['document_record']
+        
+        response = client.get(f"/api/documents/{record['id']}/status", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['status'] == 'pending'
+        assert data['isProcessed'] is False
+        assert data['jobId'] == record['jobId']
+    
+    def test_status_processed(self, app, client, admin_headers, upload_folder, topic_id):
+        """Test the status of a processed document."""
+        document_id = stage_upload(app, topic_id)['document_record']['id']
+        with app.app_context():
+            get_service('documents').mark_document_processed(document_id, 5)
+        
+        response = client.get(f'/api/documents/{document_id}/status', headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['status'] == 'processed'
+        assert data['chunkCount'] == 5
+    
+    def test_status_unauthorized(self, app, client, auth_headers, upload_folder, topic_id):
+        """Test that a student can't poll another user's document."""
+        document_id = stage_upload(app, topic_id)['document_record']['id']
+        
+        response = client.get(f'/api/documents/{document_id}/status', headers=auth_headers)
+        
+        assert response.status_code == 403
+    
+    def test_status_not_found(self, client, admin_headers):
+        """Test the status of a document that doesn't exist."""
+        response = client.get('/api/documents/nonexistent-id/status', headers=admin_headers)
+        
+        assert response.status_code == 404
+
+
+class TestTopicIndex:
+    """Test vector index bookkeeping that needs no embeddings."""
+    
+    def test_update_with_no_documents(self, app, tmp_path):
+        """Test that indexing nothing doesn't create an index or mark the topic as indexed."""
+        with app.app_context():
+            vector_service = VectorStoreService(str(tmp_path))
+            
+            assert vector_service.update_topic_index('empty-topic', []) is True
+            assert vector_service.topic_index_exists('empty-topic') is False
+            assert os.listdir(tmp_path) == []
+    
+    def test_create_with_no_documents(self, app, tmp_path):
+        """Test that creating an index from no documents fails without leaving one behind."""
+        with app.app_context():
+            vector_service = VectorStoreService(str(tmp_path))
+            
+            with pytest.raises(Exception, match='No documents provided'):
+                vector_service.create_topic_index('empty-topic', iter([]))
+            assert os.listdir(tmp_path) == []
+    
+    def test_index_deleted_elsewhere_expires(self, app, tmp_path, monkeypatch):
+        """Test that a cached existing index is re-checked once its entry expires."""
+        monkeypatch.setattr(vector_store, 'INDEX_POSITIVE_TTL', 0.0)
+        with app.app_context():
+            vector_service = VectorStoreService(str(tmp_path))
+            os.makedirs(tmp_path / 'topic')
+            assert vector_service.topic_index_exists('topic') is True
+            
+            # Another worker removes the index without touching this process's cache
+            shutil.rmtree(tmp_path / 'topic')
+            
+            assert vector_service.topic_index_exists('topic') is False